@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+from api_client import fetch_all, fetch_streamed
 import json
 from llm_utilities.utils import process_user_input, confirm_and_execute_tasks
 from Pages.login import handle_logout
@@ -41,10 +42,9 @@ if "current_task_index" not in st.session_state:
 
 def fetch_products():
     try:
-        response = requests.get("http://127.0.0.1:8000/api/products/")
-        if response.status_code == 200:
-            return response.json()
-        st.error(f"Failed to fetch products: {response.status_code} - {response.text}")
+        return fetch_all("http://127.0.0.1:8000/api/products/")
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch products: {e.response.status_code} - {e.response.text}")
         return None
     except Exception as e:
         st.error(f"Failed to connect to the API: {e}")
@@ -52,10 +52,9 @@ def fetch_products():
 
 def fetch_purchases():
     try:
-        response = requests.get("http://127.0.0.1:8000/api/purchases/")
-        if response.status_code == 200:
-            return response.json()
-        st.error(f"Failed to fetch purchases: {response.status_code} - {response.text}")
+        return fetch_all("http://127.0.0.1:8000/api/purchases/")
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch purchases: {e.response.status_code} - {e.response.text}")
         return None
     except Exception as e:
         st.error(f"Failed to connect to the API: {e}")
@@ -63,10 +62,9 @@ def fetch_purchases():
 
 def fetch_sales():
     try:
-        response = requests.get("http://127.0.0.1:8000/api/sales/")
-        if response.status_code == 200:
-            return response.json()
-        st.error(f"Failed to fetch sales: {response.status_code} - {response.text}")
+        return fetch_all("http://127.0.0.1:8000/api/sales/")
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch sales: {e.response.status_code} - {e.response.text}")
         return None
     except Exception as e:
         st.error(f"Failed to connect to the API: {e}")
@@ -222,13 +220,13 @@ if user_input:
                         method, endpoint = api_action.split(" ", 1)
                         base_url = "http://127.0.0.1:8000"
                         
-                        # Make API request with filters in payload
+                        # Make API request with filters in payload; GET lists are streamed
+                        # in one response, so "show all" requests don't build one huge
+                        # list on the server
                         if method == "GET":
-                            response_content = requests.get(base_url + endpoint, params=payload)
+                            data = fetch_streamed(base_url + endpoint, payload)
                         else:
-                            response_content = requests.post(base_url + endpoint, json=payload)
-                            
-                        data = response_content.json()
+                            data = requests.post(base_url + endpoint, json=payload).json()
                         if isinstance(data, list) and len(data) > 0:
                             # Create product ID to name mapping
                             product_map = {}
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import requests
+from api_client import fetch_all
 from Pages.login import handle_logout
 
 # Check if user is authenticated
@@ -41,10 +42,9 @@ if 'inv_show_delete_dialog' not in st.session_state:
 
 def fetch_products():
     try:
-        response = requests.get(BASE_URL)
-        if response.status_code == 200:
-            return response.json()
-        st.error(f"Failed to fetch products: {response.status_code} - {response.text}")
+        return fetch_all(BASE_URL)
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch products: {e.response.status_code} - {e.response.text}")
         return None
     except Exception as e:
         st.error(f"Failed to connect to the API: {e}")
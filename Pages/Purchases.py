@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import requests
+from api_client import fetch_all, fetch_frame
 from datetime import datetime
 from Pages.login import handle_logout
 
@@ -45,10 +46,9 @@ if 'products' not in st.session_state:
 
 def fetch_purchases():
     try:
-        response = requests.get(BASE_URL)
-        if response.status_code == 200:
-            return response.json()
-        st.error(f"Failed to fetch purchases: {response.status_code} - {response.text}")
+        return fetch_frame(BASE_URL)
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch purchases: {e.response.status_code} - {e.response.text}")
         return None
     except Exception as e:
         st.error(f"Failed to connect to the API: {e}")
@@ -56,10 +56,9 @@ def fetch_purchases():
 
 def fetch_products():
     try:
-        response = requests.get(PRODUCTS_URL)
-        if response.status_code == 200:
-            return response.json()
-        st.error(f"Failed to fetch products: {response.status_code} - {response.text}")
+        return fetch_all(PRODUCTS_URL)
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch products: {e.response.status_code} - {e.response.text}")
         return None
     except Exception as e:
         st.error(f"Failed to connect to the API: {e}")
@@ -223,8 +222,8 @@ def delete_purchase_dialog(purchase_data, purchase_id):
 purchases_data = fetch_purchases()
 df = pd.DataFrame()
 
-if purchases_data:
-    df = pd.DataFrame(purchases_data)
+if purchases_data is not None and not purchases_data.empty:
+    df = purchases_data
     df['product'] = df['product'].map(st.session_state.products)
     column_mapping = {
         'date': 'Date',
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import requests
+from api_client import fetch_all, fetch_frame
 from datetime import datetime
 from Pages.login import handle_logout
 
@@ -45,10 +46,9 @@ if 'products' not in st.session_state:
 
 def fetch_sales():
     try:
-        response = requests.get(BASE_URL)
-        if response.status_code == 200:
-            return response.json()
-        st.error(f"Failed to fetch sales: {response.status_code} - {response.text}")
+        return fetch_frame(BASE_URL)
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch sales: {e.response.status_code} - {e.response.text}")
         return None
     except Exception as e:
         st.error(f"Failed to connect to the API: {e}")
@@ -56,10 +56,9 @@ def fetch_sales():
 
 def fetch_products():
     try:
-        response = requests.get(PRODUCTS_URL)
-        if response.status_code == 200:
-            return response.json()
-        st.error(f"Failed to fetch products: {response.status_code} - {response.text}")
+        return fetch_all(PRODUCTS_URL)
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch products: {e.response.status_code} - {e.response.text}")
         return None
     except Exception as e:
         st.error(f"Failed to connect to the API: {e}")
@@ -223,8 +222,8 @@ def delete_sale_dialog(sale_data, sale_id):
 sales_data = fetch_sales()
 df = pd.DataFrame()
 
-if sales_data:
-    df = pd.DataFrame(sales_data)
+if sales_data is not None and not sales_data.empty:
+    df = sales_data
     df['product'] = df['product'].map(st.session_state.products)
     column_mapping = {
         'date': 'Date',
@@ -0,0 +1,16 @@
+"""Project-wide middleware."""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+
+class ThresholdGZipMiddleware(GZipMiddleware):
+    """
+    Gzip responses for clients that accept it, skipping responses smaller
+    than ``GZIP_MIN_LENGTH`` bytes: compressing them costs more time than it
+    saves on the wire. Streaming responses are always compressed.
+    """
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.GZIP_MIN_LENGTH:
+            return response
+        return super().process_response(request, response)
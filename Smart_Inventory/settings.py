@@ -63,6 +63,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Before anything that reads or changes the response body
+    "Smart_Inventory.middleware.ThresholdGZipMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -115,6 +117,43 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# Size bound of the API response cache. LocMemCache evicts least recently used
+# entries; CULL_FREQUENCY equal to MAX_ENTRIES evicts one entry at a time.
+API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "1000"))
+# Lists with more rows are not cached: the bound above counts entries, not bytes
+API_CACHE_MAX_ROWS = int(os.getenv("API_CACHE_MAX_ROWS", "10000"))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "api": {
+        "BACKEND": os.getenv(
+            "API_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("API_CACHE_LOCATION", "api-responses"),
+        "TIMEOUT": int(os.getenv("API_CACHE_TIMEOUT", "300")),
+        "OPTIONS": {
+            "MAX_ENTRIES": API_CACHE_MAX_ENTRIES,
+            "CULL_FREQUENCY": API_CACHE_MAX_ENTRIES,
+        },
+    },
+}
+
+# Serve repeated list queries from the "api" cache
+API_RESPONSE_CACHE = os.getenv("API_RESPONSE_CACHE", "True").lower() == "true"
+
+# Answer the icontains text filters (name, notes, supplier, customer) from the
+# FTS5 index: word-prefix instead of substring matching, without a table scan
+FTS_TEXT_FILTERS = os.getenv("FTS_TEXT_FILTERS", "False").lower() == "true"
+
+# Responses smaller than this many bytes are sent uncompressed
+GZIP_MIN_LENGTH = int(os.getenv("GZIP_MIN_LENGTH", "1024"))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -169,4 +208,14 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # orjson-backed, falling back to the stock JSON classes without it
+    "DEFAULT_RENDERER_CLASSES": [
+        "products.fastjson.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "products.fastjson.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
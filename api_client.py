@@ -0,0 +1,170 @@
+"""Helpers for reading the inventory API from the Streamlit pages and the LLM executor."""
+import pandas as pd
+import requests
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+PAGE_SIZE = 500
+# Rows per page of Arrow responses, which need no per-row parsing
+ARROW_PAGE_SIZE = 100000
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+# Responses kept for If-None-Match revalidation, keyed by URL, params and
+# format, bounded by the size of their response bodies: bodies over
+# ETAG_CACHE_MAX_BODY bytes are not kept, and the oldest entries are evicted
+# past ETAG_CACHE_MAX_BYTES in all
+ETAG_CACHE_MAX_BODY = 1024 * 1024
+ETAG_CACHE_MAX_BYTES = 16 * 1024 * 1024
+_etag_cache = {}
+_etag_cache_bytes = 0
+
+
+def _get(url, params, timeout, accept, decode, revalidate=True):
+    """
+    GET ``url`` accepting ``accept``, revalidating the previous response with
+    its ETag so unchanged data is not downloaded again, and return the body
+    decoded with ``decode(response)``. Without ``revalidate`` the response is
+    neither revalidated nor kept.
+    """
+    key = (url, tuple(sorted((params or {}).items())), accept)
+    cached = _etag_cache.get(key) if revalidate else None
+    headers = {"Accept": accept}
+    if cached:
+        headers["If-None-Match"] = cached[0]
+    response = requests.get(url, params=params, headers=headers, timeout=timeout)
+    if response.status_code == 304 and cached:
+        return cached[1]
+    response.raise_for_status()
+    body = decode(response)
+    etag = response.headers.get("ETag")
+    if etag and revalidate:
+        _remember(key, etag, body, len(response.content))
+    return body
+
+
+def _remember(key, etag, body, size):
+    """Keep ``body`` for revalidation if it is small, evicting the oldest."""
+    global _etag_cache_bytes
+    if key in _etag_cache:
+        _etag_cache_bytes -= _etag_cache.pop(key)[2]
+    if size > ETAG_CACHE_MAX_BODY:
+        return
+    while _etag_cache and _etag_cache_bytes + size > ETAG_CACHE_MAX_BYTES:
+        _etag_cache_bytes -= _etag_cache.pop(next(iter(_etag_cache)))[2]
+    _etag_cache[key] = (etag, body, size)
+    _etag_cache_bytes += size
+
+
+def get_json(url, params=None, timeout=30):
+    """GET a JSON endpoint, revalidated with its ETag."""
+    return _get(url, params, timeout, "application/json", lambda response: response.json())
+
+
+def get_arrow(url, params=None, timeout=30):
+    """
+    GET a list endpoint as an Arrow table, revalidated with its ETag. The
+    stream is read in place from the response bytes.
+    """
+    return _get(
+        url,
+        params,
+        timeout,
+        ARROW_STREAM,
+        lambda response: pa.ipc.open_stream(response.content).read_all(),
+    )
+
+
+def iter_pages(url, params=None, page_size=PAGE_SIZE, timeout=30):
+    """
+    Yield the result list of each page of a list endpoint, following the
+    keyset pagination ``next`` links until the last page.
+    """
+    params = {**(params or {}), "page_size": page_size}
+    while url:
+        body = get_json(url, params, timeout)
+        if isinstance(body, list):  # Endpoint without pagination
+            yield body
+            return
+        yield body["results"]
+        # The next link already carries the query string and cursor
+        url, params = body.get("next"), None
+
+
+def fetch_all(url, params=None, page_size=PAGE_SIZE):
+    """Return every row of a list endpoint, fetched page by page."""
+    rows = []
+    for page in iter_pages(url, params, page_size):
+        rows.extend(page)
+    return rows
+
+
+def fetch_streamed(url, params=None, timeout=300):
+    """
+    Return every row of a list endpoint from one streamed response, which the
+    server writes as it reads the rows instead of building the list first.
+    The rows are not kept for revalidation, so memory is only held by the
+    caller.
+    """
+    return _get(
+        url,
+        {**(params or {}), "stream": 1},
+        timeout,
+        "application/json",
+        lambda response: response.json(),
+        revalidate=False,
+    )
+
+
+def run_batch(base_url, operations, atomic=True, timeout=30):
+    """
+    Run ``{method, path, params, body}`` operations with one ``POST
+    /api/batch/`` and return the response; with ``atomic`` they are committed
+    together or not at all.
+    """
+    return requests.post(
+        f"{base_url}/api/batch/",
+        params={"atomic": "true"} if atomic else None,
+        json=operations,
+        timeout=timeout,
+    )
+
+
+def fetch_stock(base_url, ids=(), names=(), timeout=10):
+    """
+    Return the stock of many products, given by id and/or name, with one
+    ``POST /api/products/stock/``.
+    """
+    response = requests.post(
+        f"{base_url}/api/products/stock/",
+        json={"ids": list(ids), "names": list(names)},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_frame(url, params=None, page_size=ARROW_PAGE_SIZE):
+    """
+    Return every row of a list endpoint as a DataFrame. Pages are fetched as
+    Arrow tables when pyarrow is installed and the server offers the format,
+    as JSON otherwise.
+    """
+    if pa is not None:
+        tables = []
+        page_url, page_params = url, {**(params or {}), "page_size": page_size}
+        try:
+            while page_url:
+                table = get_arrow(page_url, page_params)
+                metadata = table.schema.metadata or {}
+                tables.append(table.replace_schema_metadata(None))
+                # The next link already carries the query string and cursor
+                page_url = metadata.get(b"next", b"").decode() or None
+                page_params = None
+        except requests.HTTPError as error:
+            if error.response.status_code != 406:
+                raise
+        else:
+            return pa.concat_tables(tables).to_pandas()
+    return pd.DataFrame(fetch_all(url, params))
@@ -0,0 +1,36 @@
+"""
+Stand-alone benchmarks for the inventory API.
+
+Each module is runnable with ``python -m benchmarks.<name>`` from the project
+root. ``setup()`` configures Django and creates a throw-away test database, so
+benchmarks never touch ``db.sqlite3``.
+"""
+
+import os
+import time
+
+
+def setup():
+    """Configure Django and create an empty test database."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Smart_Inventory.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark-only-secret-key")
+
+    import django
+
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+def best_of(func, repeat=3):
+    """Return the fastest of ``repeat`` runs of ``func`` in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
@@ -0,0 +1,62 @@
+"""
+Time the batch forecasting run over a large catalogue.
+
+Seeds ``--products`` products with sales on a random ``--density`` share of
+the history window (see benchmarks.replenishment), then times a full run
+fitted in this process and one fitted by a pool of ``--workers`` processes,
+and an incremental run after new sales of ``--changed`` products.
+
+Usage: python -m benchmarks.forecast [--products 50000] [--density 0.3] [--workers 4] [--changed 500]
+"""
+
+import argparse
+import os
+import time
+from datetime import date
+
+from benchmarks import setup
+from benchmarks.replenishment import seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--density", type=float, default=0.3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--changed", type=int, default=500)
+    args = parser.parse_args()
+
+    setup()
+    from products import forecasting
+    from products.models import Product, Purchase, Sale
+
+    today = date.today()
+    print(f"seeding {args.products} products ...")
+    seed(args.products, forecasting.HISTORY_DAYS, args.density, today)
+
+    timings = {}
+    for label, workers in (
+        ("full run, 1 process", 1),
+        (f"full run, {args.workers} workers", args.workers),
+    ):
+        start = time.perf_counter()
+        forecasting.run(full=True, workers=workers, today=today)
+        timings[label] = time.perf_counter() - start
+
+    changed = list(Product.objects.values_list("pk", flat=True)[: args.changed])
+    Purchase.objects.bulk_create(
+        Purchase(date=today, supplier="A", product_id=pk, amount=1) for pk in changed
+    )
+    Sale.objects.bulk_create(
+        Sale(date=today, customer="X", product_id=pk, amount=1) for pk in changed
+    )
+    start = time.perf_counter()
+    refit = forecasting.run(workers=args.workers, today=today).products
+    timings[f"incremental run ({refit} products)"] = time.perf_counter() - start
+
+    for name, elapsed in timings.items():
+        print(f"{name:>36}{elapsed * 1000:>12.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Compare the stock and the orjson-backed JSON renderers on the sales list.
+
+Seeds the largest of ``--scales`` sales (see benchmarks.list_formats) and,
+for the first N rows at every scale, times rendering the ``/api/sales/``
+payload (the ``values()`` dicts the list view returns) with DRF's
+``JSONRenderer`` and with ``FastJSONRenderer``, and reports the bytes before
+and after gzip as ``ThresholdGZipMiddleware`` applies it.
+
+Usage: python -m benchmarks.json_render [--scales 10000 100000 1000000]
+"""
+
+import argparse
+
+from benchmarks import best_of, setup
+from benchmarks.list_formats import seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--scales", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    args = parser.parse_args()
+
+    setup()
+    from django.utils.text import compress_string
+    from rest_framework.renderers import JSONRenderer
+
+    from products.fastjson import FastJSONRenderer
+    from products.models import Sale
+    from products.serializers import SaleSerializer
+
+    print(f"seeding {max(args.scales)} sales ...")
+    seed(max(args.scales))
+    fields = SaleSerializer.Meta.fields
+    renderers = {"stock": JSONRenderer(), "orjson": FastJSONRenderer()}
+
+    print(
+        f"{'rows':>9}{'renderer':>10}{'render':>10}{'bytes':>12}{'gzip':>10}{'gzipped':>12}"
+    )
+    for rows in sorted(args.scales):
+        data = list(Sale.objects.order_by("date", "id").values(*fields)[:rows])
+        for name, renderer in renderers.items():
+            render = best_of(lambda: renderer.render(data))
+            content = renderer.render(data)
+            compress = best_of(lambda: compress_string(content), repeat=1)
+            print(
+                f"{rows:>9}{name:>10}{render * 1000:>8.0f}ms{len(content):>12}"
+                f"{compress * 1000:>8.0f}ms{len(compress_string(content)):>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare JSON and Arrow responses of a large list endpoint.
+
+Seeds ``--rows`` sales (written directly, bypassing the stock counters),
+then times ``GET /api/sales/`` in both formats through the test client: the
+server side (query, row building and rendering), the payload size and the
+client-side decode into a DataFrame, ``pd.DataFrame(response.json())``
+against ``pyarrow.ipc.open_stream(...).read_all().to_pandas()``.
+
+Requires pyarrow. Usage: python -m benchmarks.list_formats [--rows 1000000]
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks import best_of, setup
+
+
+def seed(rows):
+    from django.db import connection, transaction
+
+    from products.models import Product, Sale
+
+    rng = random.Random(0)
+    products = Product.objects.bulk_create(
+        Product(name=f"SKU {p}", unit="pieces") for p in range(100)
+    )
+    start = date(2020, 1, 1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {Sale._meta.db_table} "
+            f"(date, customer, product_id, amount, notes) VALUES (%s, %s, %s, %s, %s)",
+            (
+                (
+                    (start + timedelta(days=i % 1800)).isoformat(),
+                    f"Customer {i}",
+                    products[i % 100].pk,
+                    rng.randint(1, 20),
+                    None if i % 3 else f"Order {i}",
+                )
+                for i in range(rows)
+            ),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    setup()
+    import pandas as pd
+    import pyarrow as pa
+    from django.test import Client
+
+    from products import columnar
+
+    print(f"seeding {args.rows} sales ...")
+    seed(args.rows)
+    client = Client()
+
+    decoders = {
+        "json": lambda content: pd.DataFrame(json.loads(content)),
+        "arrow": lambda content: pa.ipc.open_stream(content).read_all().to_pandas(),
+    }
+    print(f"{'format':>8}{'server':>12}{'payload':>14}{'decode':>12}")
+    for name, accept in (("json", "application/json"), ("arrow", columnar.MEDIA_TYPE)):
+        start = time.perf_counter()
+        response = client.get("/api/sales/", HTTP_ACCEPT=accept)
+        server = time.perf_counter() - start
+        content = response.content
+        decode = best_of(lambda: decoders[name](content))
+        print(
+            f"{name:>8}{server * 1000:>10.0f}ms{len(content) / 2**20:>11.1f}MiB"
+            f"{decode * 1000:>10.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
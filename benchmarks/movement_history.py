@@ -0,0 +1,128 @@
+"""
+Compare ways of listing a product's movements with a running balance.
+
+* ``naive``: what clients do without the history endpoint -- fetch the
+  product's purchases and sales with two queries, merge them by date and
+  accumulate the balance in Python. Always reads the whole history.
+* ``window``: ``history.rows()``, one ``UNION ALL`` query with a
+  ``SUM() OVER`` window, for the whole history.
+* ``window page``: the first page of 100 rows, and a page from the middle
+  of the history (continued from a cursor).
+* ``last month``: the movements of the last 30 days. The naive way still
+  reads the whole history for the opening balance; the window query starts
+  from ``opening_balance()``, a sum computed in the database.
+
+Rows are seeded with plain INSERTs spread evenly over the products.
+
+Usage: python -m benchmarks.movement_history [--rows 1000000] [--products 100]
+"""
+
+import argparse
+import random
+from datetime import date, timedelta
+from heapq import merge
+
+from benchmarks import best_of, setup
+
+PAGE_SIZE = 100
+
+
+def seed(rows, products):
+    from django.db import connection, transaction
+
+    from products.models import Product, Purchase, Sale
+
+    Product.objects.bulk_create(
+        Product(name=f"Product {p}", unit="pieces") for p in range(products)
+    )
+    product_ids = list(Product.objects.values_list("pk", flat=True))
+    start = date(2015, 1, 1)
+    rng = random.Random(0)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model, party in ((Purchase, "supplier"), (Sale, "customer")):
+            cursor.executemany(
+                f"INSERT INTO {model._meta.db_table} (date, {party}, product_id, amount) "
+                f"VALUES (%s, %s, %s, %s)",
+                [
+                    (
+                        (start + timedelta(days=rng.randrange(3650))).isoformat(),
+                        f"{party} {n}",
+                        product_ids[n % products],
+                        rng.randint(1, 20),
+                    )
+                    for n in range(rows // 2)
+                ],
+            )
+        cursor.execute("ANALYZE")
+    return product_ids[0]
+
+
+def naive(product_id):
+    from products.models import Purchase, Sale
+
+    purchases = (
+        (day, 0, pk, "purchase", amount)
+        for pk, day, amount in Purchase.objects.filter(product_id=product_id)
+        .order_by("date", "id")
+        .values_list("id", "date", "amount")
+    )
+    sales = (
+        (day, 1, pk, "sale", -amount)
+        for pk, day, amount in Sale.objects.filter(product_id=product_id)
+        .order_by("date", "id")
+        .values_list("id", "date", "amount")
+    )
+    balance = 0
+    result = []
+    for day, _, pk, source, quantity in merge(purchases, sales):
+        balance += quantity
+        result.append(
+            {
+                "id": pk,
+                "date": day,
+                "source": source,
+                "quantity": quantity,
+                "balance": balance,
+            }
+        )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=100)
+    args = parser.parse_args()
+
+    setup()
+    from products import history
+
+    print(f"seeding {args.rows} rows over {args.products} products ...")
+    product_id = seed(args.rows, args.products)
+
+    full = history.rows(product_id)
+    expected = naive(product_id)
+    assert [row["balance"] for row in full] == [row["balance"] for row in expected]
+    middle = full[len(full) // 2]
+    cursor = [middle[field] for field in history.ORDERING]
+    month = full[-1]["date"] - timedelta(days=29)
+
+    variants = {
+        "naive (2 queries + merge)": lambda: naive(product_id),
+        "window, whole history": lambda: history.rows(product_id),
+        "window, first page": lambda: history.rows(product_id, limit=PAGE_SIZE),
+        "window, middle page": lambda: history.rows(
+            product_id, after=cursor, limit=PAGE_SIZE
+        ),
+        "naive, last month": lambda: [
+            row for row in naive(product_id) if row["date"] >= month
+        ],
+        "window, last month": lambda: history.rows(product_id, start=month),
+    }
+    print(f"{len(full)} movements for the product, times in ms")
+    for name, func in variants.items():
+        print(f"{name:>28}{best_of(func) * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
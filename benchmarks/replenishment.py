@@ -0,0 +1,93 @@
+"""
+Time the replenishment run over a large catalogue.
+
+Seeds ``--products`` products with sales on a random ``--density`` share of
+the last ``--days`` days (daily rollup rows written directly), then times
+the three stages of ``replenishment.refresh``: the grouped sales query and
+stock read (``load``), the vectorized metrics (``compute``) and the table
+rewrite (``save``).
+
+Usage: python -m benchmarks.replenishment [--products 100000] [--days 90] [--density 0.3]
+"""
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks import setup
+
+
+def seed(products, days, density, today):
+    from django.db import connection, transaction
+
+    from products.models import DailyStock, Product, ProductStock
+
+    rng = random.Random(0)
+    with transaction.atomic():
+        # Plain bulk inserts: counter rows are written below
+        Product.objects.bulk_create(
+            (Product(name=f"SKU {p}", unit="pieces") for p in range(products)),
+            batch_size=1000,
+        )
+        product_ids = list(Product.objects.values_list("pk", flat=True))
+        ProductStock.objects.bulk_create(
+            (
+                ProductStock(
+                    product_id=pk, purchased=500, sold=0, on_hand=rng.randint(0, 500)
+                )
+                for pk in product_ids
+            ),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {DailyStock._meta.db_table} "
+                f"(product_id, day, purchased, sold, closing) VALUES (%s, %s, 0, %s, 0)",
+                (
+                    (
+                        pk,
+                        (today - timedelta(days=offset)).isoformat(),
+                        rng.randint(1, 12),
+                    )
+                    for pk in product_ids
+                    for offset in range(days)
+                    if rng.random() < density
+                ),
+            )
+            cursor.execute("ANALYZE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--density", type=float, default=0.3)
+    args = parser.parse_args()
+
+    setup()
+    from products import replenishment
+
+    today = date.today()
+    print(f"seeding {args.products} products ...")
+    seed(args.products, args.days, args.density, today)
+
+    timings = {}
+    start = time.perf_counter()
+    frame = replenishment.load(args.days, today)
+    timings["load (1 grouped query + stock)"] = time.perf_counter() - start
+    start = time.perf_counter()
+    result = replenishment.compute(frame, args.days)
+    timings["compute (vectorized)"] = time.perf_counter() - start
+    start = time.perf_counter()
+    replenishment.save(result)
+    timings["save (table rewrite)"] = time.perf_counter() - start
+
+    for name, elapsed in timings.items():
+        print(f"{name:>32}{elapsed * 1000:>12.1f} ms")
+    print(f"{'total':>32}{sum(timings.values()) * 1000:>12.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
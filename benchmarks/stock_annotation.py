@@ -0,0 +1,105 @@
+"""
+Compare the cost of the product stock annotations as history grows.
+
+* ``legacy``: ``Sum(..., distinct=True)`` over a join of purchases and sales,
+  the annotation ProductFilter used to apply. The join yields
+  purchases x sales rows per product, so its cost grows quadratically.
+* ``history``: correlated ``Subquery`` aggregates (``annotate_stock(source="history")``),
+  linear in the number of transactions.
+* ``counters``: the materialized ``ProductStock`` row, constant per product.
+
+Usage: python -m benchmarks.stock_annotation [--products 20] [--scales 50 100 200 400]
+"""
+
+import argparse
+from datetime import date, timedelta
+
+from benchmarks import best_of, setup
+
+
+def seed(products, per_product):
+    from products.models import Product, Purchase, Sale
+
+    Sale.objects.all().delete()
+    Purchase.objects.all().delete()
+    Product.objects.all().delete()
+    start = date(2020, 1, 1)
+    for p in range(products):
+        product = Product.objects.create(name=f"Product {p}", unit="pieces")
+        Purchase.objects.bulk_create(
+            Purchase(
+                date=start + timedelta(days=i),
+                supplier="Supplier",
+                product=product,
+                amount=2,
+            )
+            for i in range(per_product)
+        )
+        Sale.objects.bulk_create(
+            Sale(
+                date=start + timedelta(days=i),
+                customer="Customer",
+                product=product,
+                amount=1,
+            )
+            for i in range(per_product)
+        )
+
+
+def legacy(queryset):
+    from django.db.models import F, Sum, Value
+    from django.db.models.functions import Coalesce
+
+    return queryset.annotate(
+        purchased_amount=Coalesce(Sum("purchases__amount", distinct=True), Value(0)),
+        sold_amount=Coalesce(Sum("sales__amount", distinct=True), Value(0)),
+    ).annotate(stock_level=F("purchased_amount") - F("sold_amount"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--scales", type=int, nargs="+", default=[50, 100, 200, 400])
+    args = parser.parse_args()
+
+    setup()
+    from products.annotations import annotate_stock
+    from products.models import Product
+
+    variants = {
+        "legacy": lambda: list(legacy(Product.objects.all()).values_list("stock_level")),
+        "history": lambda: list(
+            annotate_stock(Product.objects.all(), source="history").values_list("stock_level")
+        ),
+        "counters": lambda: list(
+            annotate_stock(Product.objects.all()).values_list("stock_level")
+        ),
+    }
+
+    print(f"{args.products} products, times in ms (ratio to previous scale)")
+    print(f"{'tx/product':>10}" + "".join(f"{name:>20}" for name in variants))
+    previous = {}
+    for per_product in args.scales:
+        seed(args.products, per_product)
+        row = f"{per_product * 2:>10}"
+        for name, func in variants.items():
+            elapsed = best_of(func)
+            ratio = f"(x{elapsed / previous[name]:.1f})" if name in previous else ""
+            row += f"{elapsed * 1000:>12.2f} {ratio:>7}"
+            previous[name] = elapsed
+        print(row)
+
+    # The legacy annotation also collapses equal amounts
+    product = Product.objects.first()
+    print(
+        "stock of first product: legacy =",
+        legacy(Product.objects.filter(pk=product.pk)).get().stock_level,
+        "history =",
+        annotate_stock(Product.objects.filter(pk=product.pk), source="history").get().stock_level,
+        "counters =",
+        product.stock_level(),
+    )
+
+
+if __name__ == "__main__":
+    main()
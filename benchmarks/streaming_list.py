@@ -0,0 +1,66 @@
+"""
+Compare the peak memory of buffered and streamed JSON lists.
+
+Seeds ``--rows`` sales (see benchmarks.list_formats) and requests
+``/api/sales/`` through the test client, buffered and with ``?stream=1`` at
+each of ``--chunk-sizes``, reporting the time to the last byte and the peak
+Python memory (tracemalloc) while the response is produced and consumed.
+
+Usage: python -m benchmarks.streaming_list [--rows 200000] [--chunk-sizes 500 2000 10000]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from benchmarks import setup
+from benchmarks.list_formats import seed
+
+
+def measure(request):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = sum(len(part) for part in request())
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument(
+        "--chunk-sizes", type=int, nargs="+", default=[500, 2000, 10000]
+    )
+    args = parser.parse_args()
+
+    setup()
+    from django.test import Client, override_settings
+
+    from products.views import SaleViewSet
+
+    print(f"seeding {args.rows} sales ...")
+    seed(args.rows)
+    client = Client()
+
+    variants = {"buffered": lambda: [client.get("/api/sales/").content]}
+    for chunk_size in args.chunk_sizes:
+
+        def streamed(chunk_size=chunk_size):
+            SaleViewSet.stream_chunk_size = chunk_size
+            return client.get("/api/sales/", {"stream": 1}).streaming_content
+
+        variants[f"stream, chunks of {chunk_size}"] = streamed
+
+    print(f"{'variant':>26}{'time':>10}{'peak memory':>14}{'bytes':>12}")
+    with override_settings(API_RESPONSE_CACHE=False):
+        for name, request in variants.items():
+            elapsed, peak, size = measure(request)
+            print(
+                f"{name:>26}{elapsed * 1000:>8.0f}ms{peak / 2**20:>11.1f}MiB{size:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
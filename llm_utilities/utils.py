@@ -1,8 +1,10 @@
 import json
+from urllib.parse import parse_qsl
 from django.core.exceptions import ValidationError
 import google.generativeai as genai
 from django.conf import settings
 import requests
+from api_client import run_batch
 from datetime import date
 
 today = date.today()
@@ -27,6 +29,7 @@ def send_to_llm(user_input):
       - `stock_level__exact=15` (exactly 15)
     - Example: "Show products with more than 100 units" → `/api/products/?stock_level__gt=100`
     - Example: "Find products named Laptop with exactly 5 units" → `/api/products/?name__icontains=Laptop&stock_level__exact=5`
+    - Example: "What was the stock of each product at the end of January 2025?" → `/api/products/?as_of=2025-01-31`
 
 2. **For Purchases**:
 - Support filters like `date`, `supplier`, `product`, `amount`, `notes` with Django-style lookups:
@@ -82,6 +85,11 @@ def send_to_llm(user_input):
       - **Sales**: `date`, `customer`, `product`, `amount`, `notes` with all Django lookup expressions
     - Example: "Show purchases with discount" → `/api/purchases/?notes__icontains=discount`
     - Example: "Show sales to customer Ali" → `/api/sales/?customer__icontains=Ali`
+    - For totals, averages or counts use the aggregate report instead of listing rows:
+      `/api/reports/aggregate/?source=sales|purchases&group_by=...&measures=...`
+      with `group_by` among `product`, `supplier` (purchases), `customer` (sales), `day`,
+      `week`, `month`, `year`, `measures` among `sum`, `count`, `avg`, plus any filter above.
+    - Example: "Total sales per product per month" → `/api/reports/aggregate/?source=sales&group_by=product,month&measures=sum`
 
     6. **Schema Details**:  
     - Here’s what you need to know about the schemas:  
@@ -274,48 +282,47 @@ def parse_and_store_tasks(llm_response):
     return tasks
 
 
-def confirm_and_execute_tasks(tasks):
+def task_operation(task):
     """
-    Executes API requests for given tasks.
+    Returns the batch operation of a task: GET tasks send their filters (or
+    payload) as query parameters, the others their payload as the body.
     """
-    for task in tasks:
-        api_action = task["api_action"]
-        payload = task["payload"]
-        filters = task.get("filters", {})
+    method, endpoint = task["api_action"].split(" ", 1)
+    path, _, query = endpoint.partition("?")
+    params = dict(parse_qsl(query))
+    if method == "GET":
+        params.update(task.get("filters") or task.get("payload") or {})
+        return {"method": method, "path": path, "params": params}
+    body = None if method == "DELETE" else task.get("payload", {})
+    return {"method": method, "path": path, "params": params, "body": body}
 
-        # Execute the API request
-        execute_api_request(api_action, payload, filters)
-        print(f"Executed: {api_action} with payload {payload} and filters {filters}")
 
-
-def execute_api_request(api_action, payload, filters=None):
+def confirm_and_execute_tasks(tasks):
     """
-    Executes the API request based on the provided action, payload, and filters.
+    Executes the given tasks with one batch API request and one transaction:
+    either every task takes effect or none does.
     """
-    method, endpoint = api_action.split(" ", 1)  # Split into HTTP method and endpoint
-    base_url = "http://127.0.0.1:8000"
-
+    operations = [task_operation(task) for task in tasks]
     try:
-        if method == "GET":
-            # For GET requests, use filters as query parameters, fallback to payload
-            query_params = filters if filters else payload
-            response = requests.get(base_url + endpoint, params=query_params)
-        elif method == "POST":
-            response = requests.post(base_url + endpoint, json=payload)
-        elif method in ["PUT", "PATCH"]:
-            response = requests.put(base_url + endpoint, json=payload)
-        elif method == "DELETE":
-            response = requests.delete(base_url + endpoint)
-
-        # Check for errors in the API response
-        if response.status_code == 429:
-            raise Exception(f"Rate Limited: API quota reached. Please try again later.")
-        elif response.status_code not in [200, 201, 204]:
-            raise Exception(f"API request failed: {response.text}")
-
-    except Exception as e:
+        response = run_batch("http://127.0.0.1:8000", operations)
+    except requests.RequestException as e:
         raise Exception(f"Error executing API request: {str(e)}")
 
+    if response.status_code == 429:
+        raise Exception("Rate Limited: API quota reached. Please try again later.")
+    if response.status_code != 200:
+        # The failed operation ended the batch: report its error
+        body = response.json()
+        if isinstance(body, dict) and body.get("results"):
+            detail = json.dumps(body["results"][-1]["body"])
+        else:
+            detail = response.text
+        raise Exception(f"Error executing API request: API request failed: {detail}")
+
+    for task, operation in zip(tasks, operations):
+        print(f"Executed: {task['api_action']} with {operation}")
+    return response.json()["results"]
+
 
 # Main Function to Orchestrate the Workflow
 def process_user_input(user_input):
@@ -0,0 +1,130 @@
+"""
+Stock annotations for Product querysets.
+
+``annotate_stock`` is the single place that adds ``purchased_amount``,
+``sold_amount`` and ``stock_level`` to a queryset; the product filters and
+the viewset all go through it, and it is a no-op on a queryset that already
+carries the annotations.
+
+Two sources are available:
+
+* ``"counters"`` (default) reads the materialized ``ProductStock`` row, one
+  joined row per product.
+* ``"history"`` recomputes the totals from the transaction tables with
+  correlated ``Subquery`` aggregates. Each subquery is an indexed range scan
+  over one product's rows, so the cost grows linearly with the number of
+  transactions, unlike a join of both reverse relations which multiplies
+  purchases by sales for every product.
+
+After a period close (see archive.py) the history is the opening balances of
+the latest closed period plus the live transactions dated after it.
+
+With ``as_of`` the values are those at the end of that day: the latest stock
+snapshot on or before it plus the transactions dated after the snapshot,
+including archived ones when that range reaches into a closed period.
+"""
+
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from . import archive, snapshots
+from .models import Purchase, Sale, StockSnapshot
+
+STOCK_ANNOTATIONS = ("purchased_amount", "sold_amount", "stock_level")
+
+
+def history_total(model, product_ref="pk", after=None, until=None):
+    """
+    Correlated subquery summing ``model.amount`` for the outer product,
+    optionally limited to the dates in (``after``, ``until``].
+    """
+    rows = model.objects.filter(product=OuterRef(product_ref))
+    if after is not None:
+        rows = rows.filter(date__gt=after)
+    if until is not None:
+        rows = rows.filter(date__lte=until)
+    total = (
+        rows.order_by()
+        .values("product")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    return Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+
+def counter_expressions():
+    """Stock expressions read from the materialized counters."""
+    return {
+        "purchased_amount": Coalesce(F("stock__purchased"), Value(0)),
+        "sold_amount": Coalesce(F("stock__sold"), Value(0)),
+        "stock_level": Coalesce(F("stock__on_hand"), Value(0)),
+    }
+
+
+def snapshot_value(column, date):
+    """Correlated subquery reading ``column`` of the outer product's snapshot."""
+    snapshot = StockSnapshot.objects.filter(product=OuterRef("pk"), date=date).values(
+        column
+    )
+    return Coalesce(Subquery(snapshot, output_field=IntegerField()), Value(0))
+
+
+def history_expressions():
+    """Stock expressions recomputed from the transaction history."""
+    closed = archive.closed_through()
+    expressions = {}
+    for name, model, column in (
+        ("purchased_amount", Purchase, "purchased"),
+        ("sold_amount", Sale, "sold"),
+    ):
+        if closed is None:
+            expressions[name] = history_total(model)
+        else:
+            # Opening balance plus the open period
+            expressions[name] = snapshot_value(column, closed) + history_total(
+                model, after=closed
+            )
+    return expressions
+
+
+def as_of_expressions(as_of):
+    """Stock expressions at the end of day ``as_of``."""
+    snapshot_date = snapshots.latest_date(as_of)
+    closed = archive.closed_through()
+    expressions = {}
+    for name, model, column in (
+        ("purchased_amount", Purchase, "purchased"),
+        ("sold_amount", Sale, "sold"),
+    ):
+        since = history_total(model, after=snapshot_date, until=as_of)
+        if closed is not None and (snapshot_date is None or snapshot_date < closed):
+            # Rows of the closed period may already be archived
+            since = since + history_total(
+                archive.archive_model(model), after=snapshot_date, until=as_of
+            )
+        if snapshot_date is None:
+            expressions[name] = since
+        else:
+            expressions[name] = snapshot_value(column, snapshot_date) + since
+    return expressions
+
+
+def annotate_stock(queryset, source="counters", as_of=None):
+    """
+    Annotate a Product queryset with purchased_amount, sold_amount and
+    stock_level, currently or as of the end of day ``as_of``. Applying it
+    again to an annotated queryset is a no-op.
+    """
+    if "stock_level" in queryset.query.annotations:
+        return queryset
+    if as_of is not None:
+        return queryset.annotate(**as_of_expressions(as_of)).annotate(
+            stock_level=F("purchased_amount") - F("sold_amount")
+        )
+    if source == "counters":
+        return queryset.annotate(**counter_expressions())
+    if source == "history":
+        return queryset.annotate(**history_expressions()).annotate(
+            stock_level=F("purchased_amount") - F("sold_amount")
+        )
+    raise ValueError(f"Unknown stock source: {source!r}")
@@ -0,0 +1,118 @@
+"""
+Period closing.
+
+Closing the period through a date makes the purchases and sales dated on or
+before it final and moves them out of the live tables:
+
+1. A ``PeriodClose`` row records the date and the stock snapshot of that
+   date is written: the opening balances of the next period.
+2. The closed rows are copied to ``ArchivedPurchase``/``ArchivedSale`` and
+   deleted from the live tables, a chunk per transaction.
+
+Moving a row is not a stock movement, so the counters, the daily rollup and
+the snapshots are left as they are. Stock recomputed from the history is the
+opening balances plus the live rows dated after the close, and as-of queries
+inside a closed period read the archive tables (see annotations.py). Writes
+dated in a closed period are rejected, so the opening balances never change.
+
+A row is in exactly one of the two tables at any time, so an interrupted
+close is resumed by closing the same date again.
+"""
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+
+from . import snapshots, versions
+
+# Rows moved per transaction
+CHUNK_SIZE = 1000
+
+ARCHIVES = {
+    "purchase": "ArchivedPurchase",
+    "sale": "ArchivedSale",
+}
+
+
+def archive_model(model):
+    """Return the archive model of Purchase or Sale."""
+    return apps.get_model("products", ARCHIVES[model._meta.model_name])
+
+
+def closed_through():
+    """Return the date the latest closed period ends on, or None."""
+    return (
+        apps.get_model("products", "PeriodClose")
+        .objects.order_by("-closed_through")
+        .values_list("closed_through", flat=True)
+        .first()
+    )
+
+
+def check_open(movements):
+    """Raise ``ValidationError`` if a movement is dated in a closed period."""
+    dates = [movement.date for movement in movements if movement.amount]
+    if not dates:
+        return
+    closed = closed_through()
+    if closed is not None and min(dates) <= closed:
+        raise ValidationError(
+            f"The period through {closed} is closed; "
+            f"transactions dated {min(dates)} can no longer change."
+        )
+
+
+def record_close(through):
+    """
+    Record the close of the period through ``through`` and write its
+    opening balances. Closing the latest closed date again is a no-op.
+    """
+    closed = closed_through()
+    if closed is not None and through < closed:
+        raise ValidationError(f"The period through {closed} is already closed.")
+    if through == closed:
+        return
+    with transaction.atomic():
+        apps.get_model("products", "PeriodClose").objects.create(closed_through=through)
+        snapshots.take(through)
+
+
+def archive_rows(model, through, chunk_size=CHUNK_SIZE):
+    """
+    Move the rows of ``model`` (Purchase or Sale) dated on or before
+    ``through`` to its archive table and return the number moved.
+    """
+    Archive = archive_model(model)
+    fields = [field.attname for field in Archive._meta.concrete_fields]
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                model.objects.filter(date__lte=through)
+                .order_by("date", "id")
+                .values(*fields)[:chunk_size]
+            )
+            if not rows:
+                return moved
+            Archive.objects.bulk_create([Archive(**row) for row in rows])
+            # The plain QuerySet.delete(): archiving must not fold the rows
+            # out of the stock counters
+            models.QuerySet.delete(
+                model.objects.filter(pk__in=[row["id"] for row in rows])
+            )
+            versions.bump(model)
+        moved += len(rows)
+
+
+def close(through, chunk_size=CHUNK_SIZE):
+    """
+    Close the period through ``through`` and return the number of archived
+    rows per model name.
+    """
+    record_close(through)
+    return {
+        model_name: archive_rows(
+            apps.get_model("products", model_name), through, chunk_size
+        )
+        for model_name in ("Purchase", "Sale")
+    }
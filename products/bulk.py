@@ -0,0 +1,195 @@
+"""
+Bulk ingestion of purchases and sales.
+
+Rows are validated field by field without database access, then checked per
+batch: product existence with one query, ``unique_together`` with one query
+per chunk of (product, date) pairs, and (for sales) stock with one counter
+read per product. Valid rows are written with ``bulk_create`` in a single
+transaction, whose stock counter update re-checks availability atomically.
+"""
+
+from itertools import groupby
+from operator import itemgetter
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from rest_framework import serializers
+
+from .models import Product, ProductStock, Purchase
+from .serializers import BulkPurchaseRowSerializer, BulkSaleRowSerializer
+
+# Rows per INSERT statement
+BATCH_SIZE = 1000
+# Ids per IN (...) clause, well below SQLite's variable limit
+LOOKUP_CHUNK = 500
+
+
+def _chunks(items, size=LOOKUP_CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def party_field(model):
+    """Return the counterparty column of a Purchase/Sale model."""
+    return "supplier" if model is Purchase else "customer"
+
+
+def row_serializer(model):
+    return BulkPurchaseRowSerializer() if model is Purchase else BulkSaleRowSerializer()
+
+
+class BatchValidator:
+    """
+    Validates rows for ``model`` and collects per-row errors.
+
+    ``errors`` maps the row index to a serializer-style error dict.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.party = party_field(model)
+        self.errors = {}
+
+    def add_error(self, index, message, field="non_field_errors"):
+        self.errors.setdefault(index, {}).setdefault(field, []).append(message)
+
+    def validate(self, rows, start=0):
+        """
+        Validate ``rows`` and return the list of (index, instance) pairs that
+        can be written. Indexes are numbered from ``start``.
+        """
+        valid = self._validate_fields(rows, start)
+        valid = self._check_products(valid)
+        valid = self._check_unique(valid)
+        if self.model is not Purchase:
+            valid = self._check_stock(valid)
+        return valid
+
+    def _validate_fields(self, rows, start):
+        serializer = row_serializer(self.model)
+        valid = []
+        for index, row in enumerate(rows, start):
+            try:
+                data = serializer.run_validation(row)
+            except serializers.ValidationError as e:
+                detail = e.detail
+                if not isinstance(detail, dict):
+                    detail = {"non_field_errors": detail}
+                self.errors[index] = detail
+                continue
+            data["product_id"] = data.pop("product")
+            valid.append((index, self.model(**data)))
+        return valid
+
+    def _check_products(self, valid):
+        wanted = {obj.product_id for _, obj in valid}
+        existing = set()
+        for chunk in _chunks(wanted):
+            existing.update(
+                Product.objects.filter(pk__in=chunk).values_list("pk", flat=True)
+            )
+        kept = []
+        for index, obj in valid:
+            if obj.product_id in existing:
+                kept.append((index, obj))
+            else:
+                self.add_error(
+                    index, f'Invalid pk "{obj.product_id}" - object does not exist.', "product"
+                )
+        return kept
+
+    def _check_unique(self, valid):
+        # Like the database and Model.validate_unique, rows without a
+        # counterparty are never duplicates
+        keys = {
+            (obj.product_id, obj.date)
+            for _, obj in valid
+            if getattr(obj, self.party) is not None
+        }
+
+        # Only the (product, date) pairs of the batch, so the probe does not
+        # grow with the history of the products or the spread of the dates
+        taken = set()
+        for chunk in _chunks(sorted(keys)):
+            condition = Q()
+            for product_id, pairs in groupby(chunk, key=itemgetter(0)):
+                condition |= Q(product_id=product_id, date__in=[day for _, day in pairs])
+            taken.update(
+                self.model.objects.filter(condition).values_list(
+                    "product_id", "date", self.party
+                )
+            )
+
+        kept = []
+        for index, obj in valid:
+            key = (obj.product_id, obj.date, getattr(obj, self.party))
+            if key[2] is None:
+                kept.append((index, obj))
+            elif key in taken:
+                self.add_error(
+                    index,
+                    f"The fields product, date, {self.party} must make a unique set.",
+                )
+            else:
+                taken.add(key)
+                kept.append((index, obj))
+        return kept
+
+    def _check_stock(self, valid):
+        product_ids = {obj.product_id for _, obj in valid}
+        available = {}
+        units = {}
+        for chunk in _chunks(product_ids):
+            available.update(
+                ProductStock.objects.filter(product_id__in=chunk).values_list(
+                    "product_id", "on_hand"
+                )
+            )
+            units.update(Product.objects.filter(pk__in=chunk).values_list("pk", "unit"))
+
+        kept = []
+        for index, obj in valid:
+            left = available.get(obj.product_id, 0)
+            if obj.amount > left:
+                unit = units[obj.product_id]
+                self.add_error(
+                    index, f"Cannot sell {obj.amount} {unit}. Only {left} {unit} available."
+                )
+            else:
+                available[obj.product_id] = left - obj.amount
+                kept.append((index, obj))
+        return kept
+
+
+def write(model, instances):
+    """Write validated instances in one transaction."""
+    with transaction.atomic():
+        model.objects.bulk_create(instances, batch_size=BATCH_SIZE)
+
+
+def ingest(model, rows, atomic=False):
+    """
+    Validate and write ``rows`` (dicts in the API's field format).
+
+    Returns ``(created, errors)`` where ``errors`` is a list of
+    ``{"index": ..., "errors": {...}}`` sorted by row index. With ``atomic``
+    nothing is written when any row is invalid.
+    """
+    validator = BatchValidator(model)
+    valid = validator.validate(rows)
+    instances = [obj for _, obj in valid]
+    if instances and not (atomic and validator.errors):
+        try:
+            write(model, instances)
+        except ValidationError as e:
+            # Stock was taken concurrently between the check and the write
+            return 0, [{"index": None, "errors": {"non_field_errors": e.messages}}]
+    else:
+        instances = []
+    errors = [
+        {"index": index, "errors": detail}
+        for index, detail in sorted(validator.errors.items())
+    ]
+    return len(instances), errors
@@ -0,0 +1,123 @@
+"""
+Arrow IPC responses for list endpoints.
+
+A client sending ``Accept: application/vnd.apache.arrow.stream`` gets a list
+as an Arrow record batch stream instead of a JSON array. The columns are
+built straight from ``values_list`` tuples and typed from the model fields
+(or the annotations' output fields), so the server creates no per-row dicts
+and the client reads the stream into a DataFrame without parsing it.
+
+Paginated lists carry the ``next`` URL in the schema metadata, where the
+response cache keeps it along with the table.
+
+pyarrow is optional: without it the format is not offered and such requests
+are answered with 406 Not Acceptable.
+"""
+
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+FORMAT = "arrow"
+
+# Rows per record batch written to the stream
+BATCH_ROWS = 65536
+
+NEXT_KEY = b"next"
+
+
+def available():
+    return pa is not None
+
+
+def _arrow_types():
+    integer = pa.int64()
+    return {
+        "AutoField": integer,
+        "BigAutoField": integer,
+        "SmallAutoField": integer,
+        "IntegerField": integer,
+        "BigIntegerField": integer,
+        "SmallIntegerField": integer,
+        "PositiveIntegerField": integer,
+        "PositiveBigIntegerField": integer,
+        "PositiveSmallIntegerField": integer,
+        "FloatField": pa.float64(),
+        "BooleanField": pa.bool_(),
+        "CharField": pa.string(),
+        "TextField": pa.string(),
+        "DateField": pa.date32(),
+    }
+
+
+def arrow_type(queryset, name):
+    """
+    Return the Arrow type of column ``name`` of ``queryset``, or None to let
+    pyarrow infer it from the values.
+    """
+    try:
+        field = queryset.model._meta.get_field(name)
+    except FieldDoesNotExist:
+        annotation = queryset.query.annotations.get(name)
+        if annotation is None:
+            return None
+        field = annotation.output_field
+    if field.is_relation:
+        field = field.target_field
+    internal_type = field.get_internal_type()
+    if internal_type == "DateTimeField":
+        # Read back from the database in UTC
+        return pa.timestamp("us", tz="UTC")
+    if internal_type == "DecimalField":
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    return _arrow_types().get(internal_type)
+
+
+def table(queryset, fields, rows, next_link=None):
+    """
+    Build a table of ``fields`` from ``rows``, tuples in field order, typed
+    from ``queryset``'s model and annotations.
+    """
+    columns = list(zip(*rows)) or [()] * len(fields)
+    arrays = [
+        pa.array(values, type=arrow_type(queryset, name))
+        for name, values in zip(fields, columns)
+    ]
+    metadata = {NEXT_KEY: next_link.encode()} if next_link else None
+    return pa.Table.from_arrays(arrays, names=list(fields), metadata=metadata)
+
+
+class ArrowRenderer(BaseRenderer):
+    """
+    Writes a ``pyarrow.Table`` (or a list of row dicts) as an IPC stream.
+    Error payloads are written as JSON.
+    """
+
+    media_type = MEDIA_TYPE
+    format = FORMAT
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        response = (renderer_context or {}).get("response")
+        if response is not None and response.exception:
+            return json.dumps(data, cls=DjangoJSONEncoder).encode()
+        if not isinstance(data, pa.Table):
+            data = pa.Table.from_pylist(data if isinstance(data, list) else [data])
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, data.schema) as writer:
+            writer.write_table(data, max_chunksize=BATCH_ROWS)
+        return sink.getvalue().to_pybytes()
+
+
+RENDERERS = [ArrowRenderer] if available() else []
@@ -0,0 +1,113 @@
+"""
+Streaming CSV/NDJSON exports and JSON lists.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` and written
+to a ``StreamingHttpResponse`` one line at a time, so memory use does not
+depend on the number of exported rows and the first byte is sent as soon as
+the first chunk is fetched.
+
+Streamed JSON lists (``?stream=1``) are written a chunk of rows at a time:
+each chunk is encoded by the API's JSON renderer and its brackets are
+replaced by the separators of one array spanning the whole response.
+"""
+
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+from .fastjson import FastJSONRenderer
+
+# Rows fetched from the database cursor at a time
+CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class _ExportRenderer(BaseRenderer):
+    """
+    Lets DRF's ``?format=`` negotiation accept the export formats. Successful
+    exports bypass rendering; only error payloads go through ``render``.
+    """
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode(self.charset)
+
+
+class CSVRenderer(_ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONRenderer(_ExportRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value, for ``csv.writer``."""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, fields, chunk_size=CHUNK_SIZE):
+    """Yield tuples of ``fields`` from the queryset without caching it."""
+    return (
+        queryset.prefetch_related(None)
+        .values_list(*fields)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def iter_csv(queryset, fields, chunk_size=CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in iter_rows(queryset, fields, chunk_size):
+        yield writer.writerow(row)
+
+
+def iter_ndjson(queryset, fields, chunk_size=CHUNK_SIZE):
+    encoder = DjangoJSONEncoder()
+    for row in iter_rows(queryset, fields, chunk_size):
+        yield encoder.encode(dict(zip(fields, row))) + "\n"
+
+
+EXPORTERS = {"csv": iter_csv, "ndjson": iter_ndjson}
+
+
+def iter_json_array(rows, chunk_size=CHUNK_SIZE):
+    """Yield the JSON array of the dicts ``rows`` a chunk at a time."""
+    renderer = FastJSONRenderer()
+    rows = iter(rows)
+    separator = b"["
+    while chunk := list(islice(rows, chunk_size)):
+        # Strip the chunk's own brackets
+        yield separator + renderer.render(chunk)[1:-1]
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+def stream_response(rows, chunk_size=CHUNK_SIZE):
+    """Return a streaming response listing a ``values()`` queryset as JSON."""
+    return StreamingHttpResponse(
+        iter_json_array(rows.iterator(chunk_size=chunk_size), chunk_size),
+        content_type="application/json",
+    )
+
+
+def export_response(queryset, fields, fmt, filename):
+    """Return a streaming response exporting ``fields`` of every row."""
+    response = StreamingHttpResponse(
+        EXPORTERS[fmt](queryset, fields), content_type=CONTENT_TYPES[fmt]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
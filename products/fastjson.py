@@ -0,0 +1,68 @@
+"""
+Fast JSON rendering and parsing for the API.
+
+``FastJSONRenderer`` and ``FastJSONParser`` are drop-in replacements for
+DRF's ``JSONRenderer`` and ``JSONParser`` backed by orjson, which encodes
+dates, datetimes and UUIDs natively and builds the bytes without an
+intermediate ``str``. Everything else orjson cannot encode (``Decimal``,
+lazy strings, ``timedelta``, ...) goes through DRF's own encoder, so the
+output is the same as the stock renderer's. Indented output, as the
+browsable API asks for, is left to the stock renderer.
+
+orjson is optional: without it both classes behave exactly like their DRF
+base classes.
+"""
+
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Line and paragraph separators, escaped like DRF does for embedding in JS
+_SEPARATORS = (("\u2028".encode(), b"\\u2028"), ("\u2029".encode(), b"\\u2029"))
+
+_encoder = encoders.JSONEncoder()
+
+
+def available():
+    return orjson is not None
+
+
+def dumps(data):
+    """Encode ``data`` as compact JSON bytes like DRF's renderer does."""
+    ret = orjson.dumps(
+        data,
+        default=_encoder.default,
+        option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+    )
+    for separator, escaped in _SEPARATORS:
+        if separator in ret:
+            ret = ret.replace(separator, escaped)
+    return ret
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            # orjson rejects NaN and Infinity, like the strict stock parser
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
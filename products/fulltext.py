@@ -0,0 +1,115 @@
+"""
+Full-text search backed by SQLite FTS5.
+
+Product names/notes and purchase/sale counterparties/notes are indexed in
+external-content FTS5 tables (``<table>_fts``, migration 0005) that triggers
+keep in sync with every insert, update and delete, bulk writes included.
+Matches are found through the index instead of scanning the table with
+``LIKE '%x%'``, and can be ranked with ``bm25()``.
+
+Queries are tokenized like the index (Unicode words, case and diacritics
+folded) and every token is matched as a prefix, so ``"lap pro"`` finds
+"Laptop Pro 14". On other database backends the same filters fall back to
+``icontains`` on each token.
+
+SQLite drops a table's triggers when Django rebuilds it to alter a column;
+a migration that alters an indexed table must recreate them.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Indexed columns per model
+FTS_COLUMNS = {
+    "product": ("name", "notes"),
+    "purchase": ("supplier", "notes"),
+    "sale": ("customer", "notes"),
+}
+
+# Searchable without an index (``icontains``), like on other backends
+UNINDEXED_COLUMNS = {
+    "archivedpurchase": FTS_COLUMNS["purchase"],
+    "archivedsale": FTS_COLUMNS["sale"],
+}
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(text or "")
+
+
+def fts_table(model):
+    return f"{model._meta.db_table}_fts"
+
+
+def available(queryset):
+    return (
+        queryset.model._meta.model_name in FTS_COLUMNS
+        and connections[queryset.db].vendor == "sqlite"
+    )
+
+
+def text_filters_enabled():
+    """Whether the ``icontains`` text filters should go through the index."""
+    return getattr(settings, "FTS_TEXT_FILTERS", False)
+
+
+def build_query(tokens, columns=None):
+    """
+    Build an FTS5 query matching every token as a prefix, optionally limited
+    to ``columns``: ``{supplier} : ("acme"* "co"*)``.
+    """
+    query = " ".join(f'"{token}"*' for token in tokens)
+    if columns:
+        query = f"{{{' '.join(columns)}}} : ({query})"
+    return query
+
+
+def _fallback(queryset, tokens, columns):
+    for token in tokens:
+        condition = Q()
+        for column in columns:
+            condition |= Q(**{f"{column}__icontains": token})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def match(queryset, text, columns=None, rank=False):
+    """
+    Filter ``queryset`` to the rows whose ``columns`` (default: all indexed
+    columns) contain every word of ``text`` as a word prefix.
+
+    With ``rank`` the rows are annotated with ``search_rank`` (bm25, lower is
+    better) and ordered by it.
+    """
+    model = queryset.model
+    model_name = model._meta.model_name
+    columns = tuple(
+        columns or FTS_COLUMNS.get(model_name) or UNINDEXED_COLUMNS[model_name]
+    )
+    tokens = tokenize(text)
+    if not tokens:
+        # Nothing the index can match on, e.g. only punctuation
+        return _fallback(queryset, [text], columns)
+    if not available(queryset):
+        return _fallback(queryset, tokens, columns)
+
+    fts = fts_table(model)
+    query = build_query(tokens, columns)
+    queryset = queryset.filter(
+        pk__in=RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [query])
+    )
+    if rank:
+        pk = f'"{model._meta.db_table}"."{model._meta.pk.column}"'
+        queryset = queryset.annotate(
+            search_rank=RawSQL(
+                f"SELECT bm25({fts}) FROM {fts} WHERE {fts} MATCH %s AND rowid = {pk}",
+                [query],
+            )
+        ).order_by("search_rank", "pk")
+    return queryset
@@ -0,0 +1,137 @@
+"""
+Per-product movement history in date order.
+
+A product's purchases (positive) and sales (negative) are combined with
+``UNION ALL`` and the running stock balance is computed in the same query by
+a ``SUM() OVER (ORDER BY date, source_order, id)`` window, so a client never
+has to fetch both lists and stitch them together.
+
+The window only runs over the rows returned: each table is narrowed to the
+date range and to the rows after the page cursor, and the balance starts
+from an opening value instead of the product's first movement. The opening
+value is the balance carried in the cursor, or the stock at the end of the
+day before the range (see ``annotate_stock(as_of=...)``), so every page costs
+the same whatever its position in the history.
+
+Unlike the movement ledger, which is in recording order, backdated
+transactions appear at their date here.
+"""
+
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import connection
+
+from . import archive
+from .annotations import annotate_stock
+
+# Row order; ``balance`` rides along in the cursor as the next page's opening
+ORDERING = ("date", "source_order", "id", "balance")
+
+# (model, source, source order, sign); purchases before sales of a day
+SOURCES = (
+    ("Purchase", "purchase", 0, 1),
+    ("Sale", "sale", 1, -1),
+)
+
+
+def _tables(include_archived):
+    for model_name, source, order, sign in SOURCES:
+        models = [apps.get_model("products", model_name)]
+        if include_archived:
+            models.append(archive.archive_model(models[0]))
+        for model in models:
+            yield model._meta.db_table, source, order, sign
+
+
+def _after(order, cursor):
+    """Keyset condition (date, order, id) > cursor for a table of one order."""
+    day, cursor_order, pk = cursor[:3]
+    day = connection.ops.adapt_datefield_value(day)
+    if order > cursor_order:
+        return "date >= %s", [day]
+    if order < cursor_order:
+        return "date > %s", [day]
+    return "(date > %s OR (date = %s AND id > %s))", [day, day, pk]
+
+
+def opening_balance(product_id, start):
+    """Return the product's stock at the end of the day before ``start``."""
+    return (
+        annotate_stock(
+            apps.get_model("products", "Product").objects.filter(pk=product_id),
+            as_of=start - timedelta(days=1),
+        )
+        .values_list("stock_level", flat=True)
+        .get()
+    )
+
+
+def rows(
+    product_id, start=None, end=None, after=None, limit=None, include_archived=False
+):
+    """
+    Return the product's movements dated in [``start``, ``end``] as dicts of
+    ``id``, ``date``, ``source``, ``source_order``, ``quantity`` and the
+    running ``balance``, in date order.
+
+    ``after`` is a cursor, the ``ORDERING`` values of the previous page's
+    last row. Without ``include_archived`` the history starts after the
+    latest closed period, from its opening balance.
+    """
+    if not include_archived:
+        closed = archive.closed_through()
+        if closed is not None and (start is None or start <= closed):
+            start = closed + timedelta(days=1)
+
+    if after is not None:
+        opening = after[3]
+    elif start is not None:
+        opening = opening_balance(product_id, start)
+    else:
+        opening = 0
+
+    selects = []
+    params = []
+    for table, source, order, sign in _tables(include_archived):
+        conditions = ["product_id = %s"]
+        params_part = [product_id]
+        if start is not None:
+            conditions.append("date >= %s")
+            params_part.append(connection.ops.adapt_datefield_value(start))
+        if end is not None:
+            conditions.append("date <= %s")
+            params_part.append(connection.ops.adapt_datefield_value(end))
+        if after is not None:
+            condition, values = _after(order, after)
+            conditions.append(condition)
+            params_part += values
+        selects.append(
+            f"SELECT id, date, '{source}' AS source, {order} AS source_order, "
+            f"{sign} * amount AS quantity FROM {table} "
+            f"WHERE {' AND '.join(conditions)}"
+        )
+        params += params_part
+
+    movements = " UNION ALL ".join(selects)
+    order_by = "ORDER BY date, source_order, id"
+    if limit is not None:
+        movements = f"SELECT * FROM ({movements}) AS movements {order_by} LIMIT %s"
+        params.append(limit)
+    sql = (
+        f"SELECT id, date, source, source_order, quantity, "
+        f"%s + SUM(quantity) OVER ({order_by} ROWS UNBOUNDED PRECEDING) AS balance "
+        f"FROM ({movements}) AS page {order_by}"
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [opening, *params])
+        columns = [column[0] for column in cursor.description]
+        date_field = apps.get_model("products", "Purchase")._meta.get_field("date")
+        result = []
+        for row in cursor.fetchall():
+            row = dict(zip(columns, row))
+            # Raw rows come back as the backend's date type, e.g. str on SQLite
+            row["date"] = date_field.to_python(row["date"])
+            result.append(row)
+        return result
@@ -0,0 +1,139 @@
+"""
+Append-only inventory movement ledger.
+
+Every Purchase/Sale write appends one ``StockMovement`` per changed row: the
+signed quantity (positive into stock), its source (``"purchase"``/``"sale"``
+and the row id) and the product's running balance after it. Entries are
+never updated or deleted: changing a transaction's amount appends the
+difference, moving it to another product or date appends a reversal and a
+new entry, and removing it appends its reversal.
+
+Entries are appended by ``stock.apply_movements`` inside the writing
+transaction, after the product's counter row has been updated: the counter
+already holds the balance after the write, so the running balances need no
+read of earlier entries, and writers of the same product are serialized.
+
+The ledger is in recording order. A product's movement history is one range
+of its (product, id) index, and its stock after any entry is that entry's
+``balance``.
+"""
+
+import heapq
+from collections import defaultdict
+from itertools import groupby
+
+from django.apps import apps
+
+# Rows per INSERT statement
+BATCH_SIZE = 1000
+# Products per IN (...) clause
+LOOKUP_CHUNK = 500
+
+# (source, model, direction) of every transaction table, archived included
+TABLES = (
+    ("purchase", "Purchase", 1),
+    ("sale", "Sale", -1),
+    ("purchase", "ArchivedPurchase", 1),
+    ("sale", "ArchivedSale", -1),
+)
+
+
+def _ledger(registry=apps):
+    return registry.get_model("products", "StockMovement")
+
+
+def append(model, movements):
+    """Append the movements of a Purchase/Sale write to the ledger."""
+    source = model._meta.model_name
+    direction = 1 if source == "purchase" else -1
+
+    # Per row; a row rewritten with the same product, date and amount nets out
+    net = defaultdict(int)
+    for movement in movements:
+        net[movement.product_id, movement.source_id, movement.date] += movement.amount
+    entries = [(key, direction * amount) for key, amount in net.items() if amount]
+    if not entries:
+        return
+
+    written = defaultdict(int)
+    for (product_id, _, _), quantity in entries:
+        written[product_id] += quantity
+    product_ids = sorted(written)
+    balance = defaultdict(int)
+    counters = apps.get_model("products", "ProductStock").objects
+    for start in range(0, len(product_ids), LOOKUP_CHUNK):
+        balance.update(
+            counters.filter(
+                product_id__in=product_ids[start : start + LOOKUP_CHUNK]
+            ).values_list("product_id", "on_hand")
+        )
+    # The counters include this write: start from the balance before it
+    for product_id, quantity in written.items():
+        balance[product_id] -= quantity
+
+    Ledger = _ledger()
+    rows = []
+    for (product_id, source_id, date), quantity in entries:
+        balance[product_id] += quantity
+        rows.append(
+            Ledger(
+                product_id=product_id,
+                date=date,
+                quantity=quantity,
+                source=source,
+                source_id=source_id,
+                balance=balance[product_id],
+            )
+        )
+    Ledger.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+def _rows(model, source, direction):
+    """Yield (product_id, date, order, id, source, quantity) of ``model``."""
+    rows = model.objects.order_by("product_id", "date", "id").values_list(
+        "product_id", "date", "id", "amount"
+    )
+    # Purchases before sales of the same day
+    order = 0 if direction > 0 else 1
+    for product_id, date, pk, amount in rows.iterator(chunk_size=BATCH_SIZE):
+        yield product_id, date, order, pk, source, direction * amount
+
+
+def backfill(registry=apps):
+    """
+    Write the ledger of the existing transaction history, in (date, id)
+    order per product, and return the number of entries. For an empty
+    ledger only: entries are otherwise never rewritten.
+    """
+    Ledger = _ledger(registry)
+    streams = []
+    for source, model_name, direction in TABLES:
+        try:
+            model = registry.get_model("products", model_name)
+        except LookupError:
+            # Historical model states before the archive tables
+            continue
+        streams.append(_rows(model, source, direction))
+
+    written = 0
+    batch = []
+    for product_id, rows in groupby(heapq.merge(*streams), key=lambda row: row[0]):
+        balance = 0
+        for _, date, _, source_id, source, quantity in rows:
+            balance += quantity
+            batch.append(
+                Ledger(
+                    product_id=product_id,
+                    date=date,
+                    quantity=quantity,
+                    source=source,
+                    source_id=source_id,
+                    balance=balance,
+                )
+            )
+            if len(batch) >= BATCH_SIZE:
+                Ledger.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+    Ledger.objects.bulk_create(batch)
+    return written + len(batch)
@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from products import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Close the period through a date: write the opening balances of the next "
+        "period and move the purchases and sales dated on or before it to the "
+        "archive tables. Run it again with the same date to resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--through",
+            required=True,
+            help="Last day of the closed period as YYYY-MM-DD",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=archive.CHUNK_SIZE,
+            help=f"Rows moved per transaction (default: {archive.CHUNK_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            through = date.fromisoformat(options["through"])
+        except ValueError:
+            raise CommandError(f"Invalid date: {options['through']}")
+        if through >= date.today():
+            raise CommandError("Only periods that have ended can be closed.")
+
+        try:
+            moved = archive.close(through, chunk_size=options["chunk_size"])
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Closed the period through {through}: archived "
+                f"{moved['Purchase']} purchases and {moved['Sale']} sales."
+            )
+        )
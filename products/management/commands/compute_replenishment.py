@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products import replenishment
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute average demand, demand variability, days of cover, reorder point "
+        "and suggested order quantity for every product from its recent daily sales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--window",
+            type=int,
+            default=replenishment.WINDOW_DAYS,
+            help=f"Days of sales history (default: {replenishment.WINDOW_DAYS})",
+        )
+        parser.add_argument(
+            "--lead-time",
+            type=int,
+            default=replenishment.LEAD_TIME_DAYS,
+            help=f"Days from order to delivery (default: {replenishment.LEAD_TIME_DAYS})",
+        )
+        parser.add_argument(
+            "--review",
+            type=int,
+            default=replenishment.REVIEW_DAYS,
+            help=f"Days between orders (default: {replenishment.REVIEW_DAYS})",
+        )
+        parser.add_argument(
+            "--service-level",
+            type=float,
+            default=replenishment.SERVICE_LEVEL,
+            help=f"Target in-stock probability (default: {replenishment.SERVICE_LEVEL})",
+        )
+
+    def handle(self, *args, **options):
+        if options["window"] < 1 or options["lead_time"] < 0 or options["review"] < 0:
+            raise CommandError(
+                "Window must be positive, lead time and review not negative."
+            )
+        if not 0.5 <= options["service_level"] < 1:
+            raise CommandError("Service level must be in [0.5, 1).")
+
+        products = replenishment.refresh(
+            window=options["window"],
+            lead_time=options["lead_time"],
+            review=options["review"],
+            service_level=options["service_level"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Computed replenishment metrics for {products} products."
+            )
+        )
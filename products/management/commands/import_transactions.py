@@ -0,0 +1,140 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from products.bulk import BatchValidator, write
+from products.models import Product, Purchase, Sale
+
+MODELS = {"purchases": Purchase, "sales": Sale}
+
+
+def read_rows(path, fmt):
+    """Yield one dict per data row of a CSV or NDJSON file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def resolve_products(rows, product_ids):
+    """
+    Replace product names with ids using an in-memory name -> id map. Rows
+    may also carry a ``product_id`` column directly.
+    """
+    for row in rows:
+        if row.get("product_id") not in (None, ""):
+            row["product"] = row.pop("product_id")
+        else:
+            name = row.get("product")
+            # Unknown names are left as-is and reported by the validator
+            row["product"] = product_ids.get(name, name)
+        yield row
+
+
+def chunked(rows, size):
+    """Yield lists of at most ``size`` rows."""
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream purchases or sales from a CSV or NDJSON file into the database, "
+        "committing each chunk with bulk_create in its own transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(MODELS))
+        parser.add_argument("path", help="CSV or NDJSON file to import")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ndjson"],
+            help="File format (default: inferred from the file extension)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Rows validated and committed per transaction (default: 5000)",
+        )
+        parser.add_argument(
+            "--offset",
+            type=int,
+            default=0,
+            help="Skip this many data rows, to resume an interrupted import",
+        )
+        parser.add_argument(
+            "--errors",
+            help="Write rejected rows as NDJSON to this file (default: stderr summary)",
+        )
+
+    def handle(self, *args, **options):
+        model = MODELS[options["kind"]]
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+        fmt = options["format"] or ("csv" if path.suffix.lower() == ".csv" else "ndjson")
+        chunk_size = options["chunk_size"]
+        offset = options["offset"]
+
+        product_ids = dict(Product.objects.values_list("name", "pk"))
+        rows = resolve_products(
+            islice(read_rows(path, fmt), offset, None), product_ids
+        )
+        errors_file = open(options["errors"], "a") if options["errors"] else None
+
+        created = failed = 0
+        position = offset
+        started = time.perf_counter()
+        try:
+            for chunk in chunked(rows, chunk_size):
+                validator = BatchValidator(model)
+                valid = validator.validate(chunk, start=position)
+                try:
+                    write(model, [obj for _, obj in valid])
+                except ValidationError as e:
+                    raise CommandError(
+                        f"Chunk starting at row {position} rejected: {'; '.join(e.messages)}. "
+                        f"Resume with --offset {position}."
+                    )
+                self._report_errors(validator.errors, chunk, position, errors_file)
+
+                created += len(valid)
+                failed += len(validator.errors)
+                position += len(chunk)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"offset {position}: {created} created, {failed} rejected, "
+                    f"{(position - offset) / elapsed:,.0f} rows/sec"
+                )
+        except KeyboardInterrupt:
+            raise CommandError(f"Interrupted. Resume with --offset {position}.")
+        finally:
+            if errors_file:
+                errors_file.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {created} {options['kind']} ({failed} rejected) "
+                f"in {time.perf_counter() - started:.1f}s."
+            )
+        )
+
+    def _report_errors(self, errors, chunk, start, errors_file):
+        for index, detail in sorted(errors.items()):
+            if errors_file:
+                errors_file.write(
+                    json.dumps({"row": index, "data": chunk[index - start], "errors": detail})
+                    + "\n"
+                )
+            else:
+                self.stderr.write(f"row {index}: {json.dumps(detail)}")
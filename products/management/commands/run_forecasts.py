@@ -0,0 +1,46 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products import forecasting
+
+
+class Command(BaseCommand):
+    help = (
+        "Fit moving average, exponential smoothing and seasonal naive forecasts "
+        "for the products sold since the last run (or all products with --full)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Refit every product sold in the history window",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processes fitting product chunks in parallel (default: CPU count)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=forecasting.CHUNK_SIZE,
+            help=f"Products per chunk (default: {forecasting.CHUNK_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("Workers and chunk size must be positive.")
+
+        forecast_run = forecasting.run(
+            full=options["full"],
+            workers=options["workers"],
+            chunk_size=options["chunk_size"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Fitted forecasts for {forecast_run.products} products."
+            )
+        )
@@ -0,0 +1,31 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from products import snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the stock snapshot of every product at the end of a day (today by "
+        "default), for as-of stock queries. Run it e.g. at every month end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Snapshot date as YYYY-MM-DD (default: today)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options["date"]) if options["date"] else date.today()
+        except ValueError:
+            raise CommandError(f"Invalid date: {options['date']}")
+
+        with transaction.atomic():
+            rows = snapshots.take(day)
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote the {day} snapshot of {rows} products.")
+        )
@@ -0,0 +1,77 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def _total(model):
+    """Correlated subquery summing ``model.amount`` for the outer product."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(product=OuterRef("pk"))
+            .order_by()
+            .values("product")
+            .annotate(total=Sum("amount"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def backfill_stock(apps, schema_editor):
+    """Compute the initial counters from the existing transaction history."""
+    Product = apps.get_model("products", "Product")
+    ProductStock = apps.get_model("products", "ProductStock")
+    Purchase = apps.get_model("products", "Purchase")
+    Sale = apps.get_model("products", "Sale")
+
+    rows = Product.objects.annotate(
+        purchased=_total(Purchase), sold=_total(Sale)
+    ).values_list("pk", "purchased", "sold")
+    ProductStock.objects.bulk_create(
+        [
+            ProductStock(
+                product_id=pk, purchased=purchased, sold=sold, on_hand=purchased - sold
+            )
+            for pk, purchased, sold in rows.iterator(chunk_size=2000)
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="purchase",
+            name="amount",
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name="sale",
+            name="amount",
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.CreateModel(
+            name="ProductStock",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stock",
+                        serialize=False,
+                        to="products.product",
+                    ),
+                ),
+                ("purchased", models.BigIntegerField(default=0)),
+                ("sold", models.BigIntegerField(default=0)),
+                ("on_hand", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_stock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0002_productstock"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["name", "id"], name="product_name_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="purchase",
+            index=models.Index(fields=["date", "id"], name="purchase_date_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="sale",
+            index=models.Index(fields=["date", "id"], name="sale_date_id_idx"),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# (table, indexed columns) of the external-content FTS5 indexes
+FTS_INDEXES = [
+    ("products_product", ("name", "notes")),
+    ("products_purchase", ("supplier", "notes")),
+    ("products_sale", ("customer", "notes")),
+]
+
+
+def create_sql(table, columns):
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def drop_sql(table, columns):
+    fts = f"{table}_fts"
+    return [f"DROP TRIGGER IF EXISTS {fts}_{suffix}" for suffix in ("ai", "ad", "au")] + [
+        f"DROP TABLE IF EXISTS {fts}"
+    ]
+
+
+def run(builder):
+    def operation(apps, schema_editor):
+        # FTS5 is SQLite-only; other backends keep the LIKE filters
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for table, columns in FTS_INDEXES:
+            for statement in builder(table, columns):
+                schema_editor.execute(statement)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0004_tableversion"),
+    ]
+
+    operations = [
+        migrations.RunPython(run(create_sql), run(drop_sql)),
+    ]
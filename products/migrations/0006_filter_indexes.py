@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    """Give products bulk-created without a counter row an empty one."""
+    Product = apps.get_model("products", "Product")
+    ProductStock = apps.get_model("products", "ProductStock")
+    missing = Product.objects.filter(stock__isnull=True).values_list("pk", flat=True)
+    ProductStock.objects.bulk_create(
+        [ProductStock(product_id=pk) for pk in missing.iterator(chunk_size=2000)],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0005_fulltext_search"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="productstock",
+            index=models.Index(fields=["on_hand"], name="stock_on_hand_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="purchase",
+            index=models.Index(
+                fields=["supplier", "date"], name="purchase_supplier_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="purchase",
+            index=models.Index(fields=["amount"], name="purchase_amount_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="sale",
+            index=models.Index(
+                fields=["customer", "date"], name="sale_customer_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sale",
+            index=models.Index(fields=["amount"], name="sale_amount_idx"),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
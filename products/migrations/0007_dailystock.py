@@ -0,0 +1,49 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+from products import rollup
+
+
+def backfill_rollup(apps, schema_editor):
+    """Build the daily rollup from the existing transaction history."""
+    rollup.rebuild(apps)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0006_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyStock",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("purchased", models.BigIntegerField(default=0)),
+                ("sold", models.BigIntegerField(default=0)),
+                ("closing", models.BigIntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stock",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [models.Index(fields=["day"], name="daily_stock_day_idx")],
+                "unique_together": {("product", "day")},
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0008_stocksnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PeriodClose",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("closed_through", models.DateField(unique=True)),
+                ("closed_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ArchivedPurchase",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("date", models.DateField()),
+                ("amount", models.PositiveIntegerField()),
+                ("notes", models.TextField(blank=True, null=True)),
+                ("supplier", models.CharField(blank=True, max_length=255, null=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["date", "id"], name="archived_purchase_date_id_idx"
+                    ),
+                    models.Index(
+                        fields=["product", "date"], name="archived_purchase_prod_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedSale",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("date", models.DateField()),
+                ("amount", models.PositiveIntegerField()),
+                ("notes", models.TextField(blank=True, null=True)),
+                ("customer", models.CharField(blank=True, max_length=255, null=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["date", "id"], name="archived_sale_date_id_idx"
+                    ),
+                    models.Index(
+                        fields=["product", "date"], name="archived_sale_prod_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
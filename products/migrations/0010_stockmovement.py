@@ -0,0 +1,59 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+from products import ledger
+
+
+def backfill_ledger(apps, schema_editor):
+    """Write the ledger of the existing transaction history."""
+    ledger.backfill(apps)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0009_period_close"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockMovement",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("quantity", models.BigIntegerField()),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[("purchase", "Purchase"), ("sale", "Sale")],
+                        max_length=16,
+                    ),
+                ),
+                ("source_id", models.BigIntegerField()),
+                ("balance", models.BigIntegerField()),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="movements",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["product", "id"], name="movement_product_id_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
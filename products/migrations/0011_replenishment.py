@@ -0,0 +1,55 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0010_stockmovement"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Replenishment",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="replenishment",
+                        serialize=False,
+                        to="products.product",
+                    ),
+                ),
+                ("computed_at", models.DateTimeField()),
+                ("avg_daily_demand", models.FloatField()),
+                ("demand_std", models.FloatField()),
+                ("on_hand", models.BigIntegerField()),
+                ("days_of_cover", models.FloatField(null=True)),
+                ("reorder_point", models.FloatField()),
+                ("order_quantity", models.BigIntegerField()),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name="dailystock",
+            name="daily_stock_day_idx",
+        ),
+        migrations.AddIndex(
+            model_name="dailystock",
+            index=models.Index(
+                fields=["day", "product", "sold"], name="daily_stock_day_sold_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="replenishment",
+            index=models.Index(
+                fields=["days_of_cover"], name="replenishment_cover_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="replenishment",
+            index=models.Index(
+                fields=["order_quantity"], name="replenishment_order_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,68 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0011_replenishment"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ForecastRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("generated_at", models.DateTimeField()),
+                ("ledger_mark", models.BigIntegerField()),
+                ("products", models.PositiveIntegerField()),
+                ("full", models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Forecast",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "method",
+                    models.CharField(
+                        choices=[
+                            ("moving_average", "Moving average"),
+                            ("exponential_smoothing", "Simple exponential smoothing"),
+                            ("seasonal_naive", "Seasonal naive"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                ("start", models.DateField()),
+                ("values", models.JSONField()),
+                ("generated_at", models.DateTimeField()),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="forecasts",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("product", "method")},
+            },
+        ),
+    ]
@@ -1,6 +1,51 @@
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Sum
 from django.core.exceptions import ValidationError
+from .stock import (
+    Movement,
+    apply_movements,
+    ensure_counters,
+    get_counters,
+    row_movements,
+)
+from . import versions
+
+
+class ProductQuerySet(models.QuerySet):
+    """
+    QuerySet for Product that bumps the table change versions on bulk writes.
+    Deleting products cascades to their purchases and sales.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Create the products and their (empty) stock counter rows, so every
+        product has one and stock filters can join the counters strictly.
+        """
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            pks = [obj.pk for obj in objs]
+            if None in pks:  # Ignored conflicts leave pks unset
+                pks = self.filter(stock__isnull=True).values_list("pk", flat=True)
+            ProductStock.objects.using(self.db).bulk_create(
+                [ProductStock(product_id=pk) for pk in pks], ignore_conflicts=True
+            )
+        versions.bump(self.model, using=self.db)
+        return objs
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        versions.bump(self.model, using=self.db)
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        result = super().delete()
+        versions.bump(self.model, Purchase, Sale, using=self.db)
+        return result
+
+    delete.alters_data = True
 
 
 class Product(models.Model):
@@ -12,25 +57,338 @@ class Product(models.Model):
     )  # Unit of measurement (e.g., pieces, kilograms)
     notes = models.TextField(blank=True, null=True)  # Editable notes about product
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=["name", "id"], name="product_name_id_idx"),
+        ]
+
+    def stock_counters(self):
+        """Return the materialized (purchased, sold, on_hand) counters for this product."""
+        return get_counters(self.pk)
+
     def purchased_amount(self):
-        """Calculate total purchased amount for this product using database aggregation."""
-        return self.purchases.aggregate(total=models.Sum("amount"))["total"] or 0
+        """Total purchased amount for this product, read from its stock counters."""
+        return self.stock_counters()[0]
 
     def sold_amount(self):
-        """Calculate total sold amount for this product using database aggregation."""
-        return self.sales.aggregate(total=models.Sum("amount"))["total"] or 0
+        """Total sold amount for this product, read from its stock counters."""
+        return self.stock_counters()[1]
 
     def stock_level(self):
-        """Calculate current stock level (purchased - sold) using database aggregation."""
-        purchased = self.purchases.aggregate(total=models.Sum("amount"))["total"] or 0
-        sold = self.sales.aggregate(total=models.Sum("amount"))["total"] or 0
-        return purchased - sold
+        """Current stock level (purchased - sold), read from its stock counters."""
+        return self.stock_counters()[2]
+
+    def save(self, *args, **kwargs):
+        """
+        Create the product's stock counter row alongside the product itself.
+        """
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            ensure_counters(self.pk)
+            versions.bump(Product)
+
+    def delete(self, *args, **kwargs):
+        """
+        Delete the product; its purchases and sales are deleted with it.
+        """
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            versions.bump(Product, Purchase, Sale)
+        return result
 
     def __str__(self):
         return f"{self.name} ({self.unit})"
 
 
-class Purchase(models.Model):
+class TableVersion(models.Model):
+    """
+    Monotonically increasing change version of a table, see versions.py.
+    """
+
+    table = models.CharField(max_length=64, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+
+class ProductStock(models.Model):
+    """
+    Denormalized stock counters for a product.
+
+    Maintained in the same transaction as every Purchase/Sale write so that
+    stock reads never have to re-sum the transaction history.
+    """
+
+    product = models.OneToOneField(
+        "Product", on_delete=models.CASCADE, primary_key=True, related_name="stock"
+    )
+    purchased = models.BigIntegerField(default=0)
+    sold = models.BigIntegerField(default=0)
+    on_hand = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # stock_level filters
+            models.Index(fields=["on_hand"], name="stock_on_hand_idx"),
+        ]
+
+    def __str__(self):
+        return f"Stock of {self.product_id}: {self.on_hand}"
+
+
+class DailyStock(models.Model):
+    """
+    Purchased and sold units of a product on one day and its closing balance
+    at the end of that day; one row per product and day with movements.
+
+    Maintained from the same movements as ``ProductStock``, see rollup.py.
+    """
+
+    product = models.ForeignKey(
+        "Product", on_delete=models.CASCADE, related_name="daily_stock"
+    )
+    day = models.DateField()
+    purchased = models.BigIntegerField(default=0)
+    sold = models.BigIntegerField(default=0)
+    closing = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("product", "day")
+        indexes = [
+            # All-product time series; covers the sales read of a
+            # replenishment run, which sums ``sold`` per product over a range
+            models.Index(
+                fields=["day", "product", "sold"], name="daily_stock_day_sold_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Stock of {self.product_id} on {self.day}: {self.closing}"
+
+
+class StockSnapshot(models.Model):
+    """
+    Purchased and sold totals and stock of a product at the end of ``date``.
+
+    Written for every product by the ``snapshot_stock`` command and kept
+    exact under backdated writes, see snapshots.py.
+    """
+
+    product = models.ForeignKey(
+        "Product", on_delete=models.CASCADE, related_name="snapshots"
+    )
+    date = models.DateField()
+    purchased = models.BigIntegerField(default=0)
+    sold = models.BigIntegerField(default=0)
+    on_hand = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("product", "date")
+        indexes = [
+            # Latest snapshot on or before a date
+            models.Index(fields=["date"], name="snapshot_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"Stock of {self.product_id} at {self.date}: {self.on_hand}"
+
+
+class Replenishment(models.Model):
+    """
+    Replenishment metrics of a product, computed from its recent daily sales
+    for all products at once, see replenishment.py.
+    """
+
+    product = models.OneToOneField(
+        "Product",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="replenishment",
+    )
+    computed_at = models.DateTimeField()
+    avg_daily_demand = models.FloatField()
+    demand_std = models.FloatField()
+    on_hand = models.BigIntegerField()
+    # None without recent demand: the stock lasts indefinitely
+    days_of_cover = models.FloatField(null=True)
+    reorder_point = models.FloatField()
+    order_quantity = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            # days_of_cover lookups
+            models.Index(fields=["days_of_cover"], name="replenishment_cover_idx"),
+            # Products to order
+            models.Index(fields=["order_quantity"], name="replenishment_order_idx"),
+        ]
+
+    def __str__(self):
+        return f"Replenishment of {self.product_id}: order {self.order_quantity}"
+
+
+class Forecast(models.Model):
+    """
+    Daily sales forecast of a product by one method, ``values[i]`` being the
+    units expected on ``start + i`` days. See forecasting.py.
+    """
+
+    METHODS = [
+        ("moving_average", "Moving average"),
+        ("exponential_smoothing", "Simple exponential smoothing"),
+        ("seasonal_naive", "Seasonal naive"),
+    ]
+
+    product = models.ForeignKey(
+        "Product", on_delete=models.CASCADE, related_name="forecasts"
+    )
+    method = models.CharField(max_length=32, choices=METHODS)
+    start = models.DateField()
+    values = models.JSONField()
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("product", "method")
+
+    def __str__(self):
+        return f"{self.method} forecast of {self.product_id} from {self.start}"
+
+
+class ForecastRun(models.Model):
+    """
+    A forecasting run. ``ledger_mark`` is the last movement ledger entry it
+    saw: the next incremental run refits the products sold after it.
+    """
+
+    generated_at = models.DateTimeField()
+    ledger_mark = models.BigIntegerField()
+    products = models.PositiveIntegerField()
+    full = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"Forecast run of {self.products} products at {self.generated_at}"
+
+
+class StockMovement(models.Model):
+    """
+    An entry of the append-only movement ledger: a signed change of a
+    product's stock caused by a purchase or sale row, and the product's
+    balance after it. See ledger.py.
+    """
+
+    SOURCES = [("purchase", "Purchase"), ("sale", "Sale")]
+
+    product = models.ForeignKey(
+        "Product", on_delete=models.CASCADE, related_name="movements"
+    )
+    date = models.DateField()
+    quantity = models.BigIntegerField()
+    source = models.CharField(max_length=16, choices=SOURCES)
+    source_id = models.BigIntegerField()
+    balance = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            # A product's movements in recording order
+            models.Index(fields=["product", "id"], name="movement_product_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity:+} {self.product_id} ({self.source} {self.source_id})"
+
+
+class TransactionQuerySet(models.QuerySet):
+    """
+    QuerySet for Purchase/Sale that keeps the stock counters in sync on the
+    bulk paths which bypass ``Model.save()`` and ``Model.delete()``.
+    """
+
+    # Fields whose change moves stock between products or days
+    stock_fields = {"product", "product_id", "date", "amount"}
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if kwargs.get("ignore_conflicts") or kwargs.get("update_conflicts"):
+            raise ValueError(
+                "bulk_create() with conflict handling would bypass the stock counters."
+            )
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            apply_movements(self.model, [obj.movement() for obj in objs])
+            versions.bump(self.model, using=self.db)
+        return objs
+
+    def update(self, **kwargs):
+        if not self.stock_fields.intersection(kwargs):
+            rows = super().update(**kwargs)
+            versions.bump(self.model, using=self.db)
+            return rows
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list("pk", flat=True))
+            changed = self.model._base_manager.using(self.db).filter(pk__in=pks)
+            before = row_movements(changed, sign=-1)
+            rows = super().update(**kwargs)
+            apply_movements(self.model, before + row_movements(changed))
+            versions.bump(self.model, using=self.db)
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            removed = row_movements(self, sign=-1)
+            result = super().delete()
+            apply_movements(self.model, removed)
+            versions.bump(self.model, using=self.db)
+        return result
+
+    delete.alters_data = True
+
+
+class StockTransaction(models.Model):
+    """
+    Shared behaviour of Purchase and Sale: every write is folded into the
+    product's stock counters within the same database transaction.
+    """
+
+    objects = TransactionQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def movement(self, sign=1):
+        """Return this row's effect on stock as a signed movement."""
+        return Movement(self.product_id, self.date, sign * self.amount, self.pk)
+
+    def stored_movements(self, sign=1):
+        """Return the movement of the row as currently stored in the database."""
+        if self.pk is None:
+            return []
+        return row_movements(type(self)._base_manager.filter(pk=self.pk), sign=sign)
+
+    def save(self, *args, **kwargs):
+        """
+        Override the save method to enforce validation before saving.
+        """
+        self.full_clean()  # Run all validations
+        with transaction.atomic():
+            previous = self.stored_movements(sign=-1)
+            super().save(*args, **kwargs)
+            apply_movements(type(self), previous + [self.movement()])
+            versions.bump(type(self))
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            removed = self.stored_movements(sign=-1)
+            result = super().delete(*args, **kwargs)
+            apply_movements(type(self), removed)
+            versions.bump(type(self))
+        return result
+
+
+class Purchase(StockTransaction):
     date = models.DateField(db_index=True)  # Add index for filtering by date
     supplier = models.CharField(max_length=255, blank=True, null=True)
     product = models.ForeignKey(
@@ -41,6 +399,14 @@ class Purchase(models.Model):
 
     class Meta:
         unique_together = ("product", "date", "supplier")  # Prevent duplicate purchases
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=["date", "id"], name="purchase_date_id_idx"),
+            # supplier__exact, optionally with a date range
+            models.Index(fields=["supplier", "date"], name="purchase_supplier_date_idx"),
+            # amount lookups
+            models.Index(fields=["amount"], name="purchase_amount_idx"),
+        ]
 
     def clean(self):
         """
@@ -50,18 +416,11 @@ class Purchase(models.Model):
         if self.amount <= 0:
             raise ValidationError("Purchase amount must be greater than zero.")
 
-    def save(self, *args, **kwargs):
-        """
-        Override the save method to enforce validation before saving.
-        """
-        self.full_clean()  # Run all validations
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return f"Purchase of {self.product.name} on {self.date}"
 
 
-class Sale(models.Model):
+class Sale(StockTransaction):
     date = models.DateField(db_index=True)  # Add index for filtering by date
     customer = models.CharField(max_length=255, blank=True, null=True)
     product = models.ForeignKey(
@@ -72,6 +431,14 @@ class Sale(models.Model):
 
     class Meta:
         unique_together = ("product", "date", "customer")  # Prevent duplicate sales
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=["date", "id"], name="sale_date_id_idx"),
+            # customer__exact, optionally with a date range
+            models.Index(fields=["customer", "date"], name="sale_customer_date_idx"),
+            # amount lookups
+            models.Index(fields=["amount"], name="sale_amount_idx"),
+        ]
 
     def clean(self):
         """
@@ -81,19 +448,70 @@ class Sale(models.Model):
         if self.amount <= 0:
             raise ValidationError("Sale amount must be greater than zero.")
 
-        # Ensure the sale amount does not exceed the product's stock level
-        if self.product.stock_level() < self.amount:
-            raise ValidationError(
-                f"Cannot sell {self.amount} {self.product.unit}. "
-                f"Only {self.product.stock_level()} {self.product.unit} available."
-            )
-
-    def save(self, *args, **kwargs):
-        """
-        Override the save method to enforce validation before saving.
-        """
-        self.full_clean()  # Run all validations
-        super().save(*args, **kwargs)
+        # Stock availability is checked atomically when the sale is written,
+        # see stock.apply_movements.
 
     def __str__(self):
         return f"Sale of {self.product.name} on {self.date}"
+
+
+class PeriodClose(models.Model):
+    """
+    A closed accounting period. Transactions dated on or before
+    ``closed_through`` are final: they are moved to the archive tables and
+    the stock snapshot of that date holds the opening balances of the next
+    period, see archive.py.
+    """
+
+    closed_through = models.DateField(unique=True)
+    closed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Closed through {self.closed_through}"
+
+
+class ArchivedTransaction(models.Model):
+    """
+    A purchase or sale of a closed period. Rows keep the id they had in the
+    live table and are not stock movements: moving them here leaves the
+    counters, the rollup and the snapshots unchanged.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    date = models.DateField()
+    product = models.ForeignKey("Product", on_delete=models.CASCADE, related_name="+")
+    amount = models.PositiveIntegerField()
+    notes = models.TextField(blank=True, null=True)
+
+    class Meta:
+        abstract = True
+
+
+class ArchivedPurchase(ArchivedTransaction):
+    supplier = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=["date", "id"], name="archived_purchase_date_id_idx"),
+            # Stock of a product as of a date inside a closed period
+            models.Index(fields=["product", "date"], name="archived_purchase_prod_idx"),
+        ]
+
+    def __str__(self):
+        return f"Archived purchase {self.pk} on {self.date}"
+
+
+class ArchivedSale(ArchivedTransaction):
+    customer = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=["date", "id"], name="archived_sale_date_id_idx"),
+            # Stock of a product as of a date inside a closed period
+            models.Index(fields=["product", "date"], name="archived_sale_prod_idx"),
+        ]
+
+    def __str__(self):
+        return f"Archived sale {self.pk} on {self.date}"
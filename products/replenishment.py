@@ -0,0 +1,154 @@
+"""
+Replenishment metrics for all products at once.
+
+The daily sales of the last ``window`` days come from the daily rollup,
+reduced to per-product sums (units and squared units) in one grouped query,
+and every metric is then computed with pandas/NumPy column arithmetic over
+all products together; nothing loops per product. Days without sales count
+as zero demand.
+
+* ``avg_daily_demand``: mean units sold per day.
+* ``demand_std``: sample standard deviation of the daily units sold.
+* ``days_of_cover``: days the current stock lasts at the average demand,
+  None without demand.
+* ``reorder_point``: demand over the lead time plus safety stock,
+  ``z * demand_std * sqrt(lead_time)`` for the service level's ``z``.
+* ``order_quantity``: at or below the reorder point, the units that bring the
+  stock up to the demand over lead time and review period plus safety stock;
+  0 above it.
+
+``refresh`` replaces the ``Replenishment`` table with the result.
+"""
+
+import math
+from datetime import timedelta
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import versions
+from .models import DailyStock, Product, ProductStock, Replenishment
+
+# Days of sales history
+WINDOW_DAYS = 90
+# Days between ordering and receiving stock
+LEAD_TIME_DAYS = 7
+# Days between two orders
+REVIEW_DAYS = 14
+# Probability of not running out during the lead time
+SERVICE_LEVEL = 0.95
+
+
+def _frame(rows, columns):
+    return pd.DataFrame.from_records(list(rows), columns=columns, index=columns[0])
+
+
+def load(window=WINDOW_DAYS, today=None):
+    """
+    Return a frame indexed by product id with the ``on_hand`` stock and the
+    ``units`` and ``squares`` sold over the last ``window`` days.
+    """
+    today = today or timezone.localdate()
+    sales = (
+        DailyStock.objects.filter(
+            day__gt=today - timedelta(days=window), day__lte=today, sold__gt=0
+        )
+        .order_by()
+        .values_list("product_id")
+        .annotate(units=Sum("sold"), squares=Sum(F("sold") * F("sold")))
+    )
+    frame = _frame(Product.objects.values_list("pk"), ["product"])
+    frame = frame.join(
+        _frame(
+            ProductStock.objects.values_list("product_id", "on_hand"),
+            ["product", "on_hand"],
+        )
+    ).join(_frame(sales, ["product", "units", "squares"]))
+    return frame.fillna(0).astype("int64")
+
+
+def compute(
+    frame,
+    window=WINDOW_DAYS,
+    lead_time=LEAD_TIME_DAYS,
+    review=REVIEW_DAYS,
+    service_level=SERVICE_LEVEL,
+):
+    """Add the replenishment metrics to a frame returned by ``load``."""
+    z = NormalDist().inv_cdf(service_level)
+    on_hand = frame["on_hand"].to_numpy(dtype="float64")
+    mean = frame["units"].to_numpy(dtype="float64") / window
+    # Sample variance from the sums; rounding can take it a hair below zero
+    squares = frame["squares"].to_numpy(dtype="float64")
+    variance = (squares - window * mean**2) / max(window - 1, 1)
+    std = np.sqrt(np.clip(variance, 0, None))
+    safety = z * std * math.sqrt(lead_time)
+
+    result = frame.assign(
+        avg_daily_demand=mean,
+        demand_std=std,
+        days_of_cover=np.divide(
+            on_hand, mean, out=np.full_like(mean, np.nan), where=mean > 0
+        ),
+        reorder_point=mean * lead_time + safety,
+    )
+    target = mean * (lead_time + review) + safety
+    result["order_quantity"] = np.where(
+        on_hand <= result["reorder_point"].to_numpy(),
+        np.ceil(np.clip(target - on_hand, 0, None)),
+        0,
+    ).astype("int64")
+    return result
+
+
+def save(result):
+    """Replace the Replenishment table with ``result`` and return its size."""
+    computed_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    columns = ["avg_daily_demand", "demand_std", "days_of_cover", "reorder_point"]
+    result = result.assign(**{column: result[column].round(3) for column in columns})
+    # NaN has no place in the database
+    cover = (
+        result["days_of_cover"]
+        .astype(object)
+        .where(result["days_of_cover"].notna(), None)
+    )
+    rows = zip(
+        result.index.tolist(),
+        [computed_at] * len(result),
+        result["on_hand"].tolist(),
+        result["avg_daily_demand"].tolist(),
+        result["demand_std"].tolist(),
+        cover.tolist(),
+        result["reorder_point"].tolist(),
+        result["order_quantity"].tolist(),
+    )
+    # One prepared INSERT for all rows: building 100k model instances for
+    # bulk_create() would take longer than computing the metrics
+    table = Replenishment._meta.db_table
+    sql = (
+        f"INSERT INTO {table} (product_id, computed_at, on_hand, avg_daily_demand, "
+        f"demand_std, days_of_cover, reorder_point, order_quantity) "
+        f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+    )
+    with transaction.atomic():
+        Replenishment.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+        versions.bump(Replenishment)
+    return len(result)
+
+
+def refresh(
+    window=WINDOW_DAYS,
+    lead_time=LEAD_TIME_DAYS,
+    review=REVIEW_DAYS,
+    service_level=SERVICE_LEVEL,
+    today=None,
+):
+    """Recompute the metrics of every product and return the number of rows."""
+    frame = load(window, today)
+    return save(compute(frame, window, lead_time, review, service_level))
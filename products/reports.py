@@ -0,0 +1,185 @@
+"""
+Aggregate reports over purchases and sales.
+
+A report is a single ``GROUP BY`` query: the filtered rows are grouped by the
+requested dimensions (product, counterparty, calendar period) and reduced to
+the requested measures of ``amount``, so only one row per group leaves the
+database. Sums by product and period filtered on date/product are read from
+the daily rollup instead of the transaction tables.
+"""
+
+from datetime import timedelta
+
+from django.db.models import Avg, Count, F, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek, TruncYear
+
+from . import archive
+from .bulk import party_field
+from .models import DailyStock, Purchase
+
+PERIODS = {
+    "day": TruncDay,
+    "week": TruncWeek,
+    "month": TruncMonth,
+    "year": TruncYear,
+}
+
+MEASURES = {
+    "sum": lambda field: Sum(field),
+    "count": lambda field: Count("pk"),
+    "avg": lambda field: Avg(field),
+}
+
+# Period start of a day, for time series bucketing
+PERIOD_STARTS = {
+    "day": lambda day: day,
+    "week": lambda day: day - timedelta(days=day.weekday()),
+    "month": lambda day: day.replace(day=1),
+    "year": lambda day: day.replace(month=1, day=1),
+}
+
+# Filters the daily rollup can answer, by the rollup lookup they map to
+ROLLUP_FILTERS = {
+    "date": "day",
+    "date__exact": "day__exact",
+    "date__gte": "day__gte",
+    "date__lte": "day__lte",
+    "date__gt": "day__gt",
+    "date__lt": "day__lt",
+    "product": "product",
+    "product__exact": "product__exact",
+}
+
+
+def dimensions(model):
+    """Return the group-by dimensions available for a Purchase/Sale model."""
+    return ["product", party_field(model), *PERIODS]
+
+
+def rollup_source(model, group_by, measures, filters, include_archived=False):
+    """
+    Return ``(queryset, column)`` of the daily rollup rows answering a report
+    on ``model``, or None when it needs the transaction rows: counts,
+    averages, counterparties or filters other than date/product.
+
+    ``filters`` maps the active filter names to their values. The rollup
+    keeps the days of closed periods; without ``include_archived`` they are
+    left out, like their rows are from the live tables.
+    """
+    if set(measures) != {"sum"} or party_field(model) in group_by:
+        return None
+    if not set(filters) <= ROLLUP_FILTERS.keys():
+        return None
+    column = "purchased" if model is Purchase else "sold"
+    lookups = {ROLLUP_FILTERS[name]: value for name, value in filters.items()}
+    # Days with movements of the other kind only
+    lookups[f"{column}__gt"] = 0
+    queryset = DailyStock.objects.filter(**lookups)
+    closed = None if include_archived else archive.closed_through()
+    if closed is not None:
+        queryset = queryset.filter(day__gt=closed)
+    return queryset, column
+
+
+def aggregate(queryset, group_by, measures, date_field="date", amount_field="amount"):
+    """
+    Group a Purchase/Sale (or DailyStock) queryset by ``group_by`` and return
+    the ``measures`` of each group as dicts, ordered by the group keys.
+
+    Grouping by product also returns its name as ``product_name``.
+    """
+    aggregates = {measure: MEASURES[measure](amount_field) for measure in measures}
+    if not group_by:
+        return [queryset.aggregate(**aggregates)]
+
+    columns = []
+    expressions = {}
+    for dimension in group_by:
+        if dimension in PERIODS:
+            expressions[dimension] = PERIODS[dimension](date_field)
+        elif dimension == "product":
+            columns.append("product")
+            expressions["product_name"] = F("product__name")
+        else:
+            columns.append(dimension)
+
+    return (
+        queryset.order_by()
+        .values(*columns, **expressions)
+        .annotate(**aggregates)
+        .order_by(*group_by)
+    )
+
+
+def _group_order(value):
+    # NULLs first, like the database orders them
+    return (value is not None, value)
+
+
+def aggregate_union(querysets, group_by, measures):
+    """
+    Like ``aggregate`` over the rows of several querysets of the same shape
+    (live and archived transactions). Each is grouped on its own and the
+    groups are merged; averages are recomputed from the merged sums and
+    counts.
+    """
+    if len(querysets) == 1:
+        return list(aggregate(querysets[0], group_by, measures))
+
+    partial = [measure for measure in measures if measure != "avg"]
+    if "avg" in measures:
+        partial += [measure for measure in ("sum", "count") if measure not in partial]
+    merged = {}
+    for queryset in querysets:
+        for row in aggregate(queryset, group_by, partial):
+            key = tuple(
+                (name, value) for name, value in row.items() if name not in MEASURES
+            )
+            totals = merged.setdefault(key, dict.fromkeys(partial))
+            for measure in partial:
+                if row[measure] is not None:
+                    totals[measure] = (totals[measure] or 0) + row[measure]
+
+    rows = []
+    for key, totals in merged.items():
+        row = dict(key)
+        for measure in measures:
+            if measure == "avg":
+                row[measure] = (
+                    totals["sum"] / totals["count"] if totals["count"] else None
+                )
+            else:
+                row[measure] = totals[measure]
+        rows.append(row)
+    rows.sort(key=lambda row: [_group_order(row[dimension]) for dimension in group_by])
+    return rows
+
+
+def timeseries(queryset, period="day"):
+    """
+    Yield the purchased and sold units and the closing balance of each
+    product per ``period`` from a DailyStock queryset. Periods without
+    movements are omitted; their balance is the previous closing.
+    """
+    period_start = PERIOD_STARTS[period]
+    rows = queryset.order_by("product_id", "day").values_list(
+        "product_id", "day", "purchased", "sold", "closing"
+    )
+    current = None
+    for product_id, day, purchased, sold, closing in rows.iterator():
+        key = (product_id, period_start(day))
+        if current and current["key"] == key:
+            current["purchased"] += purchased
+            current["sold"] += sold
+            current["closing"] = closing
+            continue
+        if current:
+            yield _period_row(current)
+        current = {"key": key, "purchased": purchased, "sold": sold, "closing": closing}
+    if current:
+        yield _period_row(current)
+
+
+def _period_row(current):
+    product_id, start = current.pop("key")
+    return {"product": product_id, "period": start, **current}
@@ -0,0 +1,105 @@
+"""
+Server-side cache of list responses.
+
+List payloads are stored in the ``"api"`` cache under the same signature as
+the list's ETag: the change versions of the tables the list reads, the path,
+the normalized query string and the format. A committed write bumps the
+versions, so entries of the changed tables are never read again and age out
+of the cache through its LRU bound; lists of untouched tables keep hitting.
+
+The LRU bound counts entries, not bytes, so lists longer than
+``API_CACHE_MAX_ROWS`` rows are not stored: a few full-table lists would
+otherwise fill each worker's memory.
+
+Hit and miss counts are kept per process, like the local-memory cache itself.
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+CACHE_ALIAS = "api"
+KEY_PREFIX = "list"
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+stats = _Stats()
+
+
+def enabled():
+    return getattr(settings, "API_RESPONSE_CACHE", False)
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def make_key(signature):
+    return f"{KEY_PREFIX}:{signature}"
+
+
+def lookup(signature):
+    """Return the cached payload for ``signature``, or None on a miss."""
+    data = get_cache().get(make_key(signature))
+    stats.record(data is not None)
+    return data
+
+
+def max_rows():
+    return getattr(settings, "API_CACHE_MAX_ROWS", None)
+
+
+def row_count(data):
+    """Return the number of rows of a list payload, a list, page or table."""
+    if isinstance(data, dict):
+        data = data.get("results", ())
+    return len(data)
+
+
+def store(signature, data):
+    """
+    Cache ``data`` under ``signature`` unless it has more than
+    ``API_CACHE_MAX_ROWS`` rows, and return whether it was stored.
+    """
+    limit = max_rows()
+    if limit is not None and row_count(data) > limit:
+        return False
+    get_cache().set(make_key(signature), data)
+    return True
+
+
+def clear():
+    get_cache().clear()
+    stats.reset()
+
+
+def snapshot():
+    """Return the hit/miss counters of this process."""
+    total = stats.hits + stats.misses
+    return {
+        "enabled": enabled(),
+        "hits": stats.hits,
+        "misses": stats.misses,
+        "hit_rate": round(stats.hits / total, 4) if total else None,
+        "max_entries": settings.CACHES[CACHE_ALIAS].get("OPTIONS", {}).get("MAX_ENTRIES"),
+        "max_rows": max_rows(),
+    }
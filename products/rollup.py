@@ -0,0 +1,184 @@
+"""
+Daily per-product stock rollup.
+
+``DailyStock`` holds one row per product and day with movements: the units
+purchased and sold that day and the closing balance at its end. The rows are
+folded from the same movements as the stock counters, inside the writing
+transaction, so a time series costs one row per product-day whatever the
+transaction volume.
+
+A movement on day *d* changes the closing balance of every later day of the
+product, so the product's rows are re-balanced from *d* on: one row for a
+write dated today, more for backdated writes. Products are folded in chunks
+with a fixed number of statements each, so bulk writes stay cheap.
+``stock.apply_movements`` updates the product's counter row first, which
+serializes writers of the same product for the rest of the transaction.
+"""
+
+import heapq
+from collections import defaultdict
+from itertools import groupby
+
+from django.apps import apps
+from django.db.models import Q, Sum
+
+# Rows per INSERT/UPDATE statement
+BATCH_SIZE = 1000
+# Products folded per read of the affected rows
+PRODUCT_CHUNK = 250
+
+
+def _rollup(registry=apps):
+    return registry.get_model("products", "DailyStock")
+
+
+def _chunks(items, size=PRODUCT_CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def fold(field, movements):
+    """
+    Fold movements of purchases (``field="purchased"``) or sales
+    (``field="sold"``) into the daily rollup.
+    """
+    changes = defaultdict(lambda: defaultdict(int))
+    for movement in movements:
+        changes[movement.product_id][movement.date] += movement.amount
+    changes = {
+        product_id: {day: amount for day, amount in days.items() if amount}
+        for product_id, days in changes.items()
+    }
+    changes = {product_id: days for product_id, days in changes.items() if days}
+
+    for chunk in _chunks(sorted(changes)):
+        _fold_products(field, {product_id: changes[product_id] for product_id in chunk})
+
+
+def _fold_products(field, changes):
+    """
+    Apply ``changes`` ({product_id: {day: amount}}) with a fixed number of
+    statements: read the affected rows (from each product's first changed
+    day on), merge the changes in memory and write back the difference.
+    """
+    Rollup = _rollup()
+    direction = 1 if field == "purchased" else -1
+
+    affected = Q()
+    for product_id, days in changes.items():
+        affected |= Q(product_id=product_id, day__gte=min(days))
+    old_rows = defaultdict(dict)
+    for row in Rollup.objects.filter(affected).order_by("product_id", "day"):
+        old_rows[row.product_id][row.day] = row
+
+    # The counters already include this write; the closing balance before
+    # the first changed day is needed when no later row exists to derive it
+    on_hand = dict(
+        apps.get_model("products", "ProductStock")
+        .objects.filter(product_id__in=list(changes))
+        .values_list("product_id", "on_hand")
+    )
+
+    created, updated, deleted = [], [], []
+    for product_id, days in changes.items():
+        rows = old_rows[product_id]
+        if rows:
+            first = rows[min(rows)]
+            balance = first.closing - (first.purchased - first.sold)
+        else:
+            balance = on_hand.get(product_id, 0) - direction * sum(days.values())
+
+        for day in sorted(rows.keys() | days.keys()):
+            row = rows.get(day) or Rollup(product_id=product_id, day=day)
+            setattr(row, field, getattr(row, field) + days.get(day, 0))
+            balance += row.purchased - row.sold
+            if row.pk is None:
+                row.closing = balance
+                created.append(row)
+            elif not (row.purchased or row.sold):
+                # The day's last movement was removed
+                deleted.append(row.pk)
+            elif day in days or row.closing != balance:
+                row.closing = balance
+                updated.append(row)
+
+    Rollup.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    Rollup.objects.bulk_update(
+        updated, ["purchased", "sold", "closing"], batch_size=BATCH_SIZE
+    )
+    if deleted:
+        Rollup.objects.filter(pk__in=deleted).delete()
+
+
+def _daily_totals(model, column):
+    """Yield (product_id, day, purchased, sold) per product-day of ``model``."""
+    rows = (
+        model.objects.order_by("product_id", "date")
+        .values_list("product_id", "date")
+        .annotate(total=Sum("amount"))
+    )
+    for product_id, day, total in rows.iterator(chunk_size=BATCH_SIZE):
+        if column == "purchased":
+            yield product_id, day, total, 0
+        else:
+            yield product_id, day, 0, total
+
+
+def _transaction_models(registry):
+    """Yield (model, column) of the live and archived transaction tables."""
+    for name, column in (
+        ("Purchase", "purchased"),
+        ("Sale", "sold"),
+        ("ArchivedPurchase", "purchased"),
+        ("ArchivedSale", "sold"),
+    ):
+        try:
+            yield registry.get_model("products", name), column
+        except LookupError:
+            # Historical model states before the archive tables
+            continue
+
+
+def rebuild(registry=apps):
+    """
+    Recreate the whole rollup from the transaction tables, archived ones
+    included, and return the number of rows written. Each table is read
+    once, in (product, day) order, and merged.
+    """
+    Rollup = _rollup(registry)
+
+    Rollup.objects.all().delete()
+    merged = heapq.merge(
+        *(
+            _daily_totals(model, column)
+            for model, column in _transaction_models(registry)
+        ),
+        key=lambda row: row[:2],
+    )
+
+    written = 0
+    batch = []
+    for product_id, product_rows in groupby(merged, key=lambda row: row[0]):
+        balance = 0
+        for day, day_rows in groupby(product_rows, key=lambda row: row[1]):
+            purchased = sold = 0
+            for _, _, bought, sold_units in day_rows:
+                purchased += bought
+                sold += sold_units
+            balance += purchased - sold
+            batch.append(
+                Rollup(
+                    product_id=product_id,
+                    day=day,
+                    purchased=purchased,
+                    sold=sold,
+                    closing=balance,
+                )
+            )
+            if len(batch) >= BATCH_SIZE:
+                Rollup.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+    Rollup.objects.bulk_create(batch)
+    return written + len(batch)
@@ -1,11 +1,14 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-from .models import Product, Purchase, Sale
+from .models import Forecast, Product, Purchase, Replenishment, Sale
+from . import batch, replenishment
 
 
 class ProductSerializer(serializers.ModelSerializer):
     """
     Serializer for the Product model.
-    Includes calculated fields `purchased_amount`, `sold_amount`, and `stock_level`.
+    Includes calculated fields `purchased_amount`, `sold_amount`, and `stock_level`,
+    read from the product's materialized stock counters.
     """
 
     purchased_amount = serializers.IntegerField(read_only=True)
@@ -59,6 +62,18 @@ class PurchaseSerializer(serializers.ModelSerializer):
             )
         return data
 
+    def create(self, validated_data):
+        try:
+            return super().create(validated_data)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({"non_field_errors": e.messages})
+
+    def update(self, instance, validated_data):
+        try:
+            return super().update(instance, validated_data)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({"non_field_errors": e.messages})
+
 
 class SaleSerializer(serializers.ModelSerializer):
     """
@@ -71,16 +86,153 @@ class SaleSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         """
-        Custom validation to ensure sale amount does not exceed stock level.
+        Custom validation to ensure sale amount is greater than zero.
+
+        Stock availability is not checked here: the sale is admitted by an
+        atomic check-and-decrement of the stock counter when it is saved.
         """
-        product = data.get("product")
         amount = data.get("amount")
+        if amount is not None and amount <= 0:
+            raise serializers.ValidationError("Sale amount must be greater than zero.")
+        return data
+
+    def create(self, validated_data):
+        try:
+            return super().create(validated_data)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({"non_field_errors": e.messages})
+
+    def update(self, instance, validated_data):
+        try:
+            return super().update(instance, validated_data)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({"non_field_errors": e.messages})
+
+
+class BulkPurchaseRowSerializer(PurchaseSerializer):
+    """
+    Validates one row of a bulk purchase ingest without touching the database.
+    Product existence and uniqueness are checked once per batch instead.
+    """
+
+    product = serializers.IntegerField()
+
+    class Meta(PurchaseSerializer.Meta):
+        validators = []
+
+
+class BulkSaleRowSerializer(SaleSerializer):
+    """
+    Validates one row of a bulk sale ingest without touching the database.
+    Product existence, uniqueness and stock are checked once per batch instead.
+    """
+
+    product = serializers.IntegerField()
+
+    class Meta(SaleSerializer.Meta):
+        validators = []
+
+
+class HistoryParamsSerializer(serializers.Serializer):
+    """
+    Query parameters of a product's movement history.
+    """
+
+    date__gte = serializers.DateField(required=False)
+    date__lte = serializers.DateField(required=False)
+    include_archived = serializers.BooleanField(required=False, default=False)
+
+
+class StockLookupSerializer(serializers.Serializer):
+    """
+    Body of a stock lookup: the products of a basket by id and/or name.
+    """
+
+    MAX_PRODUCTS = 1000
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        default=list,
+        max_length=MAX_PRODUCTS,
+    )
+    names = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        default=list,
+        max_length=MAX_PRODUCTS,
+    )
 
-        # Calculate stock level - stock_level is a method on Product model
-        stock_level_attr = getattr(product, "stock_level", None)
-        stock_level = stock_level_attr() if callable(stock_level_attr) else stock_level_attr
-        if amount > stock_level:
+    def validate(self, data):
+        if not data["ids"] and not data["names"]:
+            raise serializers.ValidationError("Provide product ids or names.")
+        return data
+
+
+class ReplenishmentSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the computed replenishment metrics of a product.
+    """
+
+    class Meta:
+        model = Replenishment
+        fields = [
+            "product",
+            "on_hand",
+            "avg_daily_demand",
+            "demand_std",
+            "days_of_cover",
+            "reorder_point",
+            "order_quantity",
+            "computed_at",
+        ]
+
+
+class ReplenishmentParamsSerializer(serializers.Serializer):
+    """
+    Parameters of a replenishment run.
+    """
+
+    window = serializers.IntegerField(min_value=1, default=replenishment.WINDOW_DAYS)
+    lead_time = serializers.IntegerField(
+        min_value=0, default=replenishment.LEAD_TIME_DAYS
+    )
+    review = serializers.IntegerField(min_value=0, default=replenishment.REVIEW_DAYS)
+    service_level = serializers.FloatField(
+        min_value=0.5, max_value=0.9999, default=replenishment.SERVICE_LEVEL
+    )
+
+
+class ForecastSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the stored daily sales forecasts.
+    """
+
+    class Meta:
+        model = Forecast
+        fields = ["product", "method", "start", "values", "generated_at"]
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    """
+    One operation of a batch request: an API ``path`` (with ``params`` as its
+    query string) requested with ``method`` and the JSON ``body``.
+    """
+
+    method = serializers.CharField()
+    path = serializers.CharField()
+    params = serializers.DictField(required=False, default=dict)
+    body = serializers.JSONField(required=False, allow_null=True, default=None)
+
+    def validate_method(self, value):
+        value = value.upper()
+        if value not in batch.METHODS:
             raise serializers.ValidationError(
-                f"Cannot sell {amount} {product.unit}. Only {stock_level} {product.unit} available."
+                f"Unsupported method. Choose from: {', '.join(batch.METHODS)}."
             )
-        return data
+        return value
+
+    def validate_path(self, value):
+        if not value.startswith("/"):
+            raise serializers.ValidationError("Expected an absolute path.")
+        return value
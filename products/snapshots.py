@@ -0,0 +1,142 @@
+"""
+Periodic stock snapshots.
+
+A ``StockSnapshot`` row holds a product's purchased/sold totals and stock at
+the end of a day. Stock as of any date is then the latest snapshot on or
+before it plus the transactions dated after the snapshot, a bounded range
+of each product's (product, date) index instead of its whole history.
+
+Snapshots must equal the history they summarize, so writes dated on or
+before a snapshot are folded into it like into the stock counters. Writes
+dated after the latest snapshot, the usual case, cost one index probe.
+"""
+
+from collections import defaultdict
+
+from django.apps import apps
+
+# Rows per INSERT/UPDATE statement
+BATCH_SIZE = 1000
+# Products per IN (...) clause
+LOOKUP_CHUNK = 500
+
+
+def _snapshots():
+    return apps.get_model("products", "StockSnapshot")
+
+
+def latest_date(as_of=None):
+    """
+    Return the date of the latest snapshot on or before ``as_of`` (of all
+    with None), or None.
+    """
+    rows = _snapshots().objects.all()
+    if as_of is not None:
+        rows = rows.filter(date__lte=as_of)
+    return (
+        rows.order_by("-date")
+        .values_list("date", flat=True)
+        .first()
+    )
+
+
+def fold(field, movements):
+    """
+    Fold movements of purchases (``field="purchased"``) or sales
+    (``field="sold"``) into the snapshots taken on or after their dates.
+    """
+    movements = [movement for movement in movements if movement.amount]
+    if not movements:
+        return
+    Snapshot = _snapshots()
+    dates = list(
+        Snapshot.objects.filter(date__gte=min(m.date for m in movements))
+        .order_by("date")
+        .values_list("date", flat=True)
+        .distinct()
+    )
+    if not dates:
+        return
+
+    # Amount moved on or before each snapshot date, per product
+    by_product = defaultdict(list)
+    for movement in movements:
+        by_product[movement.product_id].append(movement)
+    deltas = {}
+    for product_id, product_movements in by_product.items():
+        product_movements.sort(key=lambda movement: movement.date)
+        total = position = 0
+        for date in dates:
+            while (
+                position < len(product_movements)
+                and product_movements[position].date <= date
+            ):
+                total += product_movements[position].amount
+                position += 1
+            if total:
+                deltas[product_id, date] = total
+
+    direction = 1 if field == "purchased" else -1
+    product_ids = sorted(by_product)
+    updated = []
+    for start in range(0, len(product_ids), LOOKUP_CHUNK):
+        existing = Snapshot.objects.filter(
+            product_id__in=product_ids[start : start + LOOKUP_CHUNK], date__in=dates
+        )
+        for snapshot in existing:
+            delta = deltas.pop((snapshot.product_id, snapshot.date), 0)
+            if delta:
+                setattr(snapshot, field, getattr(snapshot, field) + delta)
+                snapshot.on_hand += direction * delta
+                updated.append(snapshot)
+    Snapshot.objects.bulk_update(
+        updated, [field, "on_hand"], batch_size=BATCH_SIZE
+    )
+    Snapshot.objects.bulk_create(
+        [
+            Snapshot(
+                product_id=product_id,
+                date=date,
+                on_hand=direction * delta,
+                **{field: delta},
+            )
+            for (product_id, date), delta in deltas.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def take(date):
+    """
+    Write the snapshot of every product at the end of ``date``, replacing any
+    earlier snapshot of that date, and return the number of rows written.
+    Computed from the previous snapshot plus the transactions since.
+    """
+    from .annotations import annotate_stock
+
+    Snapshot = _snapshots()
+    Product = apps.get_model("products", "Product")
+    Snapshot.objects.filter(date=date).delete()
+    rows = (
+        annotate_stock(Product.objects.order_by("pk"), as_of=date)
+        .values_list("pk", "purchased_amount", "sold_amount")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    written = 0
+    batch = []
+    for product_id, purchased, sold in rows:
+        batch.append(
+            Snapshot(
+                product_id=product_id,
+                date=date,
+                purchased=purchased,
+                sold=sold,
+                on_hand=purchased - sold,
+            )
+        )
+        if len(batch) >= BATCH_SIZE:
+            Snapshot.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    Snapshot.objects.bulk_create(batch)
+    return written + len(batch)
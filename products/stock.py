@@ -0,0 +1,137 @@
+"""
+Materialized stock counters.
+
+Every Purchase/Sale write is expressed as a list of signed ``Movement``s, one
+per changed row, and folded into the ``ProductStock`` row of the affected
+products, inside the transaction of the write itself. Stock reads then cost one row per product
+instead of a sum over the whole transaction history.
+
+Sales are admitted with a conditional update (``on_hand >= amount``): the
+check and the decrement are one statement that locks only the product's
+counter row, so concurrent sales can never oversell and sales of different
+products never wait on each other.
+"""
+
+from collections import defaultdict, namedtuple
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import archive, ledger, rollup, snapshots
+
+# A signed change of stock: positive when a row is added, negative when
+# removed. ``source_id`` is the id of the Purchase/Sale row.
+Movement = namedtuple(
+    "Movement", ["product_id", "date", "amount", "source_id"], defaults=[None]
+)
+
+
+def _counters():
+    return apps.get_model("products", "ProductStock").objects
+
+
+def _counter_field(model):
+    """Return the counter column a Purchase/Sale model contributes to."""
+    return "purchased" if model._meta.model_name == "purchase" else "sold"
+
+
+def get_counters(product_id):
+    """Return (purchased, sold, on_hand) for a product, zeros if it has none."""
+    row = (
+        _counters()
+        .filter(product_id=product_id)
+        .values_list("purchased", "sold", "on_hand")
+        .first()
+    )
+    return row or (0, 0, 0)
+
+
+def ensure_counters(product_id):
+    """Create an empty counter row for the product if it does not exist yet."""
+    _counters().get_or_create(product_id=product_id)
+
+
+def row_movements(queryset, sign=1):
+    """Return the movements of the rows in a Purchase/Sale queryset."""
+    rows = queryset.order_by().values_list("product_id", "date", "amount", "pk")
+    return [
+        Movement(product_id, date, sign * amount, pk)
+        for product_id, date, amount, pk in rows
+    ]
+
+
+def _adjust(product_id, field, delta, on_hand_delta):
+    updated = _counters().filter(product_id=product_id).update(
+        **{field: F(field) + delta, "on_hand": F("on_hand") + on_hand_delta}
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            _counters().create(
+                product_id=product_id, **{field: delta, "on_hand": on_hand_delta}
+            )
+    except IntegrityError:
+        # Created concurrently; the row exists now
+        _adjust(product_id, field, delta, on_hand_delta)
+
+
+def _admit_sale(product_id, requested, credited, delta):
+    """
+    Atomically take ``delta`` units out of stock, or reject the sale.
+
+    ``requested`` and ``credited`` are the amounts being sold and given back
+    by the same write; they only shape the error message.
+    """
+    admitted = (
+        _counters()
+        .filter(product_id=product_id, on_hand__gte=delta)
+        .update(sold=F("sold") + delta, on_hand=F("on_hand") - delta)
+    )
+    if admitted:
+        return
+    unit = apps.get_model("products", "Product").objects.values_list(
+        "unit", flat=True
+    ).get(pk=product_id)
+    available = get_counters(product_id)[2] + credited
+    raise ValidationError(
+        f"Cannot sell {requested} {unit}. Only {available} {unit} available."
+    )
+
+
+def apply_movements(model, movements):
+    """
+    Fold the movements of ``model`` (Purchase or Sale) into the stock counters,
+    the daily rollup and the stock snapshots, and append them to the
+    movement ledger.
+
+    Must be called inside the transaction that performed the write. A sale
+    that takes more than the available stock, or a movement dated in a closed
+    period, raises ``ValidationError`` and the caller's transaction is rolled
+    back with it.
+    """
+    archive.check_open(movements)
+    field = _counter_field(model)
+    direction = 1 if field == "purchased" else -1
+
+    added = defaultdict(int)
+    removed = defaultdict(int)
+    for movement in movements:
+        if movement.amount > 0:
+            added[movement.product_id] += movement.amount
+        else:
+            removed[movement.product_id] -= movement.amount
+
+    for product_id in sorted(added.keys() | removed.keys()):
+        delta = added[product_id] - removed[product_id]
+        if field == "sold" and delta > 0:
+            _admit_sale(product_id, added[product_id], removed[product_id], delta)
+        elif delta:
+            _adjust(product_id, field, delta, direction * delta)
+
+    # After the counter rows, whose updates serialize writers per product
+    rollup.fold(field, movements)
+    snapshots.fold(field, movements)
+    ledger.append(model, movements)
@@ -1,3 +1,1660 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import statistics
+import tempfile
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import skipIf, skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils.translation import gettext_lazy
+from django_filters import filters
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import (
+    columnar,
+    fastjson,
+    forecasting,
+    ledger,
+    replenishment,
+    reports,
+    response_cache,
+    rollup,
+)
+from .annotations import annotate_stock
+from .fastjson import FastJSONRenderer
+from .models import (
+    ArchivedPurchase,
+    ArchivedSale,
+    DailyStock,
+    Forecast,
+    ForecastRun,
+    Product,
+    ProductStock,
+    Purchase,
+    Replenishment,
+    Sale,
+    StockMovement,
+    StockSnapshot,
+)
+from .serializers import ProductSerializer, PurchaseSerializer, SaleSerializer
+from .views import (
+    DailyStockFilter,
+    ForecastFilter,
+    NumberInFilter,
+    ProductFilter,
+    PurchaseFilter,
+    ReplenishmentFilter,
+    SaleFilter,
+    SaleViewSet,
+)
+
+
+class InventoryTestCase(TestCase):
+    """
+    Clears the API response cache, which outlives each test's transaction:
+    versions restart with every test, so entries would otherwise leak.
+    """
+
+    def setUp(self):
+        response_cache.clear()
+
+
+class StockCounterTestCase(InventoryTestCase):
+    """
+    The materialized stock counters must match the transaction history after
+    every kind of write.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name="Laptop", unit="pieces")
+        self.other = Product.objects.create(name="Mouse", unit="pieces")
+
+    def assertCounters(self, product, purchased, sold):
+        self.assertEqual(product.stock_counters(), (purchased, sold, purchased - sold))
+
+    def test_save_and_delete(self):
+        purchase = Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.product, amount=10
+        )
+        sale = Sale.objects.create(
+            date=date(2025, 1, 2), customer="B", product=self.product, amount=4
+        )
+        self.assertCounters(self.product, 10, 4)
+
+        purchase.amount = 12
+        purchase.save()
+        sale.delete()
+        self.assertCounters(self.product, 12, 0)
+
+    def test_update_moves_stock_between_products(self):
+        purchase = Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.product, amount=10
+        )
+        purchase.product = self.other
+        purchase.save()
+        self.assertCounters(self.product, 0, 0)
+        self.assertCounters(self.other, 10, 0)
+
+    def test_bulk_paths(self):
+        Purchase.objects.bulk_create(
+            [
+                Purchase(date=date(2025, 1, d), supplier="A", product=self.product, amount=5)
+                for d in range(1, 5)
+            ]
+        )
+        self.assertCounters(self.product, 20, 0)
+
+        Purchase.objects.filter(date__gte=date(2025, 1, 3)).update(amount=1)
+        self.assertCounters(self.product, 12, 0)
+
+        Purchase.objects.filter(date=date(2025, 1, 1)).update(product=self.other)
+        self.assertCounters(self.product, 7, 0)
+        self.assertCounters(self.other, 5, 0)
+
+        Purchase.objects.all().delete()
+        self.assertCounters(self.product, 0, 0)
+        self.assertCounters(self.other, 0, 0)
+
+    def test_cascade_delete_removes_counters(self):
+        Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.product, amount=10
+        )
+        self.product.delete()
+        self.assertFalse(ProductStock.objects.filter(product_id=self.product.pk).exists())
+
+    def test_sale_cannot_exceed_stock(self):
+        Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.product, amount=3
+        )
+        sale = Sale.objects.create(
+            date=date(2025, 1, 2), customer="B", product=self.product, amount=3
+        )
+        with self.assertRaisesMessage(ValidationError, "Only 0 pieces available."):
+            Sale.objects.create(
+                date=date(2025, 1, 2), customer="C", product=self.product, amount=1
+            )
+
+        # Editing a sale may reuse the stock it already holds
+        sale.amount = 2
+        sale.save()
+        self.assertCounters(self.product, 3, 2)
+
+    def test_product_list_reads_counters(self):
+        Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.product, amount=5
+        )
+        Purchase.objects.create(
+            date=date(2025, 1, 2), supplier="A", product=self.product, amount=5
+        )
+        Sale.objects.create(
+            date=date(2025, 1, 3), customer="B", product=self.product, amount=5
+        )
+
+        response = APIClient().get("/api/products/", {"stock_level__gte": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(p["name"], p["purchased_amount"], p["sold_amount"], p["stock_level"]) for p in response.json()],
+            [("Laptop", 10, 5, 5)],
+        )
+
+
+class StockAnnotationTestCase(InventoryTestCase):
+    """
+    Both stock sources must agree, and repeated equal amounts must not be
+    collapsed.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name="Laptop", unit="pieces")
+        Product.objects.create(name="Mouse", unit="pieces")
+        for day in range(1, 4):
+            Purchase.objects.create(
+                date=date(2025, 1, day), supplier="A", product=self.product, amount=5
+            )
+        for day in range(1, 3):
+            Sale.objects.create(
+                date=date(2025, 1, day), customer="B", product=self.product, amount=2
+            )
+
+    def test_history_matches_counters(self):
+        fields = ("name", "purchased_amount", "sold_amount", "stock_level")
+        counters = annotate_stock(Product.objects.order_by("name")).values_list(*fields)
+        history = annotate_stock(
+            Product.objects.order_by("name"), source="history"
+        ).values_list(*fields)
+        self.assertEqual(list(history), list(counters))
+        self.assertEqual(list(counters)[0], ("Laptop", 15, 4, 11))
+
+    def test_combined_stock_filters_share_one_annotation(self):
+        filterset = ProductFilter(
+            {"stock_level__gt": 0, "max_stock_level": 11}, queryset=Product.objects.all()
+        )
+        self.assertEqual([p.name for p in filterset.qs], ["Laptop"])
+
+
+class SaleAdmissionTestCase(InventoryTestCase):
+    """
+    Sales are admitted by an atomic check-and-decrement of the stock counter,
+    so a stock check made earlier can never let a sale oversell.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name="Laptop", unit="pieces")
+        Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.product, amount=5
+        )
+
+    def test_interleaved_sales_cannot_oversell(self):
+        first = Sale(date=date(2025, 1, 2), customer="B", product=self.product, amount=4)
+        second = Sale(date=date(2025, 1, 2), customer="C", product=self.product, amount=4)
+        # Both pass validation against the same stock level...
+        first.full_clean()
+        second.full_clean()
+        # ...but only one of them can take the stock
+        first.save()
+        with self.assertRaisesMessage(
+            ValidationError, "Cannot sell 4 pieces. Only 1 pieces available."
+        ):
+            second.save()
+        self.assertEqual(self.product.stock_counters(), (5, 4, 1))
+        self.assertEqual(Sale.objects.count(), 1)
+
+    def test_api_rejects_oversell_with_same_message(self):
+        response = APIClient().post(
+            "/api/sales/",
+            {"date": "2025-01-02", "customer": "B", "product": self.product.pk, "amount": 6},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            {"non_field_errors": ["Cannot sell 6 pieces. Only 5 pieces available."]},
+        )
+        self.assertEqual(Sale.objects.count(), 0)
+
+
+class BulkIngestTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Laptop", unit="pieces")
+
+    def test_bulk_purchases_and_sales(self):
+        response = self.client.post(
+            "/api/purchases/bulk/",
+            [
+                {"date": f"2025-01-{day:02d}", "supplier": "A", "product": self.product.pk, "amount": 10}
+                for day in range(1, 11)
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {"created": 10, "failed": 0, "errors": []})
+
+        response = self.client.post(
+            "/api/sales/bulk/",
+            [
+                {"date": "2025-02-01", "customer": "B", "product": self.product.pk, "amount": 60},
+                {"date": "2025-02-01", "customer": "B", "product": self.product.pk, "amount": 1},
+                {"date": "2025-02-02", "customer": "B", "product": self.product.pk, "amount": 50},
+                {"date": "2025-02-03", "customer": "B", "product": 9999, "amount": 1},
+                {"date": "2025-02-04", "customer": "B", "product": self.product.pk, "amount": 0},
+                {"date": "2025-02-05", "customer": "B", "product": self.product.pk, "amount": 40},
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 207)
+        body = response.json()
+        self.assertEqual((body["created"], body["failed"]), (2, 4))
+        self.assertEqual([error["index"] for error in body["errors"]], [1, 2, 3, 4])
+        self.assertEqual(
+            body["errors"][1]["errors"],
+            {"non_field_errors": ["Cannot sell 50 pieces. Only 40 pieces available."]},
+        )
+        self.assertIn("product", body["errors"][2]["errors"])
+        self.assertEqual(self.product.stock_counters(), (100, 100, 0))
+
+    def test_atomic_bulk_writes_nothing_on_error(self):
+        response = self.client.post(
+            "/api/purchases/bulk/?atomic=true",
+            [
+                {"date": "2025-01-01", "supplier": "A", "product": self.product.pk, "amount": 5},
+                {"date": "2025-01-01", "supplier": "A", "product": self.product.pk, "amount": 5},
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"][0]["index"], 1)
+        self.assertEqual(Purchase.objects.count(), 0)
+
+    def test_duplicates_across_products_and_dates(self):
+        products = Product.objects.bulk_create(
+            Product(name=f"P{i}", unit="pieces") for i in range(600)
+        )
+        Purchase.objects.create(
+            date=date(2025, 12, 1), supplier="A", product=products[-1], amount=1
+        )
+        rows = [
+            {"date": f"2025-{i % 12 + 1:02d}-01", "supplier": "A", "product": product.pk, "amount": 1}
+            for i, product in enumerate(products)
+        ]
+        response = self.client.post("/api/purchases/bulk/", rows[::-1] + rows[:1], format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([error["index"] for error in response.json()["errors"]], [0, 600])
+        self.assertEqual(Purchase.objects.count(), 600)
+
+    def test_rows_without_counterparty_are_not_duplicates(self):
+        Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.product, amount=10
+        )
+        row = {"date": "2025-01-02", "customer": None, "product": self.product.pk, "amount": 1}
+        self.assertEqual(self.client.post("/api/sales/", row, format="json").status_code, 201)
+        response = self.client.post("/api/sales/bulk/", [row, row], format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["created"], 2)
+        self.assertEqual(Sale.objects.filter(customer__isnull=True).count(), 3)
+
+
+class BatchTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(name="Laptop", unit="pieces")
+            Purchase.objects.create(
+                date=date(2025, 1, 1), supplier="A", product=self.product, amount=10
+            )
+
+    def sale(self, customer, amount):
+        return {
+            "method": "post",
+            "path": "/api/sales/",
+            "body": {
+                "date": "2025-01-02",
+                "customer": customer,
+                "product": self.product.id,
+                "amount": amount,
+            },
+        }
+
+    def batch(self, operations, atomic=True):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                "/api/batch/?atomic=true" if atomic else "/api/batch/",
+                operations,
+                format="json",
+            )
+
+    def test_atomic_batch(self):
+        # Cached before the batch; reads inside it still see its writes
+        self.assertEqual(self.client.get("/api/sales/").json(), [])
+        response = self.batch(
+            [
+                self.sale("customer1", 2),
+                self.sale("customer2", 1),
+                {"method": "GET", "path": "/api/sales/"},
+                {"method": "GET", "path": f"/api/products/{self.product.id}/"},
+            ]
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertFalse(body["rolled_back"])
+        self.assertEqual(
+            [result["status"] for result in body["results"]], [201, 201, 200, 200]
+        )
+        amounts = sorted(row["amount"] for row in body["results"][2]["body"])
+        self.assertEqual(amounts, [1, 2])
+        self.assertEqual(body["results"][3]["body"]["stock_level"], 7)
+        self.assertEqual(len(self.client.get("/api/sales/").json()), 2)
+
+    def test_failure_rolls_back_atomic_batch(self):
+        response = self.batch(
+            [
+                self.sale("customer1", 2),
+                self.sale("customer2", 100),
+                self.sale("customer3", 1),
+            ]
+        )
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertTrue(body["rolled_back"])
+        self.assertEqual([result["status"] for result in body["results"]], [201, 400])
+        self.assertFalse(Sale.objects.exists())
+        self.assertEqual(self.product.stock_level(), 10)
+
+        response = self.batch(
+            [
+                self.sale("customer1", 2),
+                self.sale("customer2", 100),
+                {"method": "GET", "path": "/api/nowhere/"},
+                {"method": "POST", "path": "/api/batch/", "body": []},
+                {"method": "GET", "path": "/admin/"},
+                {"method": "POST", "path": "/delete_user/"},
+            ],
+            atomic=False,
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [result["status"] for result in response.json()["results"]],
+            [201, 400, 404, 400, 400, 400],
+        )
+        self.assertEqual(Sale.objects.count(), 1)
+
+        response = self.batch([{"method": "TRACE", "path": "/api/sales/"}])
+        self.assertEqual(response.status_code, 400)
+
+
+class StockLookupTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.laptop = Product.objects.create(name="Laptop", unit="pieces")
+            self.mouse = Product.objects.create(name="Mouse", unit="pieces")
+            Product.objects.create(name="Keyboard", unit="pieces")
+            Purchase.objects.create(
+                date=date(2025, 1, 1), supplier="A", product=self.laptop, amount=10
+            )
+            Sale.objects.create(
+                date=date(2025, 1, 2), customer="B", product=self.laptop, amount=3
+            )
+
+    def lookup(self, body):
+        return self.client.post("/api/products/stock/", body, format="json")
+
+    def test_lookup_by_ids_and_names(self):
+        with self.assertNumQueries(1):
+            response = self.lookup(
+                {"ids": [self.mouse.id, 999999, self.laptop.id], "names": ["Laptop", "Tablet"]}
+            )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            [(row["name"], row["purchased_amount"], row["sold_amount"], row["stock_level"])
+             for row in body["results"]],
+            [("Mouse", 0, 0, 0), ("Laptop", 10, 3, 7)],
+        )
+        self.assertEqual(body["missing"], {"ids": [999999], "names": ["Tablet"]})
+
+    def test_lookup_requires_products(self):
+        self.assertEqual(self.lookup({}).status_code, 400)
+        self.assertEqual(self.lookup({"ids": ["laptop"]}).status_code, 400)
+        self.assertEqual(self.client.get("/api/products/stock/").status_code, 405)
+
+
+class ImportTransactionsTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name="Laptop", unit="pieces")
+
+    def write_file(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_import_csv_in_chunks_with_offset(self):
+        lines = ["date,supplier,product,amount,notes"]
+        lines += [f"2025-01-{day:02d},A,Laptop,10," for day in range(1, 8)]
+        lines.append("2025-02-01,A,Unknown,10,")
+        path = self.write_file(".csv", "\n".join(lines) + "\n")
+
+        out, err = StringIO(), StringIO()
+        call_command(
+            "import_transactions", "purchases", path,
+            "--chunk-size", "3", "--offset", "2", stdout=out, stderr=err,
+        )
+        self.assertEqual(Purchase.objects.count(), 5)
+        self.assertEqual(self.product.stock_counters(), (50, 0, 50))
+        self.assertIn("Imported 5 purchases (1 rejected)", out.getvalue())
+        self.assertIn("row 7:", err.getvalue())
+
+    def test_import_ndjson_sales(self):
+        Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.product, amount=5
+        )
+        path = self.write_file(
+            ".ndjson",
+            '{"date": "2025-01-02", "customer": "B", "product": "Laptop", "amount": 3}\n'
+            '{"date": "2025-01-03", "customer": "B", "product": "Laptop", "amount": 3}\n',
+        )
+        call_command("import_transactions", "sales", path, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(self.product.stock_counters(), (5, 3, 2))
+
+    def test_import_rows_without_supplier(self):
+        row = '{"date": "2025-01-02", "supplier": null, "product": "Laptop", "amount": 3}\n'
+        path = self.write_file(".ndjson", row * 2)
+        call_command("import_transactions", "purchases", path, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(self.product.stock_counters(), (6, 0, 6))
+
+
+class ExportTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Laptop", unit="pieces")
+        for day in range(1, 4):
+            Purchase.objects.create(
+                date=date(2025, 1, day), supplier=f"S{day}", product=self.product, amount=day
+            )
+
+    def test_csv_export_applies_filterset(self):
+        response = self.client.get("/api/purchases/export/", {"format": "csv", "amount__gte": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,date,supplier,product,amount,notes")
+        self.assertEqual(
+            [line.split(",")[1:5] for line in lines[1:]],
+            [["2025-01-02", "S2", str(self.product.pk), "2"], ["2025-01-03", "S3", str(self.product.pk), "3"]],
+        )
+
+    def test_export_rejects_other_formats(self):
+        self.assertEqual(self.client.get("/api/purchases/export/", {"format": "json"}).status_code, 406)
+        response = self.client.get("/api/purchases/export/", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 406)
+        response = self.client.get("/api/purchases/export/")
+        self.assertEqual(response["Content-Type"].split(";")[0], "text/csv")
+
+    def test_ndjson_export_includes_stock(self):
+        response = self.client.get("/api/products/export/", {"format": "ndjson"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(rows[0]["stock_level"], 6)
+
+
+class KeysetPaginationTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Laptop", unit="pieces")
+        for day in (3, 1, 2, 2):
+            Purchase.objects.create(
+                date=date(2025, 1, day),
+                supplier=f"S{Purchase.objects.count()}",
+                product=self.product,
+                amount=1,
+            )
+
+    def test_unpaginated_by_default(self):
+        self.assertIsInstance(self.client.get("/api/purchases/").json(), list)
+
+    def test_pages_follow_date_id_order(self):
+        seen = []
+        url, params = "/api/purchases/", {"page_size": 3}
+        while url:
+            body = self.client.get(url, params).json()
+            seen.extend((row["date"], row["id"]) for row in body["results"])
+            url, params = body["next"], None
+            # A row inserted before the cursor must not shift later pages
+            if len(seen) == 3:
+                Purchase.objects.create(
+                    date=date(2025, 1, 1), supplier="Late", product=self.product, amount=1
+                )
+        self.assertEqual(len(seen), 4)
+        self.assertEqual(seen, sorted(seen))
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/sales/", {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 404)
+
+
+class ValuesListTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Laptop", unit="pieces", notes="x")
+        Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.product, amount=5
+        )
+        Sale.objects.create(date=date(2025, 1, 2), customer=None, product=self.product, amount=2)
+
+    def test_matches_serializer_output(self):
+        for url, serializer_class, queryset in (
+            ("/api/products/", ProductSerializer, annotate_stock(Product.objects.all())),
+            ("/api/purchases/", PurchaseSerializer, Purchase.objects.all()),
+            ("/api/sales/", SaleSerializer, Sale.objects.all()),
+        ):
+            expected = json.loads(json.dumps(serializer_class(queryset, many=True).data))
+            self.assertEqual(self.client.get(url).json(), expected)
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get("/api/products/", {"fields": "name,stock_level"})
+        self.assertEqual(response.json(), [{"name": "Laptop", "stock_level": 3}])
+
+        body = self.client.get("/api/sales/", {"fields": "amount", "page_size": 1}).json()
+        self.assertEqual(body["results"], [{"amount": 2}])
+
+        response = self.client.get("/api/sales/", {"fields": "amount,secret"})
+        self.assertEqual(response.status_code, 400)
+
+
+class StreamingListTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Laptop", unit="pieces")
+        Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.product, amount=50
+        )
+        for day in range(2, 7):
+            Sale.objects.create(
+                date=date(2025, 1, day),
+                customer=f"C{day}",
+                product=self.product,
+                amount=day,
+            )
+
+    def stream(self, url, params):
+        response = self.client.get(url, {**params, "stream": 1})
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.has_header("X-Cache"))
+        parts = list(response.streaming_content)
+        return parts, json.loads(b"".join(parts))
+
+    def test_matches_buffered_list(self):
+        for url, params in (
+            ("/api/products/", {}),
+            ("/api/purchases/", {"fields": "date,amount"}),
+            ("/api/sales/", {"amount__gte": 3, "customer": "c"}),
+            ("/api/sales/", {"amount__gt": 100}),
+        ):
+            with self.subTest(url=url, params=params):
+                _, rows = self.stream(url, params)
+                self.assertEqual(rows, self.client.get(url, params).json())
+
+    def test_rows_are_written_in_chunks(self):
+        with patch.object(SaleViewSet, "stream_chunk_size", 2):
+            parts, rows = self.stream("/api/sales/", {})
+        self.assertEqual(len(rows), 5)
+        # Three chunks of at most two rows and the closing bracket
+        self.assertEqual(len(parts), 4)
+
+
+class ColumnarResponseTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient(HTTP_ACCEPT=columnar.MEDIA_TYPE)
+        self.product = Product.objects.create(name="Laptop", unit="pieces")
+        Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.product, amount=5
+        )
+        for day in (2, 3, 4):
+            Sale.objects.create(
+                date=date(2025, 1, day), customer=None, product=self.product, amount=1
+            )
+
+    def read(self, response):
+        self.assertEqual(response["Content-Type"], columnar.MEDIA_TYPE)
+        return columnar.pa.ipc.open_stream(response.content).read_all()
+
+    @skipUnless(columnar.available(), "pyarrow is not installed")
+    def test_lists_match_json(self):
+        for url in ("/api/products/", "/api/sales/"):
+            table = self.read(self.client.get(url))
+            expected = APIClient().get(url).json()
+            rows = json.loads(json.dumps(table.to_pylist(), cls=DjangoJSONEncoder))
+            self.assertEqual(rows, expected)
+        table = self.read(self.client.get("/api/sales/", {"fields": "date"}))
+        self.assertEqual(str(table.schema.field("date").type), "date32[day]")
+
+    @skipUnless(columnar.available(), "pyarrow is not installed")
+    def test_pages_carry_next_link(self):
+        table = self.read(self.client.get("/api/sales/", {"page_size": 2}))
+        self.assertEqual(table.column("amount").to_pylist(), [1, 1])
+        table = self.read(self.client.get(table.schema.metadata[b"next"].decode()))
+        self.assertEqual(table.num_rows, 1)
+        self.assertIsNone(table.schema.metadata)
+
+    @skipIf(columnar.available(), "pyarrow is installed")
+    def test_not_acceptable_without_pyarrow(self):
+        self.assertEqual(self.client.get("/api/sales/").status_code, 406)
+
+
+class ConditionalGetTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(name="Laptop", unit="pieces")
+
+    def test_not_modified_until_a_write(self):
+        response = self.client.get("/api/products/", {"stock_level__gte": 0})
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):  # Only the version lookup
+            response = self.client.get(
+                "/api/products/", {"stock_level__gte": 0}, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+
+        # Other query strings and formats get other tags
+        self.assertNotEqual(self.client.get("/api/products/")["ETag"], etag)
+
+        # Writes to purchases change stock levels, so the product list changes
+        with self.captureOnCommitCallbacks(execute=True):
+            Purchase.objects.bulk_create(
+                [Purchase(date=date(2025, 1, 1), supplier="A", product=self.product, amount=1)]
+            )
+        response = self.client.get(
+            "/api/products/", {"stock_level__gte": 0}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_cascade_delete_bumps_transactions(self):
+        etag = self.client.get("/api/sales/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.product.pk).delete()
+        response = self.client.get("/api/sales/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class FastJSONTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    @skipUnless(fastjson.available(), "orjson is not installed")
+    def test_matches_stock_renderer(self):
+        data = {
+            "date": date(2025, 1, 2),
+            "at": datetime(2025, 1, 2, 3, 4, 5, 6, tzinfo=dt_timezone.utc),
+            "amount": Decimal("1.50"),
+            "label": gettext_lazy("Name"),
+            "text": "line\u2028break",
+            "rows": [{"id": 1, "notes": None}],
+        }
+        for renderer_context in ({}, {"indent": 2}):
+            self.assertEqual(
+                FastJSONRenderer().render(data, renderer_context=renderer_context),
+                JSONRenderer().render(data, renderer_context=renderer_context),
+            )
+
+    def test_parser_errors(self):
+        response = self.client.post(
+            "/api/products/", "{bad", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("JSON parse error", response.json()["detail"])
+
+    @override_settings(GZIP_MIN_LENGTH=1000)
+    def test_large_responses_are_compressed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name="Laptop", unit="pieces")
+        small = self.client.get("/api/products/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(small.has_header("Content-Encoding"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.bulk_create(
+                Product(name=f"Product {i}", unit="pieces") for i in range(50)
+            )
+        large = self.client.get("/api/products/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(large["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(large.content))), 51)
+
+        # Compression weakens the ETag; it still revalidates
+        self.assertTrue(large["ETag"].startswith("W/"))
+        response = self.client.get(
+            "/api/products/",
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=large["ETag"],
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class ResponseCacheTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(name="Laptop", unit="pieces")
+            Purchase.objects.create(
+                date=date(2025, 1, 1), supplier="A", product=self.product, amount=5
+            )
+
+    def test_repeated_query_is_served_from_cache(self):
+        params = {"stock_level__lt": 10, "name": "lap"}
+        first = self.client.get("/api/products/", params)
+        self.assertEqual(first["X-Cache"], "MISS")
+
+        with self.assertNumQueries(1):  # Only the version lookup
+            second = self.client.get("/api/products/", {"name": "lap", "stock_level__lt": 10})
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.json(), first.json())
+
+        stats = self.client.get("/api/cache/stats/").json()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_writes_invalidate_only_affected_lists(self):
+        self.client.get("/api/products/")
+        self.client.get("/api/purchases/")
+        with self.captureOnCommitCallbacks(execute=True):
+            Sale.objects.create(
+                date=date(2025, 1, 2), customer="B", product=self.product, amount=2
+            )
+
+        response = self.client.get("/api/products/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()[0]["stock_level"], 3)
+        self.assertEqual(self.client.get("/api/purchases/")["X-Cache"], "HIT")
+
+    def test_long_lists_are_not_cached(self):
+        with self.settings(API_CACHE_MAX_ROWS=0):
+            self.client.get("/api/purchases/")
+            self.assertEqual(self.client.get("/api/purchases/")["X-Cache"], "MISS")
+            # Empty lists still fit
+            self.client.get("/api/sales/")
+            self.assertEqual(self.client.get("/api/sales/")["X-Cache"], "HIT")
+
+
+class FullTextSearchTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.laptop = Product.objects.create(
+            name="Laptop Pro", unit="pieces", notes="Aluminium body"
+        )
+        Product.objects.create(name="Mouse", unit="pieces", notes="Fits a laptop bag")
+        Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.laptop, amount=10
+        )
+        Sale.objects.bulk_create(
+            [
+                Sale(date=date(2025, 1, 2), customer="Acme Corp", product=self.laptop, amount=1),
+                Sale(date=date(2025, 1, 3), customer="Globex", product=self.laptop, amount=1),
+            ]
+        )
+
+    def names(self, params):
+        return [row["name"] for row in self.client.get("/api/products/", params).json()]
+
+    def test_search_ranks_prefix_matches(self):
+        # The name is a better match than a word in the notes
+        self.assertEqual(self.names({"search": "lap"}), ["Laptop Pro", "Mouse"])
+        self.assertEqual(self.names({"name__match": "lapt pro"}), ["Laptop Pro"])
+        self.assertEqual(self.names({"notes__match": "alumin"}), ["Laptop Pro"])
+
+    def customers(self, params):
+        return [sale.customer for sale in SaleFilter(params, Sale.objects.all()).qs]
+
+    def test_index_follows_writes(self):
+        Sale.objects.filter(customer="Globex").update(customer="Initech")
+        self.assertEqual(self.customers({"customer__match": "glob"}), [])
+        self.assertEqual(self.customers({"customer__match": "initech"}), ["Initech"])
+
+        Sale.objects.filter(customer="Acme Corp").delete()
+        self.assertEqual(self.customers({"search": "acme"}), [])
+
+    @override_settings(FTS_TEXT_FILTERS=True)
+    def test_icontains_filters_use_index_when_enabled(self):
+        queryset = SaleFilter({"customer": "acm"}, Sale.objects.all()).qs
+        self.assertIn("products_sale_fts", str(queryset.query))
+        self.assertEqual(self.customers({"customer": "acm"}), ["Acme Corp"])
+
+
+class QueryPlanTestCase(InventoryTestCase):
+    """
+    Every filterset lookup must be answered from an index: EXPLAIN QUERY PLAN
+    may not report a full scan of the filtered table. With the default
+    settings the text lookups are the exception.
+    """
+
+    # Lookups no index can answer, and why
+    UNINDEXED = {
+        # Substring match on a column without a full-text index
+        (ProductFilter, "unit"),
+        # Case-sensitive substring match; notes__match is the indexed variant
+        (PurchaseFilter, "notes__contains"),
+        (SaleFilter, "notes__contains"),
+        # Whole free-text notes are not worth a b-tree; use notes__match
+        (PurchaseFilter, "notes__exact"),
+        (SaleFilter, "notes__exact"),
+        # Chooses the stock values, not the rows: every product is listed
+        (ProductFilter, "as_of"),
+        # Three methods: each is a third of the table
+        (ForecastFilter, "method"),
+    }
+
+    # LIKE without FTS_TEXT_FILTERS: answered from the full-text indexes only
+    # when the setting is on
+    TEXT_LOOKUPS = {
+        (ProductFilter, "name"),
+        (ProductFilter, "notes"),
+        (PurchaseFilter, "supplier"),
+        (PurchaseFilter, "supplier__icontains"),
+        (PurchaseFilter, "notes"),
+        (PurchaseFilter, "notes__icontains"),
+        (SaleFilter, "customer"),
+        (SaleFilter, "customer__icontains"),
+        (SaleFilter, "notes"),
+        (SaleFilter, "notes__icontains"),
+    }
+
+    SAMPLES = {
+        filters.DateFilter: "2025-01-05",
+        filters.NumberFilter: "5",
+        filters.CharFilter: "Acme",
+        NumberInFilter: "1,2",
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        products = Product.objects.bulk_create(
+            Product(name=f"Product {i}", unit="pieces", notes=f"Note {i}")
+            for i in range(500)
+        )
+        for model, party, amount in (
+            (Purchase, "supplier", lambda i: 50 + i % 97),
+            (Sale, "customer", lambda i: 1 + i % 43),
+        ):
+            model.objects.bulk_create(
+                model(
+                    date=date(2024, 1 + i % 12, 1 + i % 28),
+                    product=products[i % 500],
+                    amount=amount(i),
+                    notes=f"Note {i}",
+                    **{party: f"Party {i % 40}"},
+                )
+                for i in range(2000)
+            )
+        replenishment.refresh(window=365, today=date(2024, 12, 31))
+        forecasting.run(full=True, today=date(2024, 12, 31))
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def params(self, name, lookup):
+        if isinstance(lookup, filters.NumericRangeFilter):
+            return {f"{name}_min": "2", f"{name}_max": "5"}
+        return {name: self.SAMPLES[type(lookup)]}
+
+    def scanned_tables(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            details = [row[-1] for row in cursor.fetchall()]
+        return [
+            detail.split()[1]
+            for detail in details
+            if detail.startswith("SCAN ") and not detail.split()[1].endswith("_fts")
+        ]
+
+    def assert_lookups_use_an_index(self, unindexed):
+        for filterset, model in (
+            (ProductFilter, Product),
+            (PurchaseFilter, Purchase),
+            (SaleFilter, Sale),
+            (DailyStockFilter, DailyStock),
+            (ReplenishmentFilter, Replenishment),
+            (ForecastFilter, Forecast),
+        ):
+            for name, lookup in filterset.base_filters.items():
+                if (filterset, name) in unindexed:
+                    continue
+                with self.subTest(filterset=filterset.__name__, lookup=name):
+                    queryset = filterset(self.params(name, lookup), model.objects.all()).qs
+                    self.assertEqual(self.scanned_tables(queryset), [])
+
+    @override_settings(FTS_TEXT_FILTERS=True)
+    def test_every_lookup_uses_an_index(self):
+        self.assert_lookups_use_an_index(self.UNINDEXED)
+
+    @override_settings(FTS_TEXT_FILTERS=False)
+    def test_default_settings_scan_only_for_text_lookups(self):
+        self.assert_lookups_use_an_index(self.UNINDEXED | self.TEXT_LOOKUPS)
+
+
+class AggregateReportTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.laptop = Product.objects.create(name="Laptop", unit="pieces")
+        self.mouse = Product.objects.create(name="Mouse", unit="pieces")
+        Purchase.objects.bulk_create(
+            Purchase(date=date(2025, 1, 1), supplier="A", product=product, amount=100)
+            for product in (self.laptop, self.mouse)
+        )
+        Sale.objects.bulk_create(
+            [
+                Sale(date=date(2025, 1, 5), customer="X", product=self.laptop, amount=2),
+                Sale(date=date(2025, 1, 20), customer="Y", product=self.laptop, amount=4),
+                Sale(date=date(2025, 2, 3), customer="X", product=self.laptop, amount=6),
+                Sale(date=date(2025, 2, 3), customer="X", product=self.mouse, amount=1),
+            ]
+        )
+
+    def report(self, **params):
+        return self.client.get("/api/reports/aggregate/", params)
+
+    def test_group_by_product_and_month(self):
+        with self.assertNumQueries(2):  # Versions, then one GROUP BY
+            response = self.report(
+                source="sales",
+                group_by="product,month",
+                measures="sum,count,avg",
+                amount__gte=2,
+            )
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    "product": self.laptop.pk,
+                    "product_name": "Laptop",
+                    "month": "2025-01-01",
+                    "sum": 6,
+                    "count": 2,
+                    "avg": 3.0,
+                },
+                {
+                    "product": self.laptop.pk,
+                    "product_name": "Laptop",
+                    "month": "2025-02-01",
+                    "sum": 6,
+                    "count": 1,
+                    "avg": 6.0,
+                },
+            ],
+        )
+        totals = self.report(source="purchases", group_by="supplier").json()
+        self.assertEqual(totals, [{"supplier": "A", "sum": 200}])
+        self.assertEqual(self.report(source="sales").json(), [{"sum": 13}])
+
+    def test_rejects_unknown_dimensions(self):
+        response = self.report(source="purchases", group_by="customer")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("group_by", response.json())
+        self.assertEqual(self.report(source="returns").status_code, 400)
+
+
+class DailyRollupTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Laptop", unit="pieces")
+        self.purchase = Purchase.objects.create(
+            date=date(2025, 1, 10), supplier="A", product=self.product, amount=10
+        )
+        Sale.objects.bulk_create(
+            [
+                Sale(date=date(2025, 1, 12), customer="X", product=self.product, amount=3),
+                Sale(date=date(2025, 2, 1), customer="X", product=self.product, amount=2),
+            ]
+        )
+
+    def rows(self):
+        return list(
+            DailyStock.objects.order_by("day").values_list(
+                "day", "purchased", "sold", "closing"
+            )
+        )
+
+    def test_writes_keep_rollup_in_sync(self):
+        self.assertEqual(
+            self.rows(),
+            [
+                (date(2025, 1, 10), 10, 0, 10),
+                (date(2025, 1, 12), 0, 3, 7),
+                (date(2025, 2, 1), 0, 2, 5),
+            ],
+        )
+
+        # A backdated purchase re-balances every later day
+        Purchase.objects.create(
+            date=date(2025, 1, 5), supplier="B", product=self.product, amount=4
+        )
+        # Moving a sale to another day, and removing a day's only movement
+        Sale.objects.filter(date=date(2025, 1, 12)).update(date=date(2025, 1, 20))
+        self.purchase.delete()
+        Purchase.objects.create(
+            date=date(2025, 1, 6), supplier="B", product=self.product, amount=6
+        )
+
+        expected = [
+            (date(2025, 1, 5), 4, 0, 4),
+            (date(2025, 1, 6), 6, 0, 10),
+            (date(2025, 1, 20), 0, 3, 7),
+            (date(2025, 2, 1), 0, 2, 5),
+        ]
+        self.assertEqual(self.rows(), expected)
+        self.assertEqual(self.product.stock_level(), expected[-1][-1])
+
+        call_command("rebuild_daily_stock", stdout=StringIO())
+        self.assertEqual(self.rows(), expected)
+
+    def test_rebuild_retires_timeseries_etags(self):
+        url = f"/api/reports/timeseries/?product={self.product.pk}"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_daily_stock", stdout=StringIO())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_timeseries_and_reports_read_rollup(self):
+        response = self.client.get(
+            "/api/reports/timeseries/", {"product": self.product.pk, "period": "month"}
+        )
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    "product": self.product.pk,
+                    "period": "2025-01-01",
+                    "purchased": 10,
+                    "sold": 3,
+                    "closing": 7,
+                },
+                {
+                    "product": self.product.pk,
+                    "period": "2025-02-01",
+                    "purchased": 0,
+                    "sold": 2,
+                    "closing": 5,
+                },
+            ],
+        )
+
+        self.assertIsNotNone(
+            reports.rollup_source(
+                Sale, ["month"], ["sum"], {"date__gte": date(2025, 1, 11)}
+            )
+        )
+        response = self.client.get(
+            "/api/reports/aggregate/",
+            {"source": "sales", "group_by": "month", "date__gte": "2025-01-11"},
+        )
+        self.assertEqual(
+            response.json(),
+            [{"month": "2025-01-01", "sum": 3}, {"month": "2025-02-01", "sum": 2}],
+        )
+
+
+class AsOfStockTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.laptop = Product.objects.create(name="Laptop", unit="pieces")
+        self.mouse = Product.objects.create(name="Mouse", unit="pieces")
+        Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.laptop, amount=10
+        )
+        Sale.objects.create(
+            date=date(2025, 1, 5), customer="X", product=self.laptop, amount=3
+        )
+        call_command("snapshot_stock", "--date", "2025-01-03", stdout=StringIO())
+        Purchase.objects.create(
+            date=date(2025, 1, 10), supplier="A", product=self.mouse, amount=5
+        )
+
+    def stock(self, as_of, **params):
+        rows = self.client.get("/api/products/", {"as_of": as_of, **params}).json()
+        return {
+            row["name"]: (row["purchased_amount"], row["sold_amount"], row["stock_level"])
+            for row in rows
+        }
+
+    def test_as_of_values(self):
+        self.assertEqual(
+            self.stock("2025-01-04"), {"Laptop": (10, 0, 10), "Mouse": (0, 0, 0)}
+        )
+        self.assertEqual(
+            self.stock("2025-01-31"), {"Laptop": (10, 3, 7), "Mouse": (5, 0, 5)}
+        )
+        self.assertEqual(
+            self.stock("2025-01-31", stock_level__lt=6), {"Mouse": (5, 0, 5)}
+        )
+        self.assertEqual(
+            self.client.get("/api/products/", {"as_of": "soon"}).status_code, 400
+        )
+
+    def test_backdated_writes_update_snapshots(self):
+        # Dated before the snapshot, for a product it holds and one it doesn't
+        Sale.objects.create(
+            date=date(2025, 1, 2), customer="Y", product=self.laptop, amount=1
+        )
+        Purchase.objects.create(
+            date=date(2024, 12, 31), supplier="B", product=self.mouse, amount=2
+        )
+        snapshot = dict(StockSnapshot.objects.values_list("product__name", "on_hand"))
+        self.assertEqual(snapshot, {"Laptop": 9, "Mouse": 2})
+        self.assertEqual(
+            self.stock("2025-01-04"), {"Laptop": (10, 1, 9), "Mouse": (2, 0, 2)}
+        )
+
+
+class PeriodCloseTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.laptop = Product.objects.create(name="Laptop", unit="pieces")
+        self.mouse = Product.objects.create(name="Mouse", unit="pieces")
+        with self.captureOnCommitCallbacks(execute=True):
+            Purchase.objects.create(
+                date=date(2025, 1, 1), supplier="A", product=self.laptop, amount=10
+            )
+            Purchase.objects.create(
+                date=date(2025, 1, 2), supplier="B", product=self.mouse, amount=4
+            )
+            Sale.objects.create(
+                date=date(2025, 1, 5), customer="X", product=self.laptop, amount=3
+            )
+            Purchase.objects.create(
+                date=date(2025, 2, 10), supplier="A", product=self.laptop, amount=5
+            )
+
+    def close(self, through="2025-01-31", *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "close_period", "--through", through, *args, stdout=StringIO()
+            )
+
+    def stock(self, **kwargs):
+        queryset = annotate_stock(Product.objects.order_by("name"), **kwargs)
+        return list(
+            queryset.values_list("purchased_amount", "sold_amount", "stock_level")
+        )
+
+    def test_close_moves_rows_and_keeps_stock(self):
+        counters = self.stock()
+        daily = list(
+            DailyStock.objects.order_by("product", "day").values_list(
+                "product", "day", "purchased", "sold", "closing"
+            )
+        )
+        self.close("2025-01-31", "--chunk-size", "1")
+
+        self.assertEqual(
+            list(Purchase.objects.values_list("date", flat=True)), [date(2025, 2, 10)]
+        )
+        self.assertEqual(ArchivedPurchase.objects.count(), 2)
+        self.assertEqual(ArchivedSale.objects.get().customer, "X")
+        self.assertEqual(Sale.objects.count(), 0)
+
+        # Opening balances plus the open period
+        self.assertEqual(self.stock(), counters)
+        self.assertEqual(self.stock(source="history"), counters)
+        # Inside the closed period, from the archive
+        self.assertEqual(self.stock(as_of=date(2025, 1, 3)), [(10, 0, 10), (4, 0, 4)])
+        rollup.rebuild()
+        self.assertEqual(
+            list(
+                DailyStock.objects.order_by("product", "day").values_list(
+                    "product", "day", "purchased", "sold", "closing"
+                )
+            ),
+            daily,
+        )
+
+        # Resuming an already complete close moves nothing
+        self.close("2025-01-31")
+        self.assertEqual(ArchivedPurchase.objects.count(), 2)
+
+    def test_closed_period_is_final(self):
+        self.close()
+        with self.assertRaises(ValidationError):
+            Purchase.objects.create(
+                date=date(2025, 1, 20), supplier="C", product=self.mouse, amount=1
+            )
+        with self.assertRaises(CommandError):
+            self.close("2024-12-31")
+        Purchase.objects.create(
+            date=date(2025, 2, 1), supplier="C", product=self.mouse, amount=1
+        )
+        self.assertEqual(self.stock(source="history"), self.stock())
+
+        # Through the API too, for writes moving a row into the closed period
+        purchase = Purchase.objects.get(date=date(2025, 2, 10))
+        response = self.client.put(
+            f"/api/purchases/{purchase.pk}/",
+            {"date": "2025-01-20", "supplier": "A", "product": self.laptop.pk, "amount": 5},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("non_field_errors", response.json())
+        purchase.refresh_from_db()
+        self.assertEqual(purchase.date, date(2025, 2, 10))
+
+    def test_include_archived(self):
+        self.close()
+        response = self.client.get("/api/purchases/")
+        self.assertEqual(len(response.json()), 1)
+        response = self.client.get("/api/purchases/", {"include_archived": "1"})
+        self.assertEqual(len(response.json()), 3)
+        response = self.client.get(
+            "/api/purchases/", {"include_archived": "1", "supplier": "A"}
+        )
+        self.assertEqual(sorted(row["amount"] for row in response.json()), [5, 10])
+
+        # Keyset pages run over both tables in (date, id) order
+        dates = []
+        url = "/api/purchases/?include_archived=1&page_size=2"
+        while url:
+            page = self.client.get(url).json()
+            dates += [row["date"] for row in page["results"]]
+            url = page["next"]
+        self.assertEqual(dates, ["2025-01-01", "2025-01-02", "2025-02-10"])
+
+        report = self.client.get(
+            "/api/reports/aggregate/",
+            {
+                "source": "purchases",
+                "group_by": "supplier",
+                "measures": "sum,avg",
+                "include_archived": "1",
+            },
+        ).json()
+        self.assertEqual(
+            report,
+            [
+                {"supplier": "A", "sum": 15, "avg": 7.5},
+                {"supplier": "B", "sum": 4, "avg": 4.0},
+            ],
+        )
+
+    def test_rollup_reports_leave_out_closed_periods(self):
+        self.close()
+
+        def report(measures, **params):
+            response = self.client.get(
+                "/api/reports/aggregate/",
+                {"source": "purchases", "group_by": "month", "measures": measures, **params},
+            )
+            return [(row["month"], row["sum"]) for row in response.json()]
+
+        # Sums come from the rollup, sums with counts from the live rows
+        self.assertEqual(report("sum"), [("2025-02-01", 5)])
+        self.assertEqual(report("sum"), report("sum,count"))
+        self.assertEqual(
+            report("sum", include_archived="1"),
+            [("2025-01-01", 14), ("2025-02-01", 5)],
+        )
+        self.assertEqual(
+            report("sum", include_archived="1"),
+            report("sum,count", include_archived="1"),
+        )
+
+
+class MovementLedgerTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Laptop", unit="pieces")
+
+    def entries(self):
+        return list(
+            StockMovement.objects.filter(product=self.product)
+            .order_by("id")
+            .values_list("source", "quantity", "balance")
+        )
+
+    def test_every_write_appends_entries(self):
+        purchase = Purchase.objects.create(
+            date=date(2025, 1, 1), supplier="A", product=self.product, amount=10
+        )
+        sale = Sale.objects.create(
+            date=date(2025, 1, 2), customer="X", product=self.product, amount=3
+        )
+        purchase.amount = 12
+        purchase.save()
+        purchase.notes = "Restocked"
+        purchase.save()  # Not a movement
+        Sale.objects.filter(pk=sale.pk).update(amount=4)
+        sale.delete()
+
+        self.assertEqual(
+            self.entries(),
+            [
+                ("purchase", 10, 10),
+                ("sale", -3, 7),
+                ("purchase", 2, 9),
+                ("sale", -1, 8),
+                ("sale", 4, 12),
+            ],
+        )
+        self.assertEqual(self.entries()[-1][2], ProductStock.objects.get().on_hand)
+        self.assertEqual(
+            StockMovement.objects.filter(source="purchase")
+            .values_list("source_id", flat=True)
+            .distinct()
+            .get(),
+            purchase.pk,
+        )
+
+    def test_backfill_matches_appended_balances(self):
+        Purchase.objects.bulk_create(
+            [
+                Purchase(
+                    date=date(2025, 1, d), supplier="A", product=self.product, amount=5
+                )
+                for d in range(1, 4)
+            ]
+        )
+        Sale.objects.create(
+            date=date(2025, 1, 5), customer="X", product=self.product, amount=6
+        )
+        appended = self.entries()
+        StockMovement.objects.all().delete()
+        self.assertEqual(ledger.backfill(), 4)
+        self.assertEqual(self.entries(), appended)
+
+    def test_movements_endpoint(self):
+        for day in range(1, 6):
+            Purchase.objects.create(
+                date=date(2025, 1, day), supplier="A", product=self.product, amount=day
+            )
+        url = f"/api/products/{self.product.pk}/movements/"
+        rows = self.client.get(url).json()
+        self.assertEqual([row["balance"] for row in rows], [1, 3, 6, 10, 15])
+        self.assertEqual(rows[0]["source"], "purchase")
+
+        balances = []
+        url += "?page_size=2"
+        while url:
+            page = self.client.get(url).json()
+            balances += [row["balance"] for row in page["results"]]
+            url = page["next"]
+        self.assertEqual(balances, [1, 3, 6, 10, 15])
+
+        response = self.client.get("/api/products/999/movements/")
+        self.assertEqual(response.status_code, 404)
+
+
+class MovementHistoryTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.product = Product.objects.create(name="Laptop", unit="pieces")
+        self.url = f"/api/products/{self.product.pk}/history/"
+        for day, amount in ((1, 10), (3, 5), (6, 2)):
+            Purchase.objects.create(
+                date=date(2025, 1, day), supplier="A", product=self.product, amount=amount
+            )
+        for day, amount in ((3, 4), (5, 6)):
+            Sale.objects.create(
+                date=date(2025, 1, day), customer="X", product=self.product, amount=amount
+            )
+
+    def walk(self, url):
+        rows = []
+        while url:
+            page = self.client.get(url).json()
+            rows += page["results"]
+            url = page["next"]
+        return rows
+
+    def test_running_balance(self):
+        rows = self.client.get(self.url).json()
+        self.assertEqual(
+            [
+                (row["date"], row["source"], row["quantity"], row["balance"])
+                for row in rows
+            ],
+            [
+                ("2025-01-01", "purchase", 10, 10),
+                ("2025-01-03", "purchase", 5, 15),
+                ("2025-01-03", "sale", -4, 11),
+                ("2025-01-05", "sale", -6, 5),
+                ("2025-01-06", "purchase", 2, 7),
+            ],
+        )
+        self.assertEqual(self.walk(self.url + "?page_size=2"), rows)
+
+    def test_date_range_starts_from_opening_balance(self):
+        rows = self.client.get(
+            self.url, {"date__gte": "2025-01-03", "date__lte": "2025-01-05"}
+        ).json()
+        self.assertEqual([row["balance"] for row in rows], [15, 11, 5])
+        paged = self.url + "?date__gte=2025-01-03&date__lte=2025-01-05&page_size=1"
+        self.assertEqual(self.walk(paged), rows)
+        response = self.client.get(self.url, {"date__gte": "soon"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_closed_periods(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("close_period", "--through", "2025-01-03", stdout=StringIO())
+        rows = self.client.get(self.url).json()
+        self.assertEqual([row["balance"] for row in rows], [5, 7])
+        rows = self.client.get(self.url, {"include_archived": "1"}).json()
+        self.assertEqual([row["balance"] for row in rows], [10, 15, 11, 5, 7])
+
+
+class ReplenishmentTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.today = date.today()
+        self.sales = {"Laptop": {1: 4, 2: 4, 4: 4, 6: 4, 9: 4}, "Mouse": {3: 2}}
+        for name, bought in (("Laptop", 100), ("Mouse", 3), ("Keyboard", 0)):
+            product = Product.objects.create(name=name, unit="pieces")
+            if bought:
+                Purchase.objects.create(
+                    date=self.today - timedelta(days=30),
+                    supplier="A",
+                    product=product,
+                    amount=bought,
+                )
+            for days_ago, amount in self.sales.get(name, {}).items():
+                Sale.objects.create(
+                    date=self.today - timedelta(days=days_ago),
+                    customer="X",
+                    product=product,
+                    amount=amount,
+                )
+
+    def test_metrics_match_per_product_computation(self):
+        self.assertEqual(replenishment.refresh(window=10, today=self.today), 3)
+        z = statistics.NormalDist().inv_cdf(replenishment.SERVICE_LEVEL)
+        lead, review = replenishment.LEAD_TIME_DAYS, replenishment.REVIEW_DAYS
+        for row in Replenishment.objects.select_related("product"):
+            sold = self.sales.get(row.product.name, {})
+            series = [sold.get(days_ago, 0) for days_ago in range(10)]
+            mean = statistics.mean(series)
+            std = statistics.stdev(series)
+            on_hand = row.product.stock_level()
+            reorder_point = mean * lead + z * std * lead**0.5
+            target = reorder_point + mean * review
+            self.assertEqual(row.on_hand, on_hand)
+            self.assertAlmostEqual(row.avg_daily_demand, mean, places=3)
+            self.assertAlmostEqual(row.demand_std, std, places=3)
+            self.assertAlmostEqual(row.reorder_point, reorder_point, places=2)
+            if mean:
+                self.assertAlmostEqual(row.days_of_cover, on_hand / mean, places=3)
+            else:
+                self.assertIsNone(row.days_of_cover)
+            expected = -(-(target - on_hand) // 1) if on_hand <= reorder_point else 0
+            self.assertEqual(row.order_quantity, max(int(expected), 0))
+
+        mouse = Replenishment.objects.get(product__name="Mouse")
+        self.assertEqual((mouse.days_of_cover, mouse.order_quantity), (5.0, 6))
+
+    def test_endpoint_and_product_filter(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/analytics/replenishment/", {"window": 10}, format="json"
+            )
+        self.assertEqual(response.json()["products"], 3)
+        rows = self.client.get(
+            "/api/analytics/replenishment/", {"days_of_cover__lt": 7}
+        ).json()
+        self.assertEqual(
+            [(row["on_hand"], row["order_quantity"]) for row in rows], [(1, 6)]
+        )
+        products = self.client.get("/api/products/", {"days_of_cover__lt": 7}).json()
+        self.assertEqual([product["name"] for product in products], ["Mouse"])
+
+        response = self.client.post(
+            "/api/analytics/replenishment/", {"service_level": 2}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ForecastTestCase(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.today = date.today()
+        self.products = []
+        for index in range(5):
+            product = Product.objects.create(name=f"Product {index}", unit="pieces")
+            Purchase.objects.create(
+                date=self.today - timedelta(days=60),
+                supplier="A",
+                product=product,
+                amount=1000,
+            )
+            # Product i sells i + 1 units on weekdays of index 0..i
+            for days_ago in range(28):
+                day = self.today - timedelta(days=days_ago)
+                if day.weekday() <= index:
+                    Sale.objects.create(
+                        date=day, customer="X", product=product, amount=index + 1
+                    )
+            self.products.append(product)
+
+    def forecasts(self):
+        return {
+            (row.product_id, row.method): row.values for row in Forecast.objects.all()
+        }
+
+    def test_methods(self):
+        series = np.array(
+            [[0, 0, 0, 7, 7, 7, 7, 7, 7, 7], [1, 2, 3, 1, 2, 3, 1, 2, 3, 1]]
+        )
+        average = forecasting.moving_average(series, horizon=3, window=7)
+        self.assertTrue(np.allclose(average, [[7] * 3, [13 / 7] * 3]))
+        naive = forecasting.seasonal_naive(series, horizon=5, season=3)
+        self.assertTrue(np.allclose(naive[1], [2, 3, 1, 2, 3]))
+
+        # Per-product reference: the best alpha by one-step-ahead squared error
+        smoothed = forecasting.exponential_smoothing(series, horizon=2)
+        for row, values in zip(series.tolist(), smoothed):
+            best = None
+            for alpha in forecasting.ALPHAS:
+                level, sse = row[0], 0
+                for value in row[1:]:
+                    sse += (value - level) ** 2
+                    level += alpha * (value - level)
+                if best is None or sse < best[0]:
+                    best = (sse, level)
+            self.assertTrue(np.allclose(values, [best[1]] * 2))
+
+    def test_incremental_runs_refit_products_with_new_sales(self):
+        self.assertEqual(forecasting.run(today=self.today).products, 5)
+        self.assertEqual(Forecast.objects.count(), 15)
+        first = self.forecasts()
+        self.assertEqual(forecasting.run(today=self.today).products, 0)
+        self.assertEqual(self.forecasts(), first)
+
+        Sale.objects.create(
+            date=self.today, customer="X", product=self.products[2], amount=50
+        )
+        Purchase.objects.create(
+            date=self.today, supplier="A", product=self.products[3], amount=50
+        )
+        forecast_run = forecasting.run(today=self.today)
+        self.assertEqual(forecast_run.products, 1)
+        self.assertEqual(ForecastRun.objects.count(), 3)
+        second = self.forecasts()
+        for key, values in second.items():
+            if key[0] == self.products[2].id:
+                self.assertNotEqual(values, first[key])
+            else:
+                self.assertEqual(values, first[key])
+
+    def test_pool_matches_serial_run(self):
+        forecasting.run(full=True, today=self.today)
+        serial = self.forecasts()
+        forecasting.run(full=True, workers=2, chunk_size=2, today=self.today)
+        self.assertEqual(self.forecasts(), serial)
+
+    def test_endpoint_filters(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("run_forecasts", "--workers", "1", stdout=StringIO())
+        product = self.products[0]
+        rows = self.client.get(
+            "/api/analytics/forecast/",
+            {"product": f"{product.id}", "method": "seasonal_naive"},
+        ).json()
+        self.assertEqual(len(rows), 1)
+        row = rows[0]
+        self.assertEqual(row["start"], str(self.today + timedelta(days=1)))
+        # Sells 1 unit on Mondays only: the last week repeated
+        expected = [
+            1.0 if (self.today + timedelta(days=day)).weekday() == 0 else 0.0
+            for day in range(1, forecasting.HORIZON_DAYS + 1)
+        ]
+        self.assertEqual(row["values"], expected)
@@ -1,6 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProductViewSet, SaleViewSet, PurchaseViewSet
+from .views import (
+    AggregateReportView,
+    BatchView,
+    CacheStatsView,
+    ForecastView,
+    ProductViewSet,
+    PurchaseViewSet,
+    ReplenishmentView,
+    SaleViewSet,
+    TimeseriesView,
+)
 
 # Create a router and register ViewSets
 router = DefaultRouter()
@@ -10,5 +20,11 @@ router.register(r'sales', SaleViewSet)  # Sales endpoint
 
 # Define the urlpatterns
 urlpatterns = [
+    path('reports/aggregate/', AggregateReportView.as_view(), name='reports-aggregate'),
+    path('reports/timeseries/', TimeseriesView.as_view(), name='reports-timeseries'),
+    path('analytics/replenishment/', ReplenishmentView.as_view(), name='analytics-replenishment'),
+    path('analytics/forecast/', ForecastView.as_view(), name='analytics-forecast'),
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
     path('', include(router.urls)),  # Include all routes from the router
 ]
\ No newline at end of file
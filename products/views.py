@@ -1,19 +1,101 @@
-from rest_framework import viewsets
+from rest_framework import generics, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError as APIValidationError
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.generics import get_object_or_404
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from django_filters import rest_framework as filters
-from .models import Product, Purchase, Sale
-from .serializers import ProductSerializer, PurchaseSerializer, SaleSerializer
-from django.db.models import Sum, F, Value
-from django.db.models.functions import Coalesce
+from .models import (
+    ArchivedPurchase,
+    ArchivedSale,
+    DailyStock,
+    Forecast,
+    Product,
+    Purchase,
+    Replenishment,
+    Sale,
+    StockMovement,
+)
+from .serializers import (
+    BatchOperationSerializer,
+    ForecastSerializer,
+    HistoryParamsSerializer,
+    ProductSerializer,
+    PurchaseSerializer,
+    ReplenishmentParamsSerializer,
+    ReplenishmentSerializer,
+    SaleSerializer,
+    StockLookupSerializer,
+)
+from .annotations import annotate_stock
+from .bulk import ingest
+from .pagination import KeysetPagination
+from . import batch, columnar, fulltext, history, replenishment, reports, response_cache, versions
+from .exports import (
+    CHUNK_SIZE,
+    EXPORTERS,
+    CSVRenderer,
+    NDJSONRenderer,
+    export_response,
+    stream_response,
+)
+from .fastjson import FastJSONRenderer
 from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.http import parse_etags, quote_etag
+from datetime import date
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class ProductFilter(filters.FilterSet):
+class FullTextFilterSet(filters.FilterSet):
+    """
+    Base filterset adding full-text search over the model's indexed columns.
+
+    ``search`` matches any indexed column and ranks the results; the
+    ``<column>__match`` filters declared by subclasses match one column. With
+    ``settings.FTS_TEXT_FILTERS`` the ``icontains`` filters on indexed columns
+    use the index too (word-prefix rather than substring matching).
+    """
+
+    search = filters.CharFilter(method="filter_search")
+
+    def filter_search(self, queryset, name, value):
+        if value:
+            queryset = fulltext.match(queryset, value, rank=True)
+        return queryset
+
+    def filter_match(self, queryset, name, value):
+        if value:
+            queryset = fulltext.match(queryset, value, [self.filters[name].field_name])
+        return queryset
+
+    def uses_index(self, name):
+        text_filter = self.filters[name]
+        indexed = fulltext.FTS_COLUMNS[self._meta.model._meta.model_name]
+        return (
+            fulltext.text_filters_enabled()
+            and text_filter.method is None
+            and text_filter.lookup_expr == "icontains"
+            and text_filter.field_name in indexed
+        )
+
+    def filter_queryset(self, queryset):
+        for name, value in self.form.cleaned_data.items():
+            if value and self.uses_index(name):
+                queryset = self.filter_match(queryset, name, value)
+            else:
+                queryset = self.filters[name].filter(queryset, value)
+        return queryset
+
+
+class ProductFilter(FullTextFilterSet):
     """
     Custom filter for the Product model.
     """
@@ -23,6 +105,10 @@ class ProductFilter(filters.FilterSet):
     unit = filters.CharFilter(field_name="unit", lookup_expr="icontains")
     notes = filters.CharFilter(field_name="notes", lookup_expr="icontains")
 
+    # Full-text filters
+    name__match = filters.CharFilter(field_name="name", method="filter_match")
+    notes__match = filters.CharFilter(field_name="notes", method="filter_match")
+
     # Django-style lookup filters for stock_level
     stock_level__lt = filters.NumberFilter(method="filter_stock_level_lookup")
     stock_level__gt = filters.NumberFilter(method="filter_stock_level_lookup")
@@ -34,12 +120,32 @@ class ProductFilter(filters.FilterSet):
     min_stock_level = filters.NumberFilter(method="filter_min_stock_level")
     max_stock_level = filters.NumberFilter(method="filter_max_stock_level")
 
+    # Stock values at the end of a past day
+    as_of = filters.DateFilter(method="filter_as_of")
+
+    # Computed replenishment metrics
+    days_of_cover__lt = filters.NumberFilter(
+        field_name="replenishment__days_of_cover", lookup_expr="lt"
+    )
+    days_of_cover__lte = filters.NumberFilter(
+        field_name="replenishment__days_of_cover", lookup_expr="lte"
+    )
+    days_of_cover__gt = filters.NumberFilter(
+        field_name="replenishment__days_of_cover", lookup_expr="gt"
+    )
+    days_of_cover__gte = filters.NumberFilter(
+        field_name="replenishment__days_of_cover", lookup_expr="gte"
+    )
+
     class Meta:
         model = Product
         fields = [
             "name",
             "unit",
             "notes",
+            "name__match",
+            "notes__match",
+            "search",
             "stock_level__lt",
             "stock_level__gt",
             "stock_level__lte",
@@ -47,6 +153,11 @@ class ProductFilter(filters.FilterSet):
             "stock_level__exact",
             "min_stock_level",
             "max_stock_level",
+            "as_of",
+            "days_of_cover__lt",
+            "days_of_cover__lte",
+            "days_of_cover__gt",
+            "days_of_cover__gte",
         ]
 
     def filter_stock_level_lookup(self, queryset, name, value):
@@ -57,16 +168,8 @@ class ProductFilter(filters.FilterSet):
             # Extract lookup expression from name (e.g., "stock_level__lt" -> "lt")
             lookup_expr = name.split("__")[-1]
 
-            # Annotate with calculated fields
-            queryset = queryset.annotate(
-                purchased_amount=Coalesce(
-                    Sum("purchases__amount", distinct=True), Value(0)
-                ),
-                sold_amount=Coalesce(Sum("sales__amount", distinct=True), Value(0)),
-            ).annotate(stock_level=F("purchased_amount") - F("sold_amount"))
-
             # Apply filter with the extracted lookup
-            filter_kwargs = {f"stock_level__{lookup_expr}": value}
+            filter_kwargs = {f"{self.stock_column()}__{lookup_expr}": value}
             queryset = queryset.filter(**filter_kwargs)
 
         return queryset
@@ -76,15 +179,7 @@ class ProductFilter(filters.FilterSet):
         Filter products with stock level greater than or equal to the given value.
         """
         if value is not None:
-            # Annotate with calculated fields and filter
-            queryset = queryset.annotate(
-                purchased_amount=Coalesce(
-                    Sum("purchases__amount", distinct=True), Value(0)
-                ),
-                sold_amount=Coalesce(Sum("sales__amount", distinct=True), Value(0)),
-            ).annotate(stock_level=F("purchased_amount") - F("sold_amount"))
-
-            queryset = queryset.filter(stock_level__gte=value)
+            queryset = queryset.filter(**{f"{self.stock_column()}__gte": value})
         return queryset
 
     def filter_max_stock_level(self, queryset, name, value):
@@ -92,38 +187,34 @@ class ProductFilter(filters.FilterSet):
         Filter products with stock level less than or equal to the given value.
         """
         if value is not None:
-            # Annotate with calculated fields and filter
-            queryset = queryset.annotate(
-                purchased_amount=Coalesce(
-                    Sum("purchases__amount", distinct=True), Value(0)
-                ),
-                sold_amount=Coalesce(Sum("sales__amount", distinct=True), Value(0)),
-            ).annotate(stock_level=F("purchased_amount") - F("sold_amount"))
-
-            queryset = queryset.filter(stock_level__lte=value)
+            queryset = queryset.filter(**{f"{self.stock_column()}__lte": value})
         return queryset
 
-    @property
-    def qs(self):
+    def filter_as_of(self, queryset, name, value):
         """
-        Override the default queryset to include annotations for filtering.
-        Using distinct=True prevents the duplication of amounts when joining
-        across multiple relationships.
+        The as-of values are annotated by ``filter_queryset``.
         """
-        parent_qs = super().qs
+        return queryset
 
-        # Annotate with the calculated fields using distinct=True
-        annotated_qs = parent_qs.annotate(
-            purchased_amount=Coalesce(
-                Sum("purchases__amount", distinct=True), Value(0)
-            ),
-            sold_amount=Coalesce(Sum("sales__amount", distinct=True), Value(0)),
-        ).annotate(stock_level=F("purchased_amount") - F("sold_amount"))
+    def stock_column(self):
+        """
+        Column the stock_level lookups filter on: the indexed counter column
+        the current stock_level annotation reads, or the as-of annotation.
+        """
+        if self.form.cleaned_data.get("as_of"):
+            return "stock_level"
+        return "stock__on_hand"
 
-        return annotated_qs
+    def filter_queryset(self, queryset):
+        """
+        Annotate the stock fields once, before any filter method runs, so the
+        stock_level lookups all filter on the same values.
+        """
+        as_of = self.form.cleaned_data.get("as_of")
+        return super().filter_queryset(annotate_stock(queryset, as_of=as_of))
 
 
-class PurchaseFilter(filters.FilterSet):
+class PurchaseFilter(FullTextFilterSet):
     """
     Custom filter for the Purchase model.
     """
@@ -138,6 +229,7 @@ class PurchaseFilter(filters.FilterSet):
         field_name="supplier", lookup_expr="icontains"
     )
     supplier__exact = filters.CharFilter(field_name="supplier", lookup_expr="exact")
+    supplier__match = filters.CharFilter(field_name="supplier", method="filter_match")
     product = filters.NumberFilter(field_name="product")
     product__exact = filters.NumberFilter(field_name="product", lookup_expr="exact")
     amount__lt = filters.NumberFilter(field_name="amount", lookup_expr="lt")
@@ -145,11 +237,14 @@ class PurchaseFilter(filters.FilterSet):
     amount__lte = filters.NumberFilter(field_name="amount", lookup_expr="lte")
     amount__gte = filters.NumberFilter(field_name="amount", lookup_expr="gte")
     amount__exact = filters.NumberFilter(field_name="amount", lookup_expr="exact")
-    amount__range = filters.NumericRangeFilter(field_name="amount")
+    amount__range = filters.NumericRangeFilter(
+        field_name="amount", lookup_expr="range"
+    )
     notes = filters.CharFilter(field_name="notes", lookup_expr="icontains")
     notes__icontains = filters.CharFilter(field_name="notes", lookup_expr="icontains")
     notes__exact = filters.CharFilter(field_name="notes", lookup_expr="exact")
     notes__contains = filters.CharFilter(field_name="notes", lookup_expr="contains")
+    notes__match = filters.CharFilter(field_name="notes", method="filter_match")
 
     class Meta:
         model = Purchase
@@ -163,6 +258,7 @@ class PurchaseFilter(filters.FilterSet):
             "supplier",
             "supplier__icontains",
             "supplier__exact",
+            "supplier__match",
             "product",
             "product__exact",
             "amount",
@@ -176,10 +272,12 @@ class PurchaseFilter(filters.FilterSet):
             "notes__icontains",
             "notes__exact",
             "notes__contains",
+            "notes__match",
+            "search",
         ]
 
 
-class SaleFilter(filters.FilterSet):
+class SaleFilter(FullTextFilterSet):
     """
     Custom filter for Sale model.
     """
@@ -194,6 +292,7 @@ class SaleFilter(filters.FilterSet):
         field_name="customer", lookup_expr="icontains"
     )
     customer__exact = filters.CharFilter(field_name="customer", lookup_expr="exact")
+    customer__match = filters.CharFilter(field_name="customer", method="filter_match")
     product = filters.NumberFilter(field_name="product")
     product__exact = filters.NumberFilter(field_name="product", lookup_expr="exact")
     amount__lt = filters.NumberFilter(field_name="amount", lookup_expr="lt")
@@ -201,11 +300,14 @@ class SaleFilter(filters.FilterSet):
     amount__lte = filters.NumberFilter(field_name="amount", lookup_expr="lte")
     amount__gte = filters.NumberFilter(field_name="amount", lookup_expr="gte")
     amount__exact = filters.NumberFilter(field_name="amount", lookup_expr="exact")
-    amount__range = filters.NumericRangeFilter(field_name="amount")
+    amount__range = filters.NumericRangeFilter(
+        field_name="amount", lookup_expr="range"
+    )
     notes = filters.CharFilter(field_name="notes", lookup_expr="icontains")
     notes__icontains = filters.CharFilter(field_name="notes", lookup_expr="icontains")
     notes__exact = filters.CharFilter(field_name="notes", lookup_expr="exact")
     notes__contains = filters.CharFilter(field_name="notes", lookup_expr="contains")
+    notes__match = filters.CharFilter(field_name="notes", method="filter_match")
 
     class Meta:
         model = Sale
@@ -219,6 +321,7 @@ class SaleFilter(filters.FilterSet):
             "customer",
             "customer__icontains",
             "customer__exact",
+            "customer__match",
             "product",
             "product__exact",
             "amount",
@@ -232,23 +335,358 @@ class SaleFilter(filters.FilterSet):
             "notes__icontains",
             "notes__exact",
             "notes__contains",
+            "notes__match",
+            "search",
         ]
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ConditionalGetMixin:
+    """
+    ETag / If-None-Match support for ``list()`` and ``retrieve()``.
+
+    The ETag combines the change versions of ``version_models`` with the
+    path, the normalized query string and the negotiated format. A matching
+    If-None-Match is answered with 304 before any list or detail query runs.
+    """
+
+    version_models = ()
+
+    def get_signature(self, request):
+        """Digest of the versions and the request; read once per request."""
+        if getattr(self, "_signature", None) is None:
+            params = sorted(
+                (key, value)
+                for key, values in request.query_params.lists()
+                for value in values
+            )
+            signature = repr(
+                (
+                    versions.current(*self.version_models),
+                    request.path,
+                    params,
+                    request.accepted_renderer.format,
+                )
+            )
+            self._signature = hashlib.sha1(signature.encode()).hexdigest()
+        return self._signature
+
+    def get_etag(self, request):
+        return quote_etag(self.get_signature(request))
+
+    def conditional(self, view, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        # Weak comparison: compression marks the ETag weak on the way out
+        tags = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in (tag.removeprefix("W/") for tag in tags):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        response = view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+class ResponseCacheMixin:
+    """
+    Serves repeated ``list()`` requests from the "api" cache.
+
+    Must follow ``ConditionalGetMixin``: entries are keyed by its version
+    signature, so a write to any of ``version_models`` retires them.
+    Streamed lists are never held in memory, so never cached. Neither are
+    lists read inside an atomic batch, which may follow uncommitted writes.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if (
+            not response_cache.enabled()
+            or self.stream_requested(request)
+            or getattr(request, "in_atomic_batch", False)
+        ):
+            return super().list(request, *args, **kwargs)
+
+        signature = self.get_signature(request)
+        data = response_cache.lookup(signature)
+        if data is not None:
+            return Response(data, headers={"X-Cache": "HIT"})
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            # Lists over API_CACHE_MAX_ROWS are not kept
+            response_cache.store(signature, response.data)
+            response["X-Cache"] = "MISS"
+        return response
+
+
+class ValuesListMixin:
+    """
+    Read-only fast path for ``list()``.
+
+    Rows are built straight from ``queryset.values(...)`` dicts instead of
+    model instances run through the serializer, and ``?fields=a,b`` limits
+    the response (and the SELECT) to the requested columns. The output is
+    the same as the serializer's for the same fields.
+
+    With ``Accept: application/vnd.apache.arrow.stream`` the list is an Arrow
+    table built from ``values_list`` tuples instead (see columnar.py).
+
+    Unpaginated JSON lists are streamed with ``?stream=1``: rows are read
+    ``stream_chunk_size`` at a time and written as they are encoded, so
+    memory use does not grow with the number of rows.
+    """
+
+    fields_query_param = "fields"
+    stream_query_param = "stream"
+    stream_chunk_size = CHUNK_SIZE
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, *columnar.RENDERERS]
+
+    def get_list_fields(self, request):
+        allowed = list(self.get_serializer_class().Meta.fields)
+        requested = request.query_params.get(self.fields_query_param)
+        if not requested:
+            return allowed
+        fields = list(dict.fromkeys(f.strip() for f in requested.split(",") if f.strip()))
+        unknown = [f for f in fields if f not in allowed]
+        if unknown or not fields:
+            raise APIValidationError(
+                {
+                    self.fields_query_param: [
+                        f"Unknown fields: {', '.join(unknown)}. "
+                        f"Choose from: {', '.join(allowed)}."
+                    ]
+                }
+            )
+        return fields
+
+    def get_list_querysets(self):
+        """Return the filtered querysets whose rows make up the list."""
+        return [self.filter_queryset(self.get_queryset())]
+
+    def stream_requested(self, request):
+        value = request.query_params.get(self.stream_query_param, "")
+        return (
+            value.lower() in ("1", "true", "yes")
+            and request.accepted_renderer.format == "json"
+        )
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_list_fields(request)
+        querysets = self.get_list_querysets()
+
+        # The paginator needs the ordering columns to build its cursor
+        extra = [f for f in getattr(self, "keyset_ordering", ()) if f not in fields]
+        page = self.paginate_queryset(
+            [queryset.values(*fields, *extra) for queryset in querysets]
+        )
+        arrow = request.accepted_renderer.format == columnar.FORMAT
+        if page is not None:
+            if arrow:
+                rows = [[row[field] for field in fields] for row in page]
+                next_link = self.paginator.get_next_link()
+                return Response(columnar.table(querysets[0], fields, rows, next_link))
+            response = self.get_paginated_response(page)
+            for row in page:
+                for field in extra:
+                    del row[field]
+            return response
+        if arrow:
+            rows = [queryset.values_list(*fields) for queryset in querysets]
+        else:
+            rows = [queryset.values(*fields) for queryset in querysets]
+        if len(rows) > 1:
+            # Compound statements take no per-part ordering
+            rows = [part.order_by() for part in rows]
+            rows = rows[0].union(*rows[1:], all=True)
+        else:
+            rows = rows[0]
+        if arrow:
+            return Response(columnar.table(querysets[0], fields, rows))
+        if self.stream_requested(request):
+            return stream_response(rows, self.stream_chunk_size)
+        return Response(list(rows))
+
+
+class ArchiveMixin:
+    """
+    Adds the rows archived by period closing to ``list()`` with
+    ``?include_archived=1``. ``archive_model`` is the archive table; the
+    resource's filterset applies to it as well.
+    """
+
+    archive_model = None
+    include_archived_query_param = "include_archived"
+
+    def include_archived(self):
+        value = self.request.query_params.get(self.include_archived_query_param, "")
+        return value.lower() in ("1", "true", "yes")
+
+    def filter_archive(self):
+        filterset = self.filterset_class(
+            self.request.query_params,
+            queryset=self.archive_model.objects.all(),
+            request=self.request,
+        )
+        if not filterset.is_valid():
+            raise APIValidationError(filterset.errors)
+        return filterset.qs
+
+    def get_list_querysets(self):
+        querysets = super().get_list_querysets()
+        if self.include_archived():
+            querysets.append(self.filter_archive())
+        return querysets
+
+
+class ExportMixin:
+    """
+    Adds ``GET <resource>/export/?format=csv|ndjson`` streaming every row that
+    matches the resource's filterset. ``export_fields`` lists the columns.
+    """
+
+    export_fields = ()
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="export",
+        renderer_classes=[CSVRenderer, NDJSONRenderer, FastJSONRenderer],
+    )
+    def export(self, request):
+        fmt = request.accepted_renderer.format
+        if fmt not in EXPORTERS:
+            # JSON is negotiable only for the error responses
+            raise NotAcceptable(f"Export formats: {', '.join(EXPORTERS)}.")
+        queryset = self.filter_queryset(self.get_queryset()).order_by("pk")
+        return export_response(queryset, self.export_fields, fmt, self.basename)
+
+
+class ProductViewSet(
+    ConditionalGetMixin,
+    ResponseCacheMixin,
+    ValuesListMixin,
+    ExportMixin,
+    viewsets.ModelViewSet,
+):
     """
     API endpoint for viewing and editing products.
     """
 
-    queryset = Product.objects.select_related().prefetch_related("purchases", "sales")
+    queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = ProductFilter
+    export_fields = ProductSerializer.Meta.fields
+    pagination_class = KeysetPagination
+    keyset_ordering = ("name", "id")
+    # Stock levels depend on purchases and sales too, filters on replenishment
+    version_models = (Product, Purchase, Sale, Replenishment)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if "as_of" in self.request.query_params:
+            # ProductFilter annotates the values as of that date
+            return queryset
+        return annotate_stock(queryset)
+
+    @action(detail=True, methods=["get"], url_path="movements", keyset_ordering=("id",))
+    def movements(self, request, pk=None):
+        """
+        The product's movement ledger in recording order, each entry with the
+        stock balance after it. Paginated with ``?page_size=N``.
+        """
+        return self.conditional(self.movement_list, request, pk)
+
+    def movement_list(self, request, pk):
+        product = get_object_or_404(Product.objects.only("pk"), pk=pk)
+        rows = StockMovement.objects.filter(product=product).values(
+            "id", "date", "quantity", "source", "source_id", "balance"
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(list(rows.order_by("id")))
+
+    @action(
+        detail=True, methods=["get"], url_path="history", keyset_ordering=history.ORDERING
+    )
+    def history(self, request, pk=None):
+        """
+        The product's purchases and sales in date order with the running
+        stock balance, computed in one windowed query. Accepts ``date__gte``,
+        ``date__lte`` and ``include_archived``; paginated with ``?page_size=N``.
+        """
+        return self.conditional(self.history_list, request, pk)
+
+    def history_list(self, request, pk):
+        product = get_object_or_404(Product.objects.only("pk"), pk=pk)
+        params = HistoryParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        def fetch(after=None, limit=None):
+            return history.rows(
+                product.pk,
+                start=params.validated_data.get("date__gte"),
+                end=params.validated_data.get("date__lte"),
+                after=after,
+                limit=limit,
+                include_archived=params.validated_data["include_archived"],
+            )
+
+        page = self.paginator.paginate_rows(
+            fetch, request, self, types=(date.fromisoformat, int, int, int)
+        )
+        if page is not None:
+            response = self.get_paginated_response(page)
+            for row in page:
+                del row["source_order"]
+            return response
+        rows = fetch()
+        for row in rows:
+            del row["source_order"]
+        return Response(rows)
+
+    @action(detail=False, methods=["post"], url_path="stock")
+    def stock(self, request):
+        """
+        Purchased, sold and stock of a basket of products given by ``ids``
+        and/or ``names``, read from the stock counters in one query by
+        primary key and name, whatever the size of the catalogue. Products
+        are listed in request order; unknown ones under ``missing``.
+        """
+        params = StockLookupSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        ids, names = params.validated_data["ids"], params.validated_data["names"]
+
+        rows = annotate_stock(
+            Product.objects.filter(Q(pk__in=ids) | Q(name__in=names))
+        ).values("id", "name", "purchased_amount", "sold_amount", "stock_level")
+        by_id = {row["id"]: row for row in rows}
+        by_name = {row["name"]: row for row in by_id.values()}
+
+        results = {}
+        for row in [by_id.get(pk) for pk in ids] + [by_name.get(n) for n in names]:
+            if row is not None:
+                results.setdefault(row["id"], row)
+        return Response(
+            {
+                "results": list(results.values()),
+                "missing": {
+                    "ids": [pk for pk in ids if pk not in by_id],
+                    "names": [name for name in names if name not in by_name],
+                },
+            }
+        )
 
     def create(self, request, *args, **kwargs):
         try:
             return super().create(request, *args, **kwargs)
+        except APIException:
+            raise
         except ValidationError as e:
             logger.error(f"Validation error in ProductViewSet.create: {e}")
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -262,6 +700,8 @@ class ProductViewSet(viewsets.ModelViewSet):
     def update(self, request, *args, **kwargs):
         try:
             return super().update(request, *args, **kwargs)
+        except APIException:
+            raise
         except ValidationError as e:
             logger.error(f"Validation error in ProductViewSet.update: {e}")
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -273,7 +713,47 @@ class ProductViewSet(viewsets.ModelViewSet):
             )
 
 
-class PurchaseViewSet(viewsets.ModelViewSet):
+class BulkIngestMixin:
+    """
+    Adds ``POST <resource>/bulk/`` accepting a JSON list of rows.
+
+    Valid rows are written with ``bulk_create`` in one transaction and invalid
+    rows are reported by index. With ``?atomic=true`` nothing is written
+    unless every row is valid.
+    """
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response(
+                {"error": "Expected a list of rows."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        atomic = request.query_params.get("atomic", "").lower() in ("1", "true")
+        created, errors = ingest(self.queryset.model, rows, atomic=atomic)
+
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(
+            {"created": created, "failed": len(rows) - created, "errors": errors},
+            status=response_status,
+        )
+
+
+class PurchaseViewSet(
+    ConditionalGetMixin,
+    ResponseCacheMixin,
+    ArchiveMixin,
+    ValuesListMixin,
+    ExportMixin,
+    BulkIngestMixin,
+    viewsets.ModelViewSet,
+):
     """
     A ViewSet for viewing and editing purchases with filtering support.
     """
@@ -283,10 +763,17 @@ class PurchaseViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = PurchaseFilter
+    export_fields = PurchaseSerializer.Meta.fields
+    pagination_class = KeysetPagination
+    keyset_ordering = ("date", "id")
+    version_models = (Purchase,)
+    archive_model = ArchivedPurchase
 
     def create(self, request, *args, **kwargs):
         try:
             return super().create(request, *args, **kwargs)
+        except APIException:
+            raise
         except ValidationError as e:
             logger.error(f"Validation error in PurchaseViewSet.create: {e}")
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -298,7 +785,15 @@ class PurchaseViewSet(viewsets.ModelViewSet):
             )
 
 
-class SaleViewSet(viewsets.ModelViewSet):
+class SaleViewSet(
+    ConditionalGetMixin,
+    ResponseCacheMixin,
+    ArchiveMixin,
+    ValuesListMixin,
+    ExportMixin,
+    BulkIngestMixin,
+    viewsets.ModelViewSet,
+):
     """
     A ViewSet for viewing and editing sales with filtering support.
     """
@@ -308,10 +803,17 @@ class SaleViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = SaleFilter
+    export_fields = SaleSerializer.Meta.fields
+    pagination_class = KeysetPagination
+    keyset_ordering = ("date", "id")
+    version_models = (Sale,)
+    archive_model = ArchivedSale
 
     def create(self, request, *args, **kwargs):
         try:
             return super().create(request, *args, **kwargs)
+        except APIException:
+            raise
         except ValidationError as e:
             logger.error(f"Validation error in SaleViewSet.create: {e}")
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -321,3 +823,264 @@ class SaleViewSet(viewsets.ModelViewSet):
                 {"error": "Internal server error"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class BatchView(APIView):
+    """
+    ``POST /api/batch/`` runs a list of ``{method, path, params, body}``
+    operations in order through their views and returns their results in
+    the same order. With ``?atomic=true`` they run in one transaction that
+    the first failure rolls back, ending the batch.
+    """
+
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        operations = request.data
+        if not isinstance(operations, list):
+            return Response(
+                {"error": "Expected a list of operations."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(operations) > batch.MAX_OPERATIONS:
+            return Response(
+                {"error": f"At most {batch.MAX_OPERATIONS} operations per batch."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = BatchOperationSerializer(data=operations, many=True)
+        serializer.is_valid(raise_exception=True)
+        atomic = request.query_params.get("atomic", "").lower() in ("1", "true")
+        results, rolled_back = batch.run(
+            request, serializer.validated_data, atomic=atomic
+        )
+
+        succeeded = sum(batch.succeeded(result) for result in results)
+        if succeeded == len(operations):
+            response_status = status.HTTP_200_OK
+        elif succeeded and not rolled_back:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(
+            {"rolled_back": rolled_back, "results": results}, status=response_status
+        )
+
+
+class CacheStatsView(APIView):
+    """
+    Hit/miss counters of the list response cache in this process.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return Response(response_cache.snapshot())
+
+
+class AggregateReportView(ConditionalGetMixin, ArchiveMixin, APIView):
+    """
+    Totals of purchases or sales computed in one GROUP BY query.
+
+    ``GET /api/reports/aggregate/?source=sales&group_by=product,month&measures=sum,count``
+    accepts the same filters as the purchase/sale lists, ``include_archived``
+    included.
+    """
+
+    permission_classes = [AllowAny]
+    sources = {
+        "purchases": (Purchase, PurchaseFilter, ArchivedPurchase),
+        "sales": (Sale, SaleFilter, ArchivedSale),
+    }
+
+    def get_choices(self, request, param, allowed, default=()):
+        requested = request.query_params.get(param)
+        if not requested:
+            return list(default)
+        choices = list(dict.fromkeys(c.strip() for c in requested.split(",") if c.strip()))
+        unknown = [c for c in choices if c not in allowed]
+        if unknown:
+            raise APIValidationError(
+                {
+                    param: [
+                        f"Unknown {param}: {', '.join(unknown)}. "
+                        f"Choose from: {', '.join(allowed)}."
+                    ]
+                }
+            )
+        return choices
+
+    def get(self, request):
+        source = request.query_params.get("source")
+        if source not in self.sources:
+            raise APIValidationError(
+                {"source": [f"Choose from: {', '.join(self.sources)}."]}
+            )
+        self.model, self.filterset_class, self.archive_model = self.sources[source]
+        # Product names are part of the rows; sums may come from the rollup
+        self.version_models = (self.model, Product, DailyStock)
+        return self.conditional(self.report, request)
+
+    def report(self, request):
+        group_by = self.get_choices(request, "group_by", reports.dimensions(self.model))
+        measures = self.get_choices(
+            request, "measures", list(reports.MEASURES), default=["sum"]
+        )
+        filterset = self.filterset_class(
+            request.query_params, queryset=self.model.objects.all(), request=request
+        )
+        if not filterset.is_valid():
+            raise APIValidationError(filterset.errors)
+
+        active = {
+            name: value
+            for name, value in filterset.form.cleaned_data.items()
+            if value not in (None, "")
+        }
+        rollup = reports.rollup_source(
+            self.model, group_by, measures, active, self.include_archived()
+        )
+        if rollup is not None:
+            queryset, column = rollup
+            rows = reports.aggregate(
+                queryset, group_by, measures, date_field="day", amount_field=column
+            )
+        else:
+            querysets = [filterset.qs]
+            if self.include_archived():
+                querysets.append(self.filter_archive())
+            rows = reports.aggregate_union(querysets, group_by, measures)
+        return Response(list(rows))
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
+
+
+class DailyStockFilter(filters.FilterSet):
+    """
+    Filter for the daily rollup behind the time series.
+    """
+
+    product = NumberInFilter(field_name="product", lookup_expr="in")
+    date__gte = filters.DateFilter(field_name="day", lookup_expr="gte")
+    date__lte = filters.DateFilter(field_name="day", lookup_expr="lte")
+
+    class Meta:
+        model = DailyStock
+        fields = ["product", "date__gte", "date__lte"]
+
+
+class TimeseriesView(ConditionalGetMixin, APIView):
+    """
+    Daily (or weekly, monthly, yearly) purchased and sold units and closing
+    stock per product, read from the daily rollup.
+
+    ``GET /api/reports/timeseries/?product=1,2&period=month&date__gte=2025-01-01``
+    """
+
+    permission_classes = [AllowAny]
+    # The rollup follows the transactions, except when it is rebuilt
+    version_models = (Purchase, Sale, DailyStock)
+
+    def get(self, request):
+        return self.conditional(self.series, request)
+
+    def series(self, request):
+        period = request.query_params.get("period", "day")
+        if period not in reports.PERIOD_STARTS:
+            raise APIValidationError(
+                {"period": [f"Choose from: {', '.join(reports.PERIOD_STARTS)}."]}
+            )
+        filterset = DailyStockFilter(
+            request.query_params, queryset=DailyStock.objects.all(), request=request
+        )
+        if not filterset.is_valid():
+            raise APIValidationError(filterset.errors)
+        return Response(list(reports.timeseries(filterset.qs, period)))
+
+
+class ReplenishmentFilter(filters.FilterSet):
+    """
+    Filter for the computed replenishment metrics.
+    """
+
+    product = NumberInFilter(field_name="product", lookup_expr="in")
+    days_of_cover__lt = filters.NumberFilter(
+        field_name="days_of_cover", lookup_expr="lt"
+    )
+    days_of_cover__gte = filters.NumberFilter(
+        field_name="days_of_cover", lookup_expr="gte"
+    )
+    order_quantity__gt = filters.NumberFilter(
+        field_name="order_quantity", lookup_expr="gt"
+    )
+
+    class Meta:
+        model = Replenishment
+        fields = [
+            "product",
+            "days_of_cover__lt",
+            "days_of_cover__gte",
+            "order_quantity__gt",
+        ]
+
+
+class ReplenishmentView(
+    ConditionalGetMixin, ResponseCacheMixin, ValuesListMixin, generics.ListAPIView
+):
+    """
+    Average demand, demand variability, days of cover, reorder point and
+    suggested order quantity per product.
+
+    ``GET /api/analytics/replenishment/?days_of_cover__lt=7`` lists the last
+    computed metrics; ``POST`` recomputes them for every product, optionally
+    with ``window``, ``lead_time``, ``review`` (days) and ``service_level``.
+    """
+
+    queryset = Replenishment.objects.all()
+    serializer_class = ReplenishmentSerializer
+    permission_classes = [AllowAny]
+    filter_backends = [filters.DjangoFilterBackend]
+    filterset_class = ReplenishmentFilter
+    pagination_class = KeysetPagination
+    keyset_ordering = ("product",)
+    version_models = (Replenishment,)
+
+    def post(self, request):
+        params = ReplenishmentParamsSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        products = replenishment.refresh(**params.validated_data)
+        return Response({"products": products, **params.validated_data})
+
+
+class ForecastFilter(filters.FilterSet):
+    """
+    Filter for the stored forecasts.
+    """
+
+    product = NumberInFilter(field_name="product", lookup_expr="in")
+    method = filters.ChoiceFilter(choices=Forecast.METHODS)
+
+    class Meta:
+        model = Forecast
+        fields = ["product", "method"]
+
+
+class ForecastView(
+    ConditionalGetMixin, ResponseCacheMixin, ValuesListMixin, generics.ListAPIView
+):
+    """
+    Daily sales forecasts per product and method, as written by the
+    ``run_forecasts`` command.
+
+    ``GET /api/analytics/forecast/?product=1,2&method=seasonal_naive``
+    """
+
+    queryset = Forecast.objects.all()
+    serializer_class = ForecastSerializer
+    permission_classes = [AllowAny]
+    filter_backends = [filters.DjangoFilterBackend]
+    filterset_class = ForecastFilter
+    pagination_class = KeysetPagination
+    keyset_ordering = ("product", "method")
+    version_models = (Forecast,)